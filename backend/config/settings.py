@@ -218,6 +218,10 @@ CACHES = (
         },
     }
 )
+# LocMemCache lives in each worker process. Features whose correctness relies
+# on cache state being seen by every worker (version counters, cart quotes,
+# hot stock) stay off unless the cache is shared.
+CACHE_IS_SHARED = get_env_bool("CACHE_IS_SHARED", default=bool(os.getenv("REDIS_URL")))
 
 
 # Password validation
@@ -265,6 +269,9 @@ STATICFILES_DIRS = [
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Raw customization uploads wait here, unserved, until they are sanitized.
+# Web and worker processes must share this directory.
+PRIVATE_MEDIA_ROOT = os.getenv("PRIVATE_MEDIA_ROOT", os.path.join(BASE_DIR, "private_media"))
 
 STORAGES = {
     "default": {
@@ -320,6 +327,8 @@ REST_FRAMEWORK = {
         'search': '30/minute',
         'delhivery': '20/minute',
         'checkout': '10/minute',
+        'guest_cart': '60/minute',
+        'customization_upload': '20/minute',
         'review': '10/minute',
     },
 
@@ -370,8 +379,13 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'idempotency-key',
+    'if-none-match',
 ]
 
+# Lets the storefront read the cart ETag and revalidate with If-None-Match.
+CORS_EXPOSE_HEADERS = ['etag']
+
 # ===============================
 # EMAIL CONFIGURATION (RESEND)
 # ===============================
@@ -420,6 +434,7 @@ FAILED_PENDING_ORDER_RETENTION_DAYS = int(
     os.getenv("FAILED_PENDING_ORDER_RETENTION_DAYS", "7")
 )
 MAINTENANCE_CRON_TOKEN = os.getenv("MAINTENANCE_CRON_TOKEN", "").strip()
+INVENTORY_SYNC_TOKEN = os.getenv("INVENTORY_SYNC_TOKEN", "").strip()
 ALLOW_LEGACY_DIRECT_ORDER = get_env_bool("ALLOW_LEGACY_DIRECT_ORDER", default=False)
 DELHIVERY_BASE_URL = os.getenv("DELHIVERY_BASE_URL", "").strip()
 DELHIVERY_API_KEY = os.getenv("DELHIVERY_API_KEY", "").strip()
@@ -436,6 +451,35 @@ DELHIVERY_RETURN_STATE = os.getenv("DELHIVERY_RETURN_STATE", "").strip()
 DELHIVERY_RETURN_PIN = os.getenv("DELHIVERY_RETURN_PIN", "").strip()
 
 TRENDING_CACHE_TTL_SECONDS = int(os.getenv("TRENDING_CACHE_TTL_SECONDS", "120"))
+CART_CACHE_TTL_SECONDS = int(os.getenv("CART_CACHE_TTL_SECONDS", "900"))
+CART_QUOTE_TTL_SECONDS = int(os.getenv("CART_QUOTE_TTL_SECONDS", "600"))
+CUSTOMIZATION_UPLOAD_RETENTION_HOURS = int(
+    os.getenv("CUSTOMIZATION_UPLOAD_RETENTION_HOURS", "24")
+)
+CUSTOMIZATION_UPLOAD_MAX_PENDING = int(os.getenv("CUSTOMIZATION_UPLOAD_MAX_PENDING", "10"))
+# Set once a `process_customization_uploads --loop` worker is deployed; until
+# then upload polls sanitize inline straight away. With a worker, polls only
+# step in once an upload has waited CUSTOMIZATION_UPLOAD_INLINE_GRACE_SECONDS.
+CUSTOMIZATION_UPLOAD_WORKER_ENABLED = get_env_bool("CUSTOMIZATION_UPLOAD_WORKER_ENABLED", default=False)
+CUSTOMIZATION_UPLOAD_INLINE_GRACE_SECONDS = int(
+    os.getenv("CUSTOMIZATION_UPLOAD_INLINE_GRACE_SECONDS", "30")
+)
+GUEST_CART_TTL_SECONDS = int(os.getenv("GUEST_CART_TTL_SECONDS", str(60 * 60 * 24 * 7)))
+# Cache-fronted stock gate for products flagged hot_inventory (flash sales).
+HOT_INVENTORY_ENABLED = get_env_bool("HOT_INVENTORY_ENABLED", default=False)
+HOT_INVENTORY_TTL_SECONDS = int(os.getenv("HOT_INVENTORY_TTL_SECONDS", "60"))
+if HOT_INVENTORY_ENABLED and not CACHE_IS_SHARED:
+    # Per-worker mirrors would each sell the full stock.
+    raise ImproperlyConfigured("HOT_INVENTORY_ENABLED requires a shared cache (REDIS_URL).")
+INVENTORY_SNAPSHOT_SETTLE_SECONDS = int(os.getenv("INVENTORY_SNAPSHOT_SETTLE_SECONDS", "300"))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "8"))
+WEBHOOK_RETRY_BASE_SECONDS = int(os.getenv("WEBHOOK_RETRY_BASE_SECONDS", "30"))
+# Set once a `process_webhook_events --loop` worker is deployed; until then the
+# webhook endpoint settles the event it just stored itself.
+WEBHOOK_WORKER_ENABLED = get_env_bool("WEBHOOK_WORKER_ENABLED", default=False)
+RAZORPAY_RECONCILE_WORKERS = int(os.getenv("RAZORPAY_RECONCILE_WORKERS", "8"))
+RAZORPAY_RECONCILE_RATE_PER_SECOND = float(os.getenv("RAZORPAY_RECONCILE_RATE_PER_SECOND", "10"))
+IDEMPOTENCY_KEY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", "86400"))
 DELHIVERY_SERVICEABILITY_CACHE_TTL_SECONDS = int(
     os.getenv("DELHIVERY_SERVICEABILITY_CACHE_TTL_SECONDS", "86400")
 )
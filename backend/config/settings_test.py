@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 
 os.environ["DEBUG"] = "True"
@@ -14,6 +15,11 @@ CSRF_COOKIE_SAMESITE = "Lax"
 SESSION_COOKIE_SAMESITE = "Lax"
 
 
+# Tests run in one process, so the local-memory cache is effectively shared.
+CACHE_IS_SHARED = True
+
+PRIVATE_MEDIA_ROOT = os.path.join(tempfile.gettempdir(), "decor-tales-test-private-media")
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
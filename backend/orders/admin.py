@@ -18,6 +18,7 @@ from .models import (
     Cart,
     CartItem,
     CartItemImage,
+    WebhookEvent,
 )
 from .views import (
     create_delhivery_shipment_for_order_id,
@@ -60,6 +61,7 @@ class CouponAdmin(admin.ModelAdmin):
         "discount_type",
         "discount_value",
         "min_order_amount",
+        "used_count",
         "first_order_only",
         "is_active",
         "start_date",
@@ -82,9 +84,9 @@ class CouponAdmin(admin.ModelAdmin):
 
 @admin.register(CouponUsage)
 class CouponUsageAdmin(admin.ModelAdmin):
-    list_display = ("coupon", "user", "order", "discount_amount", "created_at")
+    list_display = ("coupon", "user", "order", "discount_amount", "counted", "created_at")
     search_fields = ("coupon__code", "user__username", "user__email", "order__order_number")
-    readonly_fields = ("created_at",)
+    readonly_fields = ("counted", "created_at")
 
 
 class CartItemImageInline(admin.TabularInline):
@@ -1233,3 +1235,25 @@ class OrderItemImageAdmin(admin.ModelAdmin):
 class CartAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "created_at", "updated_at")
     search_fields = ("user__username", "user__email")
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ("id", "provider", "event_type", "status", "attempts", "next_attempt_at", "received_at")
+    list_filter = ("provider", "status", "event_type")
+    search_fields = ("event_id",)
+    readonly_fields = [field.name for field in WebhookEvent._meta.fields]
+    actions = ["retry_selected_events"]
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Retry selected events")
+    def retry_selected_events(self, request, queryset):
+        updated = queryset.exclude(status=WebhookEvent.STATUS_PROCESSED).update(
+            status=WebhookEvent.STATUS_PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+            processed_at=None,
+        )
+        self.message_user(request, f"Queued {updated} event(s) for processing.", messages.SUCCESS)
@@ -0,0 +1,80 @@
+"""
+Per-user cart summary cache.
+
+``get_cart`` output is cached under (user, cart version, catalog version).
+Cart mutations bump the user's cart version, and price, stock or listing
+changes bump the shared catalog version, so stale entries are never read
+again and simply expire.
+
+The version counters only mean something when every worker shares the
+cache, so on a per-process cache (LocMemCache) the summary cache and its
+ETag are switched off and every request builds the cart afresh.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import parse_etags
+
+from products.caching import (
+    bump_versioned_counter_on_commit,
+    cache_is_shared,
+    get_catalog_version,
+    get_versioned_counter,
+)
+
+CART_VERSION_CACHE_KEY = "orders:cart-version:v1:{user_id}"
+CART_SUMMARY_CACHE_KEY = "orders:cart-summary:v1:{user_id}:{cart_version}:{catalog_version}:{host}"
+
+
+def get_cart_version(user_id):
+    return get_versioned_counter(CART_VERSION_CACHE_KEY.format(user_id=user_id))
+
+
+def bump_cart_version(user_id):
+    """Invalidate the user's cached cart summary."""
+    if not user_id:
+        return
+    bump_versioned_counter_on_commit(CART_VERSION_CACHE_KEY.format(user_id=user_id))
+
+
+def get_cart_cache_state(request):
+    """
+    Return ``(cache_key, etag)`` for the requesting user's current cart, or
+    ``(None, None)`` when the cache is not shared between workers.
+    """
+    if not cache_is_shared():
+        return None, None
+    cart_version = get_cart_version(request.user.id)
+    catalog_version = get_catalog_version()
+    # Media URLs are absolute, so the representation depends on the host.
+    host = hashlib.sha1(request.get_host().encode("utf-8")).hexdigest()[:12]
+    cache_key = CART_SUMMARY_CACHE_KEY.format(
+        user_id=request.user.id,
+        cart_version=cart_version,
+        catalog_version=catalog_version,
+        host=host,
+    )
+    etag = f'"cart-{request.user.id}-{cart_version}-{catalog_version}-{host}"'
+    return cache_key, etag
+
+
+def etag_matches(request, etag):
+    header = request.META.get("HTTP_IF_NONE_MATCH", "")
+    if not etag or not header:
+        return False
+    etags = parse_etags(header)
+    return "*" in etags or etag in etags
+
+
+def get_cached_cart(cache_key):
+    if cache_key is None:
+        return None
+    return cache.get(cache_key)
+
+
+def set_cached_cart(cache_key, payload):
+    if cache_key is None:
+        return
+    cache.set(cache_key, payload, timeout=settings.CART_CACHE_TTL_SECONDS)
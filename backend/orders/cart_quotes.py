@@ -0,0 +1,75 @@
+"""
+Signed cart pricing quotes.
+
+``get_available_coupons`` already prices the cart and evaluates every coupon,
+so it hands the client a short-lived signed quote per price it shows. The
+quote pins the user's cart version, the catalog version and the coupon, so
+checkout can trust its totals without re-pricing as long as none of those
+moved. Stock is still checked under lock in ``create_pending_order_from_cart``.
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import signing
+
+from products.caching import cache_is_shared, get_catalog_version
+
+from .cart_cache import get_cart_version
+
+CART_QUOTE_SALT = "orders.cart-quote"
+
+
+def get_cart_quote_versions(user_id):
+    """Read before loading the cart so a concurrent change invalidates the quote."""
+    return get_cart_version(user_id), get_catalog_version()
+
+
+def issue_cart_quote(*, user, versions, subtotal_amount, discount_amount=None, coupon=None):
+    cart_version, catalog_version = versions
+    return signing.dumps(
+        {
+            "user": user.id,
+            "cart": cart_version,
+            "catalog": catalog_version,
+            "coupon": coupon.code if coupon else "",
+            "coupon_updated_at": coupon.updated_at.isoformat() if coupon else "",
+            "subtotal": str(subtotal_amount),
+            "discount": str(discount_amount or Decimal("0.00")),
+        },
+        salt=CART_QUOTE_SALT,
+        compress=True,
+    )
+
+
+def load_cart_quote(token, *, user, coupon_code=""):
+    """
+    Return the quote's pricing when it is still current for ``user`` and
+    ``coupon_code``, otherwise ``None`` so the caller re-prices the cart.
+    Quotes are only trusted when the version counters live in a shared cache.
+    """
+    if not token or not cache_is_shared():
+        return None
+
+    try:
+        quote = signing.loads(
+            str(token),
+            salt=CART_QUOTE_SALT,
+            max_age=settings.CART_QUOTE_TTL_SECONDS,
+        )
+    except signing.BadSignature:
+        return None
+
+    if not isinstance(quote, dict) or quote.get("user") != user.id:
+        return None
+    if quote.get("coupon") != (coupon_code or "").strip().upper():
+        return None
+    if (quote.get("cart"), quote.get("catalog")) != get_cart_quote_versions(user.id):
+        return None
+
+    return {
+        "coupon": quote["coupon"],
+        "coupon_updated_at": quote.get("coupon_updated_at", ""),
+        "subtotal_amount": Decimal(quote["subtotal"]),
+        "discount_amount": Decimal(quote["discount"]),
+    }
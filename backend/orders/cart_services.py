@@ -0,0 +1,134 @@
+"""
+Cart write paths shared by the cart endpoints and the guest-cart merge.
+"""
+
+from django.db import IntegrityError, connection, transaction
+
+from products.models import Product, ProductVariant
+
+from .models import Cart, CartItem
+
+
+def upsert_plain_cart_item(*, cart, product, variant, quantity, available_stock):
+    """
+    Add ``quantity`` to the cart's non-customized line for product/variant in
+    a single ``INSERT ... ON CONFLICT DO UPDATE``, clamped to
+    ``available_stock``. Concurrent adds merge instead of racing to create
+    duplicate lines.
+    """
+    table = connection.ops.quote_name(CartItem._meta.db_table)
+    merged_quantity = f"{table}.quantity + excluded.quantity"
+    sql = (
+        f"INSERT INTO {table} "
+        "(cart_id, product_id, variant_id, variant_size_name, variant_color_name, "
+        "variant_sku, quantity, merge_key) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s, %s) "
+        "ON CONFLICT (cart_id, merge_key) WHERE merge_key IS NOT NULL DO UPDATE SET "
+        f"quantity = CASE WHEN {merged_quantity} > %s THEN %s ELSE {merged_quantity} END, "
+        "variant_size_name = excluded.variant_size_name, "
+        "variant_color_name = excluded.variant_color_name, "
+        "variant_sku = excluded.variant_sku "
+        "RETURNING id, quantity"
+    )
+    params = [
+        cart.id,
+        product.id,
+        variant.id if variant else None,
+        variant.size.name if variant and variant.size else "",
+        variant.color.name if variant and variant.color else "",
+        variant.sku if variant else "",
+        min(quantity, available_stock),
+        CartItem.build_merge_key(product.id, variant.id if variant else None),
+        available_stock,
+        available_stock,
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        item_id, item_quantity = cursor.fetchone()
+
+    return CartItem(
+        id=item_id,
+        cart=cart,
+        product=product,
+        variant=variant,
+        quantity=item_quantity,
+    )
+
+
+def merge_guest_cart_lines(user, lines):
+    """
+    Fold guest lines into the user's cart: existing plain lines are topped up
+    and new lines are inserted with one ``bulk_create``. Quantities are
+    clamped to current stock and lines for unavailable products are dropped.
+    Returns the number of lines merged.
+    """
+    if not lines:
+        return 0
+
+    products_by_id = Product.objects.in_bulk({line["product_id"] for line in lines})
+    variants_by_id = ProductVariant.objects.select_related("size", "color").in_bulk(
+        {line["variant_id"] for line in lines if line.get("variant_id")}
+    )
+
+    with transaction.atomic():
+        cart, _ = Cart.objects.get_or_create(user=user)
+        existing_by_key = {
+            item.merge_key: item
+            for item in CartItem.objects.select_for_update().filter(
+                cart=cart,
+                merge_key__isnull=False,
+            )
+        }
+
+        to_update = []
+        to_create = []
+        for line in lines:
+            product = products_by_id.get(line["product_id"])
+            variant = variants_by_id.get(line.get("variant_id")) if line.get("variant_id") else None
+            if not product or not product.is_active:
+                continue
+            if product.stock_type == "variants" and (not variant or variant.product_id != product.id):
+                continue
+            if product.stock_type != "variants" and variant:
+                continue
+
+            available_stock = variant.stock if variant else product.stock
+            merge_key = CartItem.build_merge_key(product.id, variant.id if variant else None)
+            existing = existing_by_key.get(merge_key)
+            if existing:
+                existing.quantity = min(existing.quantity + line["quantity"], available_stock)
+                to_update.append(existing)
+                continue
+
+            quantity = min(line["quantity"], available_stock)
+            if quantity < 1:
+                continue
+            item = CartItem(
+                cart=cart,
+                product=product,
+                variant=variant,
+                quantity=quantity,
+                merge_key=merge_key,
+            )
+            item.capture_variant_snapshot(variant)
+            existing_by_key[merge_key] = item
+            to_create.append(item)
+
+        if to_update:
+            CartItem.objects.bulk_update(to_update, ["quantity"])
+        if to_create:
+            try:
+                with transaction.atomic():
+                    CartItem.objects.bulk_create(to_create)
+            except IntegrityError:
+                # A concurrent add created one of these lines; merge row by row.
+                for item in to_create:
+                    upsert_plain_cart_item(
+                        cart=cart,
+                        product=item.product,
+                        variant=item.variant,
+                        quantity=item.quantity,
+                        available_stock=item.variant.stock if item.variant else item.product.stock,
+                    )
+
+    return len(to_update) + len(to_create)
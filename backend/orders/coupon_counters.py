@@ -0,0 +1,148 @@
+"""
+Maintained coupon usage counters.
+
+``Coupon.used_count`` and ``CouponUserCounter.used_count`` mirror the number
+of ``CouponUsage`` rows whose order is not cancelled or failed, so coupon
+evaluation reads a counter instead of running ``COUNT(*)`` over usages joined
+to orders. ``CouponUsage.counted`` records whether a usage is included in the
+counters; every adjustment first flips that flag with a conditional UPDATE and
+only touches the counters when the flip succeeded, which keeps concurrent
+checkouts, webhooks and status changes from counting a usage twice.
+``reconcile_coupon_usage_counters`` rebuilds everything from the usage rows.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+
+from .models import Coupon, CouponUsage, CouponUserCounter
+
+COUPON_INACTIVE_ORDER_STATUSES = ("cancelled", "failed")
+
+
+def _adjust_counters(coupon_id, user_id, delta):
+    if delta > 0:
+        Coupon.objects.filter(id=coupon_id).update(used_count=F("used_count") + delta)
+        updated = CouponUserCounter.objects.filter(coupon_id=coupon_id, user_id=user_id).update(
+            used_count=F("used_count") + delta
+        )
+        if updated:
+            return
+        try:
+            with transaction.atomic():
+                CouponUserCounter.objects.create(
+                    coupon_id=coupon_id,
+                    user_id=user_id,
+                    used_count=delta,
+                )
+        except IntegrityError:
+            # Another checkout created the row first.
+            CouponUserCounter.objects.filter(coupon_id=coupon_id, user_id=user_id).update(
+                used_count=F("used_count") + delta
+            )
+        return
+
+    Coupon.objects.filter(id=coupon_id).update(used_count=Greatest(F("used_count") + delta, 0))
+    CouponUserCounter.objects.filter(coupon_id=coupon_id, user_id=user_id).update(
+        used_count=Greatest(F("used_count") + delta, 0)
+    )
+
+
+def count_coupon_usage(usage):
+    """Include ``usage`` in the counters unless it already is."""
+    if CouponUsage.objects.filter(id=usage.id, counted=False).update(counted=True):
+        usage.counted = True
+        _adjust_counters(usage.coupon_id, usage.user_id, 1)
+
+
+def uncount_coupon_usage(usage):
+    """Remove ``usage`` from the counters if it is currently included."""
+    if CouponUsage.objects.filter(id=usage.id, counted=True).update(counted=False):
+        usage.counted = False
+        _adjust_counters(usage.coupon_id, usage.user_id, -1)
+
+
+def discard_coupon_usage(usage):
+    """Drop a deleted ``usage`` from the counters."""
+    if usage.counted:
+        _adjust_counters(usage.coupon_id, usage.user_id, -1)
+
+
+def sync_order_coupon_usage_counters(order):
+    """Count or uncount an order's usages to match its current status."""
+    active = order.status not in COUPON_INACTIVE_ORDER_STATUSES
+    for usage in CouponUsage.objects.filter(order=order, counted=not active):
+        if active:
+            count_coupon_usage(usage)
+        else:
+            uncount_coupon_usage(usage)
+
+
+def reconcile_coupon_usage_counters(*, dry_run=False):
+    """
+    Rebuild ``counted`` flags and both counters from ``CouponUsage`` rows.
+
+    The counters follow ``Order`` saves through signals, so status changes
+    made with ``QuerySet.update()`` bypass them; run this (the
+    ``reconcile_coupon_usage`` command) after such bulk changes.
+
+    Returns ``{"usages": n, "coupons": n, "user_counters": n}`` with the number
+    of rows that were (or, with ``dry_run``, would be) corrected.
+    """
+    active_usages = ~Q(order__status__in=COUPON_INACTIVE_ORDER_STATUSES)
+    stale_usages = CouponUsage.objects.filter(
+        (active_usages & Q(counted=False)) | (~active_usages & Q(counted=True))
+    )
+
+    with transaction.atomic():
+        usage_fixes = stale_usages.count()
+        if usage_fixes and not dry_run:
+            CouponUsage.objects.filter(active_usages).update(counted=True)
+            CouponUsage.objects.exclude(active_usages).update(counted=False)
+
+        expected_totals = dict(
+            CouponUsage.objects.filter(active_usages)
+            .values("coupon_id")
+            .annotate(total=Count("id"))
+            .values_list("coupon_id", "total")
+        )
+        stale_coupons = [
+            coupon
+            for coupon in Coupon.objects.select_for_update().only("id", "used_count")
+            if coupon.used_count != expected_totals.get(coupon.id, 0)
+        ]
+        for coupon in stale_coupons:
+            coupon.used_count = expected_totals.get(coupon.id, 0)
+        if stale_coupons and not dry_run:
+            Coupon.objects.bulk_update(stale_coupons, ["used_count"])
+
+        expected_user_totals = {
+            (coupon_id, user_id): total
+            for coupon_id, user_id, total in (
+                CouponUsage.objects.filter(active_usages)
+                .values("coupon_id", "user_id")
+                .annotate(total=Count("id"))
+                .values_list("coupon_id", "user_id", "total")
+            )
+        }
+        stale_counters = []
+        for counter in CouponUserCounter.objects.select_for_update():
+            expected = expected_user_totals.pop((counter.coupon_id, counter.user_id), 0)
+            if counter.used_count != expected:
+                counter.used_count = expected
+                stale_counters.append(counter)
+        missing_counters = [
+            CouponUserCounter(coupon_id=coupon_id, user_id=user_id, used_count=total)
+            for (coupon_id, user_id), total in expected_user_totals.items()
+        ]
+        if not dry_run:
+            if stale_counters:
+                CouponUserCounter.objects.bulk_update(stale_counters, ["used_count"])
+            if missing_counters:
+                CouponUserCounter.objects.bulk_create(missing_counters)
+
+    return {
+        "usages": usage_fixes,
+        "coupons": len(stale_coupons),
+        "user_counters": len(stale_counters) + len(missing_counters),
+    }
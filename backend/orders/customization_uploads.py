@@ -0,0 +1,155 @@
+"""
+Upload sessions for order customization images.
+
+The upload endpoint only runs cheap header checks and streams the file to
+private storage; decoding, EXIF stripping and re-encoding
+(``validate_custom_image``) happen in ``process_customization_upload``, which
+the ``process_customization_uploads`` worker command runs. The status endpoint
+runs it too: straight away when no worker is deployed, otherwise once an
+upload has been pending for ``CUSTOMIZATION_UPLOAD_INLINE_GRACE_SECONDS``.
+``add_to_cart`` then attaches ready uploads by id.
+"""
+
+import logging
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from utils.media_cleanup import delete_file_if_unreferenced
+from utils.validation import (
+    ALLOWED_IMAGE_EXTENSIONS,
+    ALLOWED_IMAGE_MIME_TYPES,
+    validate_custom_image,
+)
+
+from .models import CustomizationUpload
+
+logger = logging.getLogger(__name__)
+
+CUSTOMIZATION_UPLOAD_MAX_BYTES = 5 * 1024 * 1024
+
+
+def check_customization_upload(file):
+    """Reject obviously invalid uploads before anything is written."""
+    if not file:
+        raise ValueError("image is required.")
+
+    extension = Path(file.name or "").suffix.lower()
+    if extension not in ALLOWED_IMAGE_EXTENSIONS:
+        raise ValueError("Unsupported file extension. Allowed formats: jpg, jpeg, png, webp.")
+
+    content_type = (getattr(file, "content_type", "") or "").lower()
+    if content_type not in ALLOWED_IMAGE_MIME_TYPES:
+        raise ValueError(
+            "Unsupported image MIME type. Allowed types: image/jpeg, image/png, image/webp."
+        )
+
+    if file.size > CUSTOMIZATION_UPLOAD_MAX_BYTES:
+        raise ValueError(
+            f"Image size must be {CUSTOMIZATION_UPLOAD_MAX_BYTES // (1024 * 1024)}MB or smaller."
+        )
+
+
+def should_process_upload_inline(upload):
+    if upload.status != CustomizationUpload.STATUS_PENDING:
+        return False
+    if not settings.CUSTOMIZATION_UPLOAD_WORKER_ENABLED:
+        return True
+    grace = timedelta(seconds=settings.CUSTOMIZATION_UPLOAD_INLINE_GRACE_SECONDS)
+    return upload.created_at <= timezone.now() - grace
+
+
+def create_customization_upload(user, file):
+    check_customization_upload(file)
+    pending = CustomizationUpload.objects.filter(
+        user=user,
+        status=CustomizationUpload.STATUS_PENDING,
+    ).count()
+    if pending >= settings.CUSTOMIZATION_UPLOAD_MAX_PENDING:
+        raise ValueError("Too many images are still processing. Please wait and try again.")
+    upload = CustomizationUpload(
+        user=user,
+        original_name=Path(file.name).name[:255],
+        content_type=(file.content_type or "").lower(),
+    )
+    # Storage backends copy the (temp-file backed) upload in chunks.
+    upload.raw_file.save(Path(file.name).name, file, save=False)
+    upload.save()
+    return upload
+
+
+def _delete_raw_file(upload):
+    # Raw names are unique per upload and never referenced elsewhere.
+    name = upload.raw_file.name
+    if name:
+        upload.raw_file.storage.delete(name)
+    upload.raw_file = ""
+
+
+def process_customization_upload(upload):
+    """Sanitize a pending upload in place. Returns the upload."""
+    if upload.status != CustomizationUpload.STATUS_PENDING:
+        return upload
+
+    try:
+        with upload.raw_file.open("rb") as raw:
+            source = File(raw, name=upload.original_name or Path(upload.raw_file.name).name)
+            source.content_type = upload.content_type
+            source.size = upload.raw_file.size
+            sanitized = validate_custom_image(source)
+    except serializers.ValidationError as exc:
+        detail = exc.detail[0] if isinstance(exc.detail, list) and exc.detail else exc.detail
+        upload.status = CustomizationUpload.STATUS_REJECTED
+        upload.error = str(detail)[:255]
+    except (FileNotFoundError, OSError) as exc:
+        logger.warning("customization_upload_missing_file upload_id=%s error=%s", upload.id, exc)
+        upload.status = CustomizationUpload.STATUS_REJECTED
+        upload.error = "Uploaded file could not be read."
+    else:
+        upload.image.save(sanitized.name, sanitized, save=False)
+        upload.status = CustomizationUpload.STATUS_READY
+
+    _delete_raw_file(upload)
+    upload.processed_at = timezone.now()
+    upload.save(update_fields=["raw_file", "image", "status", "error", "processed_at"])
+    return upload
+
+
+def process_pending_customization_uploads(*, limit=100):
+    processed = 0
+    upload_ids = list(
+        CustomizationUpload.objects.filter(status=CustomizationUpload.STATUS_PENDING)
+        .order_by("created_at", "id")
+        .values_list("id", flat=True)[:limit]
+    )
+    for upload_id in upload_ids:
+        with transaction.atomic():
+            upload = (
+                CustomizationUpload.objects.select_for_update(skip_locked=True)
+                .filter(id=upload_id, status=CustomizationUpload.STATUS_PENDING)
+                .first()
+            )
+            if upload is None:
+                continue
+            process_customization_upload(upload)
+            processed += 1
+    return processed
+
+
+def purge_stale_customization_uploads(*, hours=None, limit=500):
+    """Delete uploads that were never attached to a cart, with their files."""
+    hours = settings.CUSTOMIZATION_UPLOAD_RETENTION_HOURS if hours is None else hours
+    cutoff = timezone.now() - timedelta(hours=hours)
+    stale = list(CustomizationUpload.objects.filter(created_at__lt=cutoff).order_by("id")[:limit])
+    for upload in stale:
+        image_name = upload.image.name
+        _delete_raw_file(upload)
+        upload.delete()
+        if image_name:
+            delete_file_if_unreferenced(image_name)
+    return len(stale)
@@ -0,0 +1,94 @@
+"""
+Server-side cart for anonymous visitors.
+
+Guest lines are kept in a signed, compressed cookie rather than the cache, so
+they survive across workers and restarts without a shared cache, and browsing
+and adding to the cart cost no database writes. Lines are
+``[product_id, variant_id or 0, quantity]`` and capped at
+``GUEST_CART_MAX_LINES`` to stay well inside the browser's cookie size limit.
+After login the frontend calls the merge endpoint once and the lines are
+folded into the user's ``CartItem`` rows in bulk by
+``cart_services.merge_guest_cart_lines``.
+"""
+
+from django.conf import settings
+from django.core import signing
+
+GUEST_CART_COOKIE_NAME = "guest_cart"
+GUEST_CART_COOKIE_SALT = "orders.guest-cart"
+GUEST_CART_MAX_LINES = 50
+
+
+def load_guest_cart(request):
+    """Return the guest lines from the request cookie; tampered or expired cookies read as empty."""
+    value = request.COOKIES.get(GUEST_CART_COOKIE_NAME)
+    if not value:
+        return []
+    try:
+        packed = signing.loads(
+            value,
+            salt=GUEST_CART_COOKIE_SALT,
+            max_age=settings.GUEST_CART_TTL_SECONDS,
+        )
+    except signing.BadSignature:
+        return []
+    if not isinstance(packed, list):
+        return []
+
+    lines = []
+    for entry in packed[:GUEST_CART_MAX_LINES]:
+        try:
+            product_id, variant_id, quantity = (int(part) for part in entry)
+        except (TypeError, ValueError):
+            continue
+        if product_id > 0 and quantity > 0:
+            lines.append(
+                {"product_id": product_id, "variant_id": variant_id or None, "quantity": quantity}
+            )
+    return lines
+
+
+def _cookie_settings():
+    cookie_settings = {
+        "httponly": True,
+        "secure": settings.AUTH_COOKIE_SECURE,
+        "samesite": (settings.AUTH_COOKIE_SAMESITE or "None").strip() or "None",
+        "path": "/",
+    }
+    if settings.AUTH_COOKIE_DOMAIN:
+        cookie_settings["domain"] = settings.AUTH_COOKIE_DOMAIN
+    return cookie_settings
+
+
+def set_guest_cart_cookie(response, lines):
+    """Store ``lines`` in the response cookie; an empty cart clears it."""
+    if not lines:
+        clear_guest_cart_cookie(response)
+        return
+    packed = [
+        [line["product_id"], line.get("variant_id") or 0, line["quantity"]]
+        for line in lines
+    ]
+    response.set_cookie(
+        GUEST_CART_COOKIE_NAME,
+        signing.dumps(packed, salt=GUEST_CART_COOKIE_SALT, compress=True),
+        max_age=settings.GUEST_CART_TTL_SECONDS,
+        **_cookie_settings(),
+    )
+
+
+def clear_guest_cart_cookie(response):
+    cookie_settings = _cookie_settings()
+    response.delete_cookie(
+        GUEST_CART_COOKIE_NAME,
+        path=cookie_settings["path"],
+        domain=cookie_settings.get("domain"),
+        samesite=cookie_settings["samesite"],
+    )
+
+
+def find_guest_cart_line(lines, product_id, variant_id=None):
+    for line in lines:
+        if line["product_id"] == product_id and line.get("variant_id") == (variant_id or None):
+            return line
+    return None
@@ -0,0 +1,178 @@
+"""
+Cache-fronted stock gate for high-demand ("hot") products.
+
+Products flagged ``hot_inventory`` keep their available units (stock minus
+reserved) mirrored in the cache (Redis in production). Checkout takes units
+from the mirror with an atomic ``decr`` before it opens the locking
+transaction, so once a drop sells out further buyers are turned away without
+queueing on the product row. The database check under ``select_for_update``
+stays authoritative; the mirror only sheds load. Released reservations give
+units back, mirror keys expire ``HOT_INVENTORY_TTL_SECONDS`` after they are
+seeded and are then reseeded from the database, saves of hot products and
+variants reseed their key, and ``sync_hot_inventory`` re-mirrors every hot
+product on demand.
+
+Everything here is a no-op unless ``HOT_INVENTORY_ENABLED`` is set, which
+settings only allow together with a shared cache.
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+
+from products.caching import cache_is_shared
+from products.models import Product, ProductVariant
+
+logger = logging.getLogger(__name__)
+
+HOT_INVENTORY_CACHE_KEY = "orders:hot-stock:v1:{kind}:{target_id}"
+HOT_INVENTORY_MODELS = {"product": Product, "variant": ProductVariant}
+HOT_INVENTORY_FILTERS = {
+    "product": {"hot_inventory": True, "stock_type": "main"},
+    "variant": {"product__hot_inventory": True, "product__stock_type": "variants"},
+}
+# DECRBY only when the key exists, so an expired mirror is never recreated
+# without its TTL (Django's RedisCache.decr checks EXISTS separately).
+DECR_IF_EXISTS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return false
+end
+return redis.call('DECRBY', KEYS[1], ARGV[1])
+"""
+
+
+class HotInventorySoldOut(Exception):
+    def __init__(self, product):
+        super().__init__(f"{product.title} is sold out right now.")
+        self.product = product
+
+
+def hot_inventory_enabled():
+    return getattr(settings, "HOT_INVENTORY_ENABLED", False) and cache_is_shared()
+
+
+def _cache_key(kind, target_id):
+    return HOT_INVENTORY_CACHE_KEY.format(kind=kind, target_id=target_id)
+
+
+def _load_available(kind, target_id):
+    row = (
+        HOT_INVENTORY_MODELS[kind].objects.filter(id=target_id)
+        .values_list("stock", "reserved_quantity")
+        .first()
+    )
+    return max(0, row[0] - row[1]) if row else 0
+
+
+def _decr_existing(key, quantity):
+    """Atomically take ``quantity`` from a mirrored key; None if it is missing."""
+    backend = caches["default"]
+    if isinstance(backend, RedisCache):
+        client = backend._cache.get_client(key, write=True)
+        return client.eval(DECR_IF_EXISTS_SCRIPT, 1, backend.make_and_validate_key(key), quantity)
+    try:
+        # LocMemCache decrements in place and keeps the key's expiry.
+        return cache.decr(key, quantity)
+    except ValueError:
+        return None
+
+
+def _take(kind, target_id, quantity):
+    key = _cache_key(kind, target_id)
+    remaining = _decr_existing(key, quantity)
+    if remaining is None:
+        # Missing or expired mirror: seed it from the database. Only the seed
+        # sets the TTL, so the mirror always expires and gets reseeded; ``add``
+        # keeps a concurrent seeder from overwriting units already taken.
+        available = _load_available(kind, target_id)
+        cache.add(key, available, timeout=settings.HOT_INVENTORY_TTL_SECONDS)
+        remaining = _decr_existing(key, quantity)
+        if remaining is None:
+            # Expired again straight away; fall back to the database figure.
+            remaining = available - quantity
+    return remaining
+
+
+def reseed_hot_inventory(kind, target_id):
+    """Re-mirror one product or variant, dropping the key if it is not hot."""
+    if not hot_inventory_enabled():
+        return
+    key = _cache_key(kind, target_id)
+    row = (
+        HOT_INVENTORY_MODELS[kind].objects.filter(id=target_id, **HOT_INVENTORY_FILTERS[kind])
+        .values_list("stock", "reserved_quantity")
+        .first()
+    )
+    if row is None:
+        cache.delete(key)
+    else:
+        cache.set(key, max(0, row[0] - row[1]), timeout=settings.HOT_INVENTORY_TTL_SECONDS)
+
+
+def return_hot_inventory(quantities):
+    """Give ``{("product" | "variant", id): units}`` back to the mirror."""
+    if not hot_inventory_enabled():
+        return
+    for (kind, target_id), quantity in quantities.items():
+        if not target_id or quantity <= 0:
+            continue
+        try:
+            cache.incr(_cache_key(kind, target_id), quantity)
+        except ValueError:
+            # Not mirrored (not hot, or expired); the next seed reads the DB.
+            pass
+
+
+def take_hot_inventory(cart_items):
+    """
+    Take units for the hot products in ``cart_items`` from the mirror.
+
+    Returns the ``{target: units}`` taken, to be handed to
+    ``return_hot_inventory`` if checkout fails before reservations commit.
+    Raises ``HotInventorySoldOut`` after returning partial takes.
+    """
+    if not hot_inventory_enabled():
+        return {}
+
+    wanted = {}
+    products = {}
+    for item in cart_items:
+        if not item.product.hot_inventory:
+            continue
+        if item.product.stock_type == "variants":
+            key = ("variant", item.variant_id)
+        else:
+            key = ("product", item.product_id)
+        if not key[1]:
+            continue
+        wanted[key] = wanted.get(key, 0) + item.quantity
+        products[key] = item.product
+
+    taken = {}
+    for key, quantity in sorted(wanted.items()):
+        remaining = _take(*key, quantity)
+        taken[key] = quantity
+        if remaining < 0:
+            return_hot_inventory(taken)
+            raise HotInventorySoldOut(products[key])
+    return taken
+
+
+def sync_hot_inventory():
+    """Re-mirror available units of every hot product from the database."""
+    if not hot_inventory_enabled():
+        return 0
+
+    values = {}
+    for kind, model in HOT_INVENTORY_MODELS.items():
+        for target_id, stock, reserved in model.objects.filter(
+            **HOT_INVENTORY_FILTERS[kind]
+        ).values_list("id", "stock", "reserved_quantity"):
+            values[_cache_key(kind, target_id)] = max(0, stock - reserved)
+
+    if values:
+        cache.set_many(values, timeout=settings.HOT_INVENTORY_TTL_SECONDS)
+    logger.info("hot_inventory_synced targets=%s", len(values))
+    return len(values)
@@ -0,0 +1,118 @@
+"""
+``Idempotency-Key`` support for the payment endpoints.
+
+The first request with a key claims it by inserting an ``IdempotencyKey``
+row (unique per scope, user and key) and, once the view returns, stores the
+response on it for ``IDEMPOTENCY_KEY_TTL_SECONDS``. Repeats with the same
+key and body get the stored response back without running the view again,
+on whichever worker they land, so a double click or client retry cannot
+create a second pending order, reservation or gateway order. Server errors
+release the key so the client can retry for real.
+"""
+
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+# A claimed key whose request never finished (e.g. the worker died) frees up
+# after this long instead of blocking retries for the full TTL.
+IDEMPOTENCY_PENDING_TTL_SECONDS = 120
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def _claim(scope, user, key_hash, fingerprint):
+    """
+    Insert a pending row for the key. Returns ``(row, True)`` when claimed,
+    or ``(existing_row, False)`` when another request already holds it.
+    """
+    now = timezone.now()
+    # Expired keys are dropped on the user's next claim, which also frees an
+    # abandoned pending row for the same key.
+    IdempotencyKey.objects.filter(user=user, expires_at__lte=now).delete()
+    try:
+        with transaction.atomic():
+            row = IdempotencyKey.objects.create(
+                scope=scope,
+                user=user,
+                key_hash=key_hash,
+                fingerprint=fingerprint,
+                expires_at=now + timedelta(seconds=IDEMPOTENCY_PENDING_TTL_SECONDS),
+            )
+        return row, True
+    except IntegrityError:
+        existing = IdempotencyKey.objects.filter(scope=scope, user=user, key_hash=key_hash).first()
+        return existing, False
+
+
+def idempotent(scope):
+    """
+    Make a DRF function view replay its response for a repeated
+    ``Idempotency-Key``. Requests without the header run as before.
+    Apply it below ``@api_view`` so authentication has already run.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            key = (request.headers.get(IDEMPOTENCY_HEADER) or "").strip()
+            if not key:
+                return view(request, *args, **kwargs)
+            if len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+                return Response({"error": f"{IDEMPOTENCY_HEADER} is too long."}, status=400)
+
+            fingerprint = _fingerprint(request)
+            row, claimed = _claim(
+                scope,
+                request.user,
+                hashlib.sha256(key.encode("utf-8")).hexdigest(),
+                fingerprint,
+            )
+            if not claimed:
+                if row is not None and row.fingerprint != fingerprint:
+                    return Response(
+                        {"error": f"{IDEMPOTENCY_HEADER} was already used for a different request."},
+                        status=422,
+                    )
+                if row is None or row.state != IdempotencyKey.STATE_DONE:
+                    return Response(
+                        {"error": "A request with this Idempotency-Key is still in progress."},
+                        status=409,
+                    )
+                response = Response(row.response, status=row.status_code)
+                response["Idempotent-Replayed"] = "true"
+                return response
+
+            try:
+                response = view(request, *args, **kwargs)
+            except Exception:
+                IdempotencyKey.objects.filter(pk=row.pk).delete()
+                raise
+
+            if response.status_code >= 500:
+                IdempotencyKey.objects.filter(pk=row.pk).delete()
+            else:
+                IdempotencyKey.objects.filter(pk=row.pk).update(
+                    state=IdempotencyKey.STATE_DONE,
+                    status_code=response.status_code,
+                    response=response.data,
+                    expires_at=timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS),
+                )
+            return response
+
+        return wrapped
+
+    return decorator
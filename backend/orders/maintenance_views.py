@@ -46,9 +46,12 @@ def run_order_maintenance(request):
         return Response({"error": "Unauthorized."}, status=403)
 
     commands = [
+        ("process_webhook_events", ["--limit", "200"]),
         ("reconcile_pending_payments", ["--limit", "200"]),
+        ("cleanup_expired_reservations", ["--max-batches", "20"]),
         ("purge_delivered_order_media", ["--limit", "200"]),
         ("purge_failed_pending_orders", ["--limit", "200"]),
+        ("process_customization_uploads", ["--limit", "200"]),
     ]
 
     results = {}
@@ -0,0 +1,406 @@
+import itertools
+import json
+import math
+import statistics
+import time
+import tracemalloc
+from collections import Counter
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import Address
+from orders.cart_services import upsert_plain_cart_item
+from orders.models import Cart
+from orders.payment_services import create_pending_order_from_cart
+from products.management.commands.seed_perf_data import SEED_PREFIX, TITLE_NOUNS
+from products.models import Category, Product, ProductVariant
+from utils.service_fakes import (
+    fake_external_services,
+    sign_checkout_payment,
+    sign_webhook_body,
+)
+
+SCENARIOS = ("catalog", "cart", "checkout", "webhook")
+TRENDING_CACHE_KEY = "products:trending:v1"
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark catalog, cart, checkout and webhook endpoints through the "
+        "Django test client against the seed_perf_data dataset. External "
+        "services are replaced by in-process fakes and every write is rolled "
+        "back. Reports p50/p95/p99 latency, queries and peak allocations per "
+        "endpoint, optionally as JSON for diffing two runs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=SCENARIOS,
+            help="Scenario to run; repeat to run several. Defaults to all.",
+        )
+        parser.add_argument("--iterations", type=int, default=30)
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument(
+            "--profile-iterations",
+            type=int,
+            default=5,
+            help="Extra requests per endpoint used to count queries and "
+            "allocations, kept out of the latency sample.",
+        )
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+        parser.add_argument(
+            "--compare",
+            help="Previous JSON results to diff against.",
+        )
+
+    def handle(self, *args, **options):
+        scenarios = options["scenario"] or list(SCENARIOS)
+        self.iterations = max(options["iterations"], 1)
+        self.warmup = max(options["warmup"], 0)
+        self.profile_iterations = max(options["profile_iterations"], 0)
+        self.sequence = itertools.count()
+        self._load_dataset()
+
+        results = {}
+        with fake_external_services() as razorpay, override_settings(
+            ALLOWED_HOSTS=["testserver"],
+            SECURE_SSL_REDIRECT=False,
+        ):
+            self.razorpay = razorpay
+            with transaction.atomic():
+                try:
+                    for scenario in scenarios:
+                        for name, build_request in self._get_endpoints(scenario):
+                            self.stdout.write(f"Benchmarking {name}...")
+                            results[name] = self._measure(build_request)
+                finally:
+                    transaction.set_rollback(True)
+                    cache.delete(TRENDING_CACHE_KEY)
+
+        report = {
+            "meta": {
+                "created_at": timezone.now().isoformat(),
+                "database": connection.vendor,
+                "iterations": self.iterations,
+                "warmup": self.warmup,
+                "profile_iterations": self.profile_iterations,
+                "dataset": self.dataset_counts,
+            },
+            "endpoints": results,
+        }
+
+        self._write_summary(results)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output_file:
+                json.dump(report, output_file, indent=2, sort_keys=True)
+                output_file.write("\n")
+            self.stdout.write(f"Wrote results to {options['output']}.")
+        if options["compare"]:
+            self._write_comparison(options["compare"], results)
+
+        self.stdout.write(self.style.SUCCESS(f"Benchmarked {len(results)} endpoint(s)."))
+
+    def _load_dataset(self):
+        products = Product.objects.filter(slug__startswith=f"{SEED_PREFIX}-", is_active=True)
+        self.product_ids = list(products.order_by("id").values_list("id", flat=True)[:500])
+        if not self.product_ids:
+            raise CommandError("No seeded products found. Run seed_perf_data first.")
+
+        self.category_slugs = list(
+            Category.objects.filter(slug__startswith=f"{SEED_PREFIX}-")
+            .order_by("id")
+            .values_list("slug", flat=True)
+        )
+        self.addresses = list(
+            Address.objects.filter(user__username__startswith=f"{SEED_PREFIX}-user-")
+            .select_related("user")
+            .order_by("user_id")[:500]
+        )
+        if not self.addresses:
+            raise CommandError("No seeded users found. Run seed_perf_data first.")
+
+        # Lines with enough headroom that repeated checkouts keep succeeding.
+        self.purchasable_lines = [
+            (product_id, None)
+            for product_id in products.filter(stock_type="main", stock__gte=50)
+            .order_by("id")
+            .values_list("id", flat=True)[:200]
+        ] + list(
+            ProductVariant.objects.filter(product__in=products, stock__gte=50)
+            .order_by("id")
+            .values_list("product_id", "id")[:200]
+        )
+        if not self.purchasable_lines:
+            raise CommandError("Seeded catalog has no products with stock to check out.")
+
+        self.dataset_counts = {
+            "products": products.count(),
+            "variants": ProductVariant.objects.filter(product__in=products).count(),
+            "users": len(self.addresses),
+        }
+
+    def _next(self, values):
+        return values[next(self.sequence) % len(values)]
+
+    def _get_endpoints(self, scenario):
+        if scenario == "catalog":
+            endpoints = [
+                ("catalog.product_list", lambda: {"path": reverse("product-list")}),
+                (
+                    "catalog.product_detail",
+                    lambda: {
+                        "path": reverse("product-detail", args=[self._next(self.product_ids)]),
+                    },
+                ),
+                (
+                    "catalog.search",
+                    lambda: {
+                        "path": reverse("search"),
+                        "data": {"q": self._next(TITLE_NOUNS).split()[0]},
+                    },
+                ),
+                ("catalog.trending_cold", self._trending_cold_request),
+                ("catalog.trending_warm", lambda: {"path": reverse("product-trending")}),
+            ]
+            if self.category_slugs:
+                endpoints.insert(
+                    2,
+                    (
+                        "catalog.category_detail",
+                        lambda: {
+                            "path": reverse(
+                                "category-detail", args=[self._next(self.category_slugs)]
+                            ),
+                        },
+                    ),
+                )
+            return endpoints
+
+        if scenario == "cart":
+            return [
+                (
+                    "cart.get",
+                    lambda: {"path": reverse("get_cart"), "user": self._next(self.addresses).user},
+                ),
+                ("cart.add", self._cart_add_request),
+                (
+                    "cart.available_coupons",
+                    lambda: {
+                        "path": reverse("available_coupons"),
+                        "user": self._next(self.addresses).user,
+                    },
+                ),
+            ]
+
+        if scenario == "checkout":
+            return [
+                ("checkout.create_order", self._create_order_request),
+                ("checkout.verify", self._verify_request),
+            ]
+
+        return [("webhook.payment_captured", self._webhook_request)]
+
+    def _trending_cold_request(self):
+        cache.delete(TRENDING_CACHE_KEY)
+        return {"path": reverse("product-trending")}
+
+    def _cart_add_request(self):
+        product_id, variant_id = self._next(self.purchasable_lines)
+        data = {"product_id": product_id, "quantity": 1}
+        if variant_id:
+            data["variant_id"] = variant_id
+        return {
+            "method": "post",
+            "path": reverse("add_to_cart"),
+            "data": data,
+            "user": self._next(self.addresses).user,
+        }
+
+    def _prepare_checkout_cart(self):
+        address = self._next(self.addresses)
+        cart, _ = Cart.objects.get_or_create(user=address.user)
+        cart.items.all().delete()
+        for _ in range(2):
+            product_id, variant_id = self._next(self.purchasable_lines)
+            product = Product.objects.get(id=product_id)
+            variant = (
+                ProductVariant.objects.select_related("size", "color").get(id=variant_id)
+                if variant_id
+                else None
+            )
+            # Same merge_key upsert as add_to_cart, so repeated lines merge.
+            upsert_plain_cart_item(
+                cart=cart,
+                product=product,
+                variant=variant,
+                quantity=1,
+                available_stock=variant.stock if variant else product.stock,
+            )
+        return address
+
+    def _create_order_request(self):
+        address = self._prepare_checkout_cart()
+        return {
+            "method": "post",
+            "path": reverse("create_payment_order"),
+            "data": {"address_id": address.id},
+            "user": address.user,
+        }
+
+    def _create_captured_order(self):
+        address = self._prepare_checkout_cart()
+        payload = create_pending_order_from_cart(user=address.user, address_id=address.id)
+        payment = self.razorpay.capture(payload["razorpay_order"]["id"])
+        return address.user, payload["order"], payment
+
+    def _verify_request(self):
+        user, order, payment = self._create_captured_order()
+        return {
+            "method": "post",
+            "path": reverse("verify_payment"),
+            "data": {
+                "order_id": order.id,
+                "razorpay_order_id": payment["order_id"],
+                "razorpay_payment_id": payment["id"],
+                "razorpay_signature": sign_checkout_payment(payment["order_id"], payment["id"]),
+            },
+            "user": user,
+        }
+
+    def _webhook_request(self):
+        _, _, payment = self._create_captured_order()
+        body = json.dumps(
+            {"event": "payment.captured", "payload": {"payment": {"entity": payment}}}
+        ).encode("utf-8")
+        return {
+            "method": "post",
+            "path": reverse("razorpay_webhook"),
+            "body": body,
+            "headers": {"HTTP_X_RAZORPAY_SIGNATURE": sign_webhook_body(body)},
+        }
+
+    def _send(self, request):
+        client = APIClient()
+        if request.get("user") is not None:
+            client.force_authenticate(user=request["user"])
+
+        method = getattr(client, request.get("method", "get"))
+        if "body" in request:
+            return method(
+                request["path"],
+                data=request["body"],
+                content_type="application/json",
+                **request.get("headers", {}),
+            )
+        if request.get("method", "get") == "get":
+            return method(request["path"], request.get("data"), **request.get("headers", {}))
+        return method(
+            request["path"],
+            request.get("data"),
+            format="json",
+            **request.get("headers", {}),
+        )
+
+    def _measure(self, build_request):
+        for _ in range(self.warmup):
+            self._send(build_request())
+
+        latencies = []
+        status_codes = Counter()
+        for _ in range(self.iterations):
+            request = build_request()
+            started = time.perf_counter()
+            response = self._send(request)
+            latencies.append(time.perf_counter() - started)
+            status_codes[str(response.status_code)] += 1
+
+        query_counts = []
+        allocation_peaks = []
+        if self.profile_iterations:
+            tracemalloc.start()
+            try:
+                for _ in range(self.profile_iterations):
+                    request = build_request()
+                    tracemalloc.reset_peak()
+                    baseline, _ = tracemalloc.get_traced_memory()
+                    with CaptureQueriesContext(connection) as queries:
+                        response = self._send(request)
+                    _, peak = tracemalloc.get_traced_memory()
+                    query_counts.append(len(queries))
+                    allocation_peaks.append(peak - baseline)
+                    status_codes[str(response.status_code)] += 1
+            finally:
+                tracemalloc.stop()
+
+        result = {
+            "iterations": self.iterations,
+            "p50_ms": _ms(_percentile(latencies, 50)),
+            "p95_ms": _ms(_percentile(latencies, 95)),
+            "p99_ms": _ms(_percentile(latencies, 99)),
+            "mean_ms": _ms(statistics.fmean(latencies)),
+            "max_ms": _ms(max(latencies)),
+            "status_codes": dict(sorted(status_codes.items())),
+        }
+        if query_counts:
+            result.update(
+                {
+                    "queries_mean": round(statistics.fmean(query_counts), 2),
+                    "queries_max": max(query_counts),
+                    "alloc_peak_kb_p50": round(_percentile(allocation_peaks, 50) / 1024, 1),
+                    "alloc_peak_kb_max": round(max(allocation_peaks) / 1024, 1),
+                }
+            )
+        return result
+
+    def _write_summary(self, results):
+        self.stdout.write(
+            f"{'endpoint':<28} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+            f"{'queries':>8} {'peak kb':>9}  status"
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<28} {result['p50_ms']:>9} {result['p95_ms']:>9} "
+                f"{result['p99_ms']:>9} {result.get('queries_mean', '-'):>8} "
+                f"{result.get('alloc_peak_kb_p50', '-'):>9}  {result['status_codes']}"
+            )
+
+    def _write_comparison(self, path, results):
+        try:
+            with open(path, encoding="utf-8") as baseline_file:
+                baseline = json.load(baseline_file).get("endpoints", {})
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Unable to read baseline results {path}: {exc}")
+
+        self.stdout.write(f"Comparison against {path}:")
+        for name, result in results.items():
+            previous = baseline.get(name)
+            if not previous:
+                self.stdout.write(f"{name:<28} (new)")
+                continue
+
+            changes = []
+            for key in ("p50_ms", "p95_ms", "p99_ms", "queries_mean", "alloc_peak_kb_p50"):
+                if key not in result or key not in previous:
+                    continue
+                before, after = previous[key], result[key]
+                delta = f"{((after - before) / before) * 100:+.1f}%" if before else "n/a"
+                changes.append(f"{key} {before} -> {after} ({delta})")
+            self.stdout.write(f"{name:<28} " + "; ".join(changes))
@@ -1,11 +1,48 @@
+import time
+
 from django.core.management.base import BaseCommand
 
-from orders.payment_services import release_expired_reservations
+from orders.payment_services import RESERVATION_SWEEP_BATCH_SIZE, release_expired_reservations
 
 
 class Command(BaseCommand):
-    help = "Release expired stock reservations for unpaid orders."
+    help = (
+        "Release expired stock reservations for unpaid orders in bounded batches. "
+        "Run with --loop as a background sweeper."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=RESERVATION_SWEEP_BATCH_SIZE,
+            help="Reservations released per transaction.",
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            default=None,
+            help="Stop a pass after this many batches.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep sweeping instead of exiting after one pass.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=30.0,
+            help="Seconds to sleep between passes when --loop is set.",
+        )
 
     def handle(self, *args, **options):
-        released = release_expired_reservations()
-        self.stdout.write(self.style.SUCCESS(f"Released {released} expired reservation(s)."))
+        while True:
+            released = release_expired_reservations(
+                batch_size=options["batch_size"],
+                max_batches=options["max_batches"],
+            )
+            self.stdout.write(self.style.SUCCESS(f"Released {released} expired reservation(s)."))
+            if not options["loop"]:
+                return
+            time.sleep(max(options["interval"], 0.1))
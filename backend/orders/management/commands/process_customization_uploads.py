@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.customization_uploads import (
+    process_pending_customization_uploads,
+    purge_stale_customization_uploads,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Sanitize pending customization image uploads and purge uploads that "
+        "were never attached to a cart. Run with --loop as a background worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=100,
+            help="Maximum number of uploads to process per pass.",
+        )
+        parser.add_argument(
+            "--hours",
+            type=int,
+            default=None,
+            help="Age in hours after which unattached uploads are purged.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling for new uploads instead of exiting after one pass.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to sleep between passes when --loop finds nothing to do.",
+        )
+
+    def handle(self, *args, **options):
+        limit = max(options["limit"], 1)
+        while True:
+            processed = process_pending_customization_uploads(limit=limit)
+            purged = purge_stale_customization_uploads(hours=options["hours"], limit=limit)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Processed {processed} upload(s); purged {purged} stale upload(s)."
+                )
+            )
+            if not options["loop"]:
+                return
+            if not processed:
+                time.sleep(max(options["interval"], 0.1))
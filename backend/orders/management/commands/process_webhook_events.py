@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.payment_services import drain_webhook_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Process stored payment webhook events in arrival order, retrying "
+        "failures with backoff. Run with --loop as a background worker and "
+        "set WEBHOOK_WORKER_ENABLED so the webhook endpoint stops draining inline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=100,
+            help="Maximum number of events to process per pass.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling for new events instead of exiting after one pass.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to sleep between passes when --loop finds nothing to do.",
+        )
+
+    def handle(self, *args, **options):
+        limit = max(options["limit"], 1)
+        while True:
+            handled = drain_webhook_events(limit=limit)
+            self.stdout.write(self.style.SUCCESS(f"Processed {handled} webhook event(s)."))
+            if not options["loop"]:
+                return
+            if not handled:
+                time.sleep(max(options["interval"], 0.1))
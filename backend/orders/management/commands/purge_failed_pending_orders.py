@@ -8,7 +8,7 @@ from django.db import transaction
 from django.utils import timezone
 
 from orders.models import Order
-from orders.payment_services import reconcile_order_payment
+from orders.payment_services import reconcile_orders, release_order_reservations
 
 logger = logging.getLogger(__name__)
 
@@ -59,10 +59,14 @@ class Command(BaseCommand):
             .order_by("created_at")[: max(options["limit"], 1)]
         )
 
+        orders = list(queryset)
+        reconcile = not options["no_reconcile"]
+        outcomes = self._reconcile_pending(orders) if reconcile else {}
+
         deleted = 0
         skipped = 0
-        for order in queryset:
-            if not self._is_safe_to_delete(order, reconcile=not options["no_reconcile"]):
+        for order in orders:
+            if not self._is_safe_to_delete(order, reconcile=reconcile, outcomes=outcomes):
                 skipped += 1
                 continue
 
@@ -70,6 +74,7 @@ class Command(BaseCommand):
             order_number = order.order_number
             try:
                 with transaction.atomic():
+                    release_order_reservations(order)
                     order.delete()
             except Exception as exc:
                 logger.exception(
@@ -103,8 +108,32 @@ class Command(BaseCommand):
             )
         )
 
-    def _is_safe_to_delete(self, order, *, reconcile):
-        if order.status == "pending" and order.razorpay_payment_id:
+    def _needs_reconcile(self, order):
+        return order.status == "pending" and order.razorpay_payment_id
+
+    def _reconcile_pending(self, orders):
+        """
+        Reconcile every pending order with a payment id in one concurrent
+        pass. Returns ``{order_id: outcome}``; orders whose gateway state
+        could not be checked map to "razorpay_unavailable" or "reconcile_error".
+        """
+        pending = [order for order in orders if self._needs_reconcile(order)]
+        if not pending:
+            return {}
+
+        try:
+            summary = reconcile_orders(pending)
+        except ImproperlyConfigured:
+            return {order.id: "razorpay_unavailable" for order in pending}
+        except Exception as exc:
+            logger.warning("Reconciliation before purge failed error=%s", str(exc))
+            return {order.id: "reconcile_error" for order in pending}
+
+        self.stdout.write(f"Reconciliation summary: {summary.as_dict()}")
+        return summary.outcomes
+
+    def _is_safe_to_delete(self, order, *, reconcile, outcomes):
+        if self._needs_reconcile(order):
             if not reconcile:
                 logger.info(
                     "Skipping pending order_id=%s order_number=%s reason=no_reconcile",
@@ -113,9 +142,9 @@ class Command(BaseCommand):
                 )
                 return False
 
-            try:
-                reconcile_order_payment(order)
-            except ImproperlyConfigured:
+            # Orders without a Razorpay order have nothing to reconcile.
+            outcome = outcomes.get(order.id, "unpaid")
+            if outcome == "razorpay_unavailable":
                 logger.warning(
                     "Skipping pending order_id=%s order_number=%s "
                     "reason=razorpay_unavailable",
@@ -123,17 +152,17 @@ class Command(BaseCommand):
                     order.order_number,
                 )
                 return False
-            except Exception as exc:
+            if outcome in {"reconcile_error", "fetch_error", "apply_error"}:
                 logger.warning(
                     "Skipping pending order_id=%s order_number=%s "
-                    "reason=reconcile_error error=%s",
+                    "reason=reconcile_error outcome=%s",
                     order.id,
                     order.order_number,
-                    str(exc),
+                    outcome,
                 )
                 return False
 
-            if order.payment_processed:
+            if outcome == "reconciled":
                 logger.info(
                     "Skipping pending order_id=%s order_number=%s reason=now_paid",
                     order.id,
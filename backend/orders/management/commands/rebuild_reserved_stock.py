@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from orders.payment_services import release_expired_reservations, rebuild_reserved_quantities
+
+
+class Command(BaseCommand):
+    help = (
+        "Release expired stock reservations, then rebuild reserved_quantity on "
+        "products and variants from the open reservations."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report drift without writing corrections.",
+        )
+
+    def handle(self, *args, **options):
+        released = 0 if options["dry_run"] else release_expired_reservations()
+        fixes = rebuild_reserved_quantities(dry_run=options["dry_run"])
+        prefix = "Would correct" if options["dry_run"] else "Corrected"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Released {released} expired reservation(s). {prefix} "
+                f"products={fixes['products']} variants={fixes['variants']}."
+            )
+        )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from orders.coupon_counters import reconcile_coupon_usage_counters
+
+
+class Command(BaseCommand):
+    help = "Rebuild coupon usage counters from coupon usage rows and their order statuses."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report drift without writing corrections.",
+        )
+
+    def handle(self, *args, **options):
+        fixes = reconcile_coupon_usage_counters(dry_run=options["dry_run"])
+        prefix = "Would correct" if options["dry_run"] else "Corrected"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{prefix} usages={fixes['usages']} coupons={fixes['coupons']} "
+                f"user_counters={fixes['user_counters']}."
+            )
+        )
@@ -10,5 +10,13 @@ class Command(BaseCommand):
         parser.add_argument("--limit", type=int, default=50)
 
     def handle(self, *args, **options):
-        reconciled = reconcile_stale_orders(limit=options["limit"])
-        self.stdout.write(self.style.SUCCESS(f"Reconciled {reconciled} order(s)."))
+        summary = reconcile_stale_orders(limit=options["limit"]).as_dict()
+        latency = summary["fetch_latency_ms"]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Reconciled {summary['reconciled']} order(s). "
+                f"checked={summary['checked']} unpaid={summary['unpaid']} "
+                f"fetch_errors={summary['fetch_errors']} apply_errors={summary['apply_errors']} "
+                f"fetch_ms_avg={latency['avg']} fetch_ms_p95={latency['p95']} fetch_ms_max={latency['max']}"
+            )
+        )
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.hot_inventory import hot_inventory_enabled, sync_hot_inventory
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-mirror available stock of hot_inventory products into the cache from "
+        "the database. Run with --loop during a drop to keep the mirror in step."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep syncing instead of exiting after one pass.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=15.0,
+            help="Seconds to sleep between passes when --loop is set.",
+        )
+
+    def handle(self, *args, **options):
+        if not hot_inventory_enabled():
+            self.stdout.write("HOT_INVENTORY_ENABLED is off; nothing to sync.")
+            return
+
+        while True:
+            synced = sync_hot_inventory()
+            self.stdout.write(self.style.SUCCESS(f"Synced {synced} hot stock target(s)."))
+            if not options["loop"]:
+                return
+            time.sleep(max(options["interval"], 0.1))
@@ -0,0 +1,54 @@
+from django.db import migrations, models
+
+
+def backfill_cart_item_merge_keys(apps, schema_editor):
+    CartItem = apps.get_model("orders", "CartItem")
+
+    plain_items = (
+        CartItem.objects.filter(custom_images__isnull=True)
+        .filter(models.Q(custom_text__isnull=True) | models.Q(custom_text=""))
+        .filter(models.Q(custom_image__isnull=True) | models.Q(custom_image=""))
+        .order_by("id")
+    )
+
+    kept = {}
+    for item in plain_items:
+        key = (item.cart_id, f"{item.product_id}:{item.variant_id or 0}")
+        existing = kept.get(key)
+        if existing is None:
+            item.merge_key = key[1]
+            item.save(update_fields=["merge_key"])
+            kept[key] = item
+            continue
+
+        # Fold earlier duplicate plain lines into the oldest row.
+        existing.quantity += item.quantity
+        existing.save(update_fields=["quantity"])
+        item.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0025_order_exchange_approved_order_exchange_approved_at_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cartitem",
+            name="merge_key",
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(
+            backfill_cart_item_merge_keys,
+            migrations.RunPython.noop,
+        ),
+        migrations.AddConstraint(
+            model_name="cartitem",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("merge_key__isnull", False)),
+                fields=("cart", "merge_key"),
+                name="orders_cartitem_unique_plain_line",
+            ),
+        ),
+    ]
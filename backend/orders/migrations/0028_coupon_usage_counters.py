@@ -0,0 +1,85 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_coupon_usage_counters(apps, schema_editor):
+    Coupon = apps.get_model("orders", "Coupon")
+    CouponUsage = apps.get_model("orders", "CouponUsage")
+    CouponUserCounter = apps.get_model("orders", "CouponUserCounter")
+
+    active_usages = CouponUsage.objects.exclude(order__status__in=["cancelled", "failed"])
+    active_usages.update(counted=True)
+
+    for coupon_id, total in (
+        active_usages.values("coupon_id").annotate(total=Count("id")).values_list("coupon_id", "total")
+    ):
+        Coupon.objects.filter(id=coupon_id).update(used_count=total)
+
+    CouponUserCounter.objects.bulk_create(
+        [
+            CouponUserCounter(coupon_id=coupon_id, user_id=user_id, used_count=total)
+            for coupon_id, user_id, total in (
+                active_usages.values("coupon_id", "user_id")
+                .annotate(total=Count("id"))
+                .values_list("coupon_id", "user_id", "total")
+            )
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0027_customizationupload"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="coupon",
+            name="used_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="couponusage",
+            name="counted",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name="CouponUserCounter",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("used_count", models.PositiveIntegerField(default=0)),
+                (
+                    "coupon",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="user_counters",
+                        to="orders.coupon",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="coupon_counters",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("coupon", "user"),
+                        name="orders_couponusercounter_unique_coupon_user",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(
+            backfill_coupon_usage_counters,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+def backfill_reserved_quantity(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    ProductVariant = apps.get_model("products", "ProductVariant")
+    StockReservation = apps.get_model("orders", "StockReservation")
+
+    totals = {}
+    for reservation in StockReservation.objects.filter(
+        consumed_at__isnull=True,
+        released_at__isnull=True,
+    ).only("product_id", "variant_id", "quantity"):
+        if reservation.variant_id:
+            key = ("variant", reservation.variant_id)
+        else:
+            key = ("product", reservation.product_id)
+        totals[key] = totals.get(key, 0) + reservation.quantity
+
+    for (kind, target_id), total in totals.items():
+        model = ProductVariant if kind == "variant" else Product
+        model.objects.filter(id=target_id).update(reserved_quantity=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0028_coupon_usage_counters"),
+        ("products", "0032_reserved_quantity"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            backfill_reserved_quantity,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0029_backfill_reserved_quantity'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stockreservation',
+            index=models.Index(condition=models.Q(('consumed_at__isnull', True), ('released_at__isnull', True)), fields=['reserved_until'], name='orders_stockres_open_until_idx'),
+        ),
+    ]
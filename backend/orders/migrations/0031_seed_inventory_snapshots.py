@@ -0,0 +1,38 @@
+from django.db import migrations
+
+
+def seed_inventory_snapshots(apps, schema_editor):
+    # Opening balances for the ledger, taken after reserved_quantity was
+    # backfilled from open reservations.
+    Product = apps.get_model("products", "Product")
+    ProductVariant = apps.get_model("products", "ProductVariant")
+    InventorySnapshot = apps.get_model("products", "InventorySnapshot")
+
+    snapshots = [
+        InventorySnapshot(product_id=product_id, stock=stock, reserved_quantity=reserved)
+        for product_id, stock, reserved in Product.objects.values_list(
+            "id", "stock", "reserved_quantity"
+        )
+    ]
+    snapshots.extend(
+        InventorySnapshot(variant_id=variant_id, stock=stock, reserved_quantity=reserved)
+        for variant_id, stock, reserved in ProductVariant.objects.values_list(
+            "id", "stock", "reserved_quantity"
+        )
+    )
+    InventorySnapshot.objects.bulk_create(snapshots, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0030_stockreservation_open_until_index"),
+        ("products", "0034_inventory_ledger"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            seed_inventory_snapshots,
+            migrations.RunPython.noop,
+        ),
+    ]
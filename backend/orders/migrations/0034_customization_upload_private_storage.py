@@ -0,0 +1,19 @@
+# Generated by Django 5.2.10 on 2026-10-19 17:51
+
+import orders.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0033_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customizationupload',
+            name='raw_file',
+            field=models.FileField(blank=True, storage=orders.storage.PrivateUploadStorage(), upload_to='customization_uploads/'),
+        ),
+    ]
@@ -3,10 +3,13 @@ from decimal import Decimal
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 from products.models import Category, Product, ProductVariant, SubCategory
 
+from .storage import PrivateUploadStorage
+
 def generate_order_token():
     suffix = secrets.token_hex(3).upper()
     return f"PFW-{suffix}"
@@ -51,6 +54,8 @@ class Coupon(models.Model):
     )
     usage_limit = models.PositiveIntegerField(blank=True, null=True)
     usage_limit_per_user = models.PositiveIntegerField(blank=True, null=True)
+    # Maintained by orders.coupon_counters; rebuilt by reconcile_coupon_usage.
+    used_count = models.PositiveIntegerField(default=0, editable=False)
     first_order_only = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     start_date = models.DateTimeField(default=timezone.now)
@@ -85,12 +90,32 @@ class CouponUsage(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="coupon_usages")
     order = models.ForeignKey("Order", on_delete=models.CASCADE, related_name="coupon_usages")
     discount_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    # True while this usage is included in the coupon counters, i.e. while the
+    # order is not cancelled or failed.
+    counted = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ["-created_at"]
         unique_together = ("coupon", "order")
 
+
+class CouponUserCounter(models.Model):
+    coupon = models.ForeignKey(Coupon, on_delete=models.CASCADE, related_name="user_counters")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="coupon_counters")
+    used_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["coupon", "user"],
+                name="orders_couponusercounter_unique_coupon_user",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.coupon.code} x{self.used_count} for {self.user_id}"
+
 class CartItem(models.Model):
 
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
@@ -118,8 +143,23 @@ class CartItem(models.Model):
         null=True
     )
 
+    # Set only on non-customized lines so repeat adds of the same product and
+    # variant merge into one row; customized lines stay NULL and never merge.
+    merge_key = models.CharField(max_length=64, null=True, blank=True, editable=False)
+
     class Meta:
         ordering = ["-id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["cart", "merge_key"],
+                condition=models.Q(merge_key__isnull=False),
+                name="orders_cartitem_unique_plain_line",
+            ),
+        ]
+
+    @staticmethod
+    def build_merge_key(product_id, variant_id=None):
+        return f"{product_id}:{variant_id or 0}"
 
     def capture_variant_snapshot(self, variant=None):
         variant = variant if variant is not None else self.variant
@@ -356,6 +396,13 @@ class StockReservation(models.Model):
 
     class Meta:
         ordering = ["id"]
+        indexes = [
+            models.Index(
+                fields=["reserved_until"],
+                name="orders_stockres_open_until_idx",
+                condition=models.Q(consumed_at__isnull=True, released_at__isnull=True),
+            ),
+        ]
 
     def __str__(self):
         target = self.variant or self.product
@@ -381,3 +428,130 @@ class MediaCleanupTask(models.Model):
 
     def __str__(self):
         return f"{self.scope}: {self.file_name}"
+
+
+class CustomizationUpload(models.Model):
+    """
+    A customization image uploaded ahead of ``add_to_cart``. The raw file is
+    streamed to storage by the upload endpoint and sanitized later; cart adds
+    then reference ready uploads by id instead of carrying the files.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_READY = "ready"
+    STATUS_REJECTED = "rejected"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_READY, "Ready"),
+        (STATUS_REJECTED, "Rejected"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="customization_uploads")
+    raw_file = models.FileField(
+        upload_to="customization_uploads/",
+        storage=PrivateUploadStorage(),
+        blank=True,
+    )
+    image = models.ImageField(upload_to="custom_orders/", blank=True)
+    original_name = models.CharField(max_length=255, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="orders_upload_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"Upload {self.id} ({self.status})"
+
+
+class WebhookEvent(models.Model):
+    """
+    Inbox row for a verified payment-provider webhook. The endpoint only
+    stores the event; ``process_webhook_events`` drains the inbox with
+    retries, and the (provider, event_id) constraint makes redeliveries no-ops.
+    """
+
+    PROVIDER_RAZORPAY = "razorpay"
+
+    STATUS_PENDING = "pending"
+    STATUS_PROCESSED = "processed"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_PROCESSED, "Processed"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    provider = models.CharField(max_length=20, default=PROVIDER_RAZORPAY)
+    event_id = models.CharField(max_length=128)
+    event_type = models.CharField(max_length=64, blank=True)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    result = models.JSONField(default=dict, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["provider", "event_id"],
+                name="orders_webhookevent_unique_provider_event",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["next_attempt_at", "id"],
+                name="orders_webhook_pending_idx",
+                condition=models.Q(status="pending"),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.provider} {self.event_type or 'event'} {self.event_id} ({self.status})"
+
+
+class IdempotencyKey(models.Model):
+    """
+    A claimed ``Idempotency-Key`` for one user and endpoint. The row is
+    created ``pending`` when the request starts and stores the response once
+    it finishes, so a repeat with the same key replays it on any worker.
+    """
+
+    STATE_PENDING = "pending"
+    STATE_DONE = "done"
+    STATE_CHOICES = [
+        (STATE_PENDING, "Pending"),
+        (STATE_DONE, "Done"),
+    ]
+
+    scope = models.CharField(max_length=50)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="idempotency_keys")
+    key_hash = models.CharField(max_length=64)
+    fingerprint = models.CharField(max_length=64)
+    state = models.CharField(max_length=20, choices=STATE_CHOICES, default=STATE_PENDING)
+    status_code = models.PositiveSmallIntegerField(blank=True, null=True)
+    response = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["scope", "user", "key_hash"],
+                name="orders_idempotencykey_unique_scope_user_key",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} key for user {self.user_id} ({self.state})"
@@ -3,20 +3,31 @@ import hmac
 import json
 import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import timedelta
 from decimal import Decimal, ROUND_HALF_UP
 
 import razorpay
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
-from django.db import transaction
-from django.db.models import Sum
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
 from django.utils import timezone
 
 from accounts.models import Address
-from products.models import Product, ProductVariant
+from products.caching import bump_catalog_version
+from products.inventory_ledger import build_inventory_movements, record_inventory_movements
+from products.models import InventoryMovement, Product, ProductVariant
 from utils.delhivery_service import DelhiveryService, DelhiveryServiceError
+from utils.rate_limit import TokenBucket
 
+from .cart_cache import bump_cart_version
+from .cart_quotes import load_cart_quote
+from .hot_inventory import HotInventorySoldOut, return_hot_inventory, take_hot_inventory
 from .email_services import (
     send_order_confirmation_email,
     send_store_order_notification,
@@ -30,16 +41,22 @@ from .models import (
     OrderItem,
     OrderItemImage,
     StockReservation,
+    WebhookEvent,
 )
 from .views import (
     evaluate_coupon_for_cart,
     get_cart_line_items,
     get_coupon_queryset,
+    get_coupon_usage_block_reason,
     get_product_price,
-    resolve_cart_item_variant,
+    load_coupon_usage_context,
+    resolve_cart_item_variants,
 )
 
 PAISE_MULTIPLIER = Decimal("100")
+RESERVATION_SWEEP_BATCH_SIZE = 500
+WEBHOOK_PROCESSING_LEASE_SECONDS = 300
+WEBHOOK_RETRY_MAX_SECONDS = 3600
 logger = logging.getLogger(__name__)
 
 
@@ -186,33 +203,189 @@ def get_reservation_expiry():
     )
 
 
-def release_expired_reservations(*, now=None):
+def get_reservation_target_key(reservation):
+    if reservation.variant_id:
+        return ("variant", reservation.variant_id)
+    return ("product", reservation.product_id)
+
+
+def apply_reserved_quantity_deltas(deltas):
+    """
+    Add ``{("product" | "variant", id): delta}`` to ``reserved_quantity`` with
+    one ``CASE`` UPDATE per model, locking the rows in id order first.
+    """
+    for kind, model in (("product", Product), ("variant", ProductVariant)):
+        by_id = {
+            target_id: delta
+            for (target_kind, target_id), delta in deltas.items()
+            if target_kind == kind and target_id and delta
+        }
+        if not by_id:
+            continue
+
+        locked_ids = list(
+            model.objects.select_for_update()
+            .filter(id__in=by_id)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        model.objects.filter(id__in=locked_ids).update(
+            reserved_quantity=Greatest(
+                F("reserved_quantity")
+                + Case(
+                    *[When(id=target_id, then=Value(delta)) for target_id, delta in by_id.items()],
+                    default=Value(0),
+                    output_field=IntegerField(),
+                ),
+                Value(0),
+            )
+        )
+
+
+def get_reservation_deltas(reservations, sign):
+    deltas = {}
+    for reservation in reservations:
+        key = get_reservation_target_key(reservation)
+        deltas[key] = deltas.get(key, 0) + sign * reservation.quantity
+    return deltas
+
+
+def release_reservations(queryset, *, now=None):
+    """Release the open reservations in ``queryset`` and their reserved counters."""
     now = now or timezone.now()
+    with transaction.atomic():
+        reservations = list(
+            queryset.filter(consumed_at__isnull=True, released_at__isnull=True)
+            .select_for_update()
+            .only("id", "order_id", "product_id", "variant_id", "quantity")
+        )
+        if not reservations:
+            return 0
+
+        StockReservation.objects.filter(
+            id__in=[reservation.id for reservation in reservations]
+        ).update(released_at=now)
+        apply_reserved_quantity_deltas(get_reservation_deltas(reservations, -1))
+
+        reservations_by_order = {}
+        for reservation in reservations:
+            reservations_by_order.setdefault(reservation.order_id, []).append(reservation)
+        order_numbers = dict(
+            Order.objects.filter(id__in=reservations_by_order).values_list("id", "order_number")
+        )
+        InventoryMovement.objects.bulk_create(
+            [
+                movement
+                for order_id, order_reservations in reservations_by_order.items()
+                for movement in build_inventory_movements(
+                    InventoryMovement.KIND_RELEASE,
+                    reserved=get_reservation_deltas(order_reservations, -1),
+                    reference=order_numbers.get(order_id, ""),
+                )
+            ]
+        )
+    return_hot_inventory(get_reservation_deltas(reservations, 1))
+    return len(reservations)
+
+
+def get_expired_reservations(now):
+    # Served by the orders_stockres_open_until_idx partial index.
     return StockReservation.objects.filter(
         consumed_at__isnull=True,
         released_at__isnull=True,
         reserved_until__lt=now,
-    ).update(released_at=now)
+    )
 
 
-def get_active_reserved_quantity(*, product_id=None, variant_id=None):
-    filters = {
-        "consumed_at__isnull": True,
-        "released_at__isnull": True,
-        "reserved_until__gte": timezone.now(),
-    }
-    if variant_id is not None:
-        filters["variant_id"] = variant_id
-    else:
-        filters["product_id"] = product_id
-        filters["variant_id__isnull"] = True
+def release_expired_reservations(*, now=None, batch_size=RESERVATION_SWEEP_BATCH_SIZE, max_batches=None):
+    """
+    Sweep expired reservations in batches of ``batch_size``, each released in
+    its own transaction. Run by ``cleanup_expired_reservations``.
+    """
+    now = now or timezone.now()
+    batch_size = max(int(batch_size), 1)
+    released = 0
+    batches = 0
+    while True:
+        reservation_ids = list(
+            get_expired_reservations(now)
+            .order_by("reserved_until")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not reservation_ids:
+            break
 
-    return (
-        StockReservation.objects.filter(**filters).aggregate(total=Sum("quantity"))["total"]
-        or 0
+        released += release_reservations(
+            StockReservation.objects.filter(id__in=reservation_ids),
+            now=now,
+        )
+        batches += 1
+        if len(reservation_ids) < batch_size or (max_batches and batches >= max_batches):
+            break
+    return released
+
+
+def release_expired_reservations_for_targets(target_keys, *, now=None):
+    """Release expired holds on the given ``("product" | "variant", id)`` stock targets only."""
+    product_ids = {target_id for kind, target_id in target_keys if kind == "product" and target_id}
+    variant_ids = {target_id for kind, target_id in target_keys if kind == "variant" and target_id}
+    if not product_ids and not variant_ids:
+        return 0
+
+    now = now or timezone.now()
+    return release_reservations(
+        get_expired_reservations(now).filter(
+            Q(variant_id__in=variant_ids)
+            | Q(variant_id__isnull=True, product_id__in=product_ids)
+        ),
+        now=now,
     )
 
 
+def get_stock_target_key(item):
+    if item.product.stock_type == "variants":
+        return ("variant", item.variant_id)
+    return ("product", item.product_id)
+
+
+def rebuild_reserved_quantities(*, dry_run=False):
+    """
+    Rebuild ``reserved_quantity`` on products and variants from open
+    reservations. Returns ``{"products": n, "variants": n}`` corrected rows.
+    """
+    fixes = {}
+    with transaction.atomic():
+        expected = {}
+        for reservation in StockReservation.objects.filter(
+            consumed_at__isnull=True,
+            released_at__isnull=True,
+        ).only("product_id", "variant_id", "quantity"):
+            key = get_reservation_target_key(reservation)
+            expected[key] = expected.get(key, 0) + reservation.quantity
+
+        for kind, model in (("product", Product), ("variant", ProductVariant)):
+            expected_by_id = {
+                target_id: total
+                for (target_kind, target_id), total in expected.items()
+                if target_kind == kind and target_id
+            }
+            stale = []
+            for target in (
+                model.objects.select_for_update()
+                .filter(Q(id__in=expected_by_id) | Q(reserved_quantity__gt=0))
+                .only("id", "reserved_quantity")
+                .order_by("id")
+            ):
+                total = expected_by_id.get(target.id, 0)
+                if target.reserved_quantity != total:
+                    target.reserved_quantity = total
+                    stale.append(target)
+            if stale and not dry_run:
+                model.objects.bulk_update(stale, ["reserved_quantity"])
+            fixes[f"{kind}s"] = len(stale)
+    return fixes
+
+
 def lock_stock_targets_for_items(items):
     product_ids = sorted(
         {
@@ -235,9 +408,11 @@ def lock_stock_targets_for_items(items):
 
 
 def validate_cart_item_stock(cart_items):
+    resolve_cart_item_variants(cart_items, persist=True)
+
     for item in cart_items:
         product = item.product
-        variant = resolve_cart_item_variant(item, persist=True)
+        variant = item.variant
 
         if not product.is_active:
             raise PaymentError(f"{product.title} is no longer available.")
@@ -260,7 +435,38 @@ def validate_cart_item_stock(cart_items):
             )
 
 
-def build_cart_pricing_snapshot(user, coupon_code=""):
+def build_quoted_pricing_snapshot(user, quote, cart, cart_items):
+    """
+    Reuse the totals of a current cart quote. Returns ``None`` when the
+    quoted coupon changed or is no longer usable, so the caller re-prices.
+    """
+    applied_coupon = None
+    if quote["coupon"]:
+        applied_coupon = (
+            get_coupon_queryset().prefetch_related(None).filter(code=quote["coupon"]).first()
+        )
+        if (
+            applied_coupon is None
+            or applied_coupon.updated_at.isoformat() != quote["coupon_updated_at"]
+        ):
+            return None
+
+        usage_context = load_coupon_usage_context([applied_coupon], user)
+        if get_coupon_usage_block_reason(applied_coupon, usage_context):
+            return None
+
+    return {
+        "cart": cart,
+        "cart_items": cart_items,
+        "subtotal_amount": quote["subtotal_amount"],
+        "discount_amount": quote["discount_amount"],
+        "total_amount": quote["subtotal_amount"] - quote["discount_amount"],
+        "applied_coupon": applied_coupon,
+        "quoted": True,
+    }
+
+
+def build_cart_pricing_snapshot(user, coupon_code="", quote=""):
     cart, cart_items = get_checkout_cart_queryset(user)
     cart_items = list(cart_items)
 
@@ -269,6 +475,17 @@ def build_cart_pricing_snapshot(user, coupon_code=""):
 
     validate_cart_item_stock(cart_items)
 
+    current_quote = load_cart_quote(quote, user=user, coupon_code=coupon_code)
+    if current_quote:
+        snapshot = build_quoted_pricing_snapshot(user, current_quote, cart, cart_items)
+        if snapshot:
+            return snapshot
+
+    return price_cart_items(user, cart, cart_items, coupon_code)
+
+
+def price_cart_items(user, cart, cart_items, coupon_code=""):
+    """Price ``cart_items`` from the current product rows and apply the coupon."""
     line_items = get_cart_line_items(cart_items)
     subtotal_amount = sum((item["line_total"] for item in line_items), Decimal("0.00"))
     discount_amount = Decimal("0.00")
@@ -300,8 +517,8 @@ def build_cart_pricing_snapshot(user, coupon_code=""):
     }
 
 
-def build_checkout_snapshot(user, address_id, coupon_code=""):
-    snapshot = build_cart_pricing_snapshot(user, coupon_code)
+def build_checkout_snapshot(user, address_id, coupon_code="", quote=""):
+    snapshot = build_cart_pricing_snapshot(user, coupon_code, quote)
 
     try:
         address = Address.objects.get(id=address_id, user=user)
@@ -313,31 +530,68 @@ def build_checkout_snapshot(user, address_id, coupon_code=""):
     return snapshot
 
 
-def create_pending_order_from_cart(*, user, address_id, coupon_code=""):
-    snapshot = build_checkout_snapshot(user, address_id, coupon_code)
-    client = get_razorpay_client()
-    key_id, _ = get_razorpay_credentials()
+def reserve_pending_order(*, user, snapshot):
+    """
+    Phase one of checkout: check stock under lock, then create the pending
+    order with its items and reservations. Commits before the gateway call.
+    """
+    # Expired holds on this cart's stock are released in their own short
+    # transaction; everything else is left to the background sweeper.
+    release_expired_reservations_for_targets(
+        {get_stock_target_key(item) for item in snapshot["cart_items"]}
+    )
 
     with transaction.atomic():
-        release_expired_reservations()
         products_by_id, variants_by_id = lock_stock_targets_for_items(snapshot["cart_items"])
 
+        # Lines sharing a stock target (e.g. differently customized copies)
+        # are checked against it together.
+        requested_by_target = {}
+        for item in snapshot["cart_items"]:
+            key = get_stock_target_key(item)
+            requested_by_target[key] = requested_by_target.get(key, 0) + item.quantity
+
         for item in snapshot["cart_items"]:
             product = item.product
+            key = get_stock_target_key(item)
             if product.stock_type == "variants":
-                variant = variants_by_id.get(item.variant_id)
-                available_stock = variant.stock if variant else 0
-                reserved_stock = get_active_reserved_quantity(variant_id=item.variant_id)
+                target = variants_by_id.get(item.variant_id)
             else:
-                locked_product = products_by_id.get(item.product_id)
-                available_stock = locked_product.stock if locked_product else 0
-                reserved_stock = get_active_reserved_quantity(product_id=item.product_id)
+                target = products_by_id.get(item.product_id)
 
-            if item.quantity > max(0, available_stock - reserved_stock):
+            available_stock = target.available_stock if target else 0
+            if requested_by_target[key] > available_stock:
                 raise PaymentError(
                     f"{product.title} no longer has enough stock to start payment."
                 )
 
+        prices = []
+        for item in snapshot["cart_items"]:
+            if item.product.stock_type == "variants":
+                price = item.variant.slashed_price or item.variant.mrp or Decimal("0.00")
+            else:
+                price = get_product_price(item.product) or Decimal("0.00")
+            prices.append(Decimal(price))
+
+        items_subtotal = sum(
+            (price * item.quantity for price, item in zip(prices, snapshot["cart_items"])),
+            Decimal("0.00"),
+        )
+        if snapshot.get("quoted") and items_subtotal != snapshot["subtotal_amount"]:
+            # The quote was checked against version counters that may not have
+            # seen the latest cart or price change; never charge a total the
+            # order items do not add up to.
+            coupon = snapshot["applied_coupon"]
+            snapshot = {
+                **snapshot,
+                **price_cart_items(
+                    user,
+                    snapshot["cart"],
+                    snapshot["cart_items"],
+                    coupon.code if coupon else "",
+                ),
+            }
+
         order = Order.objects.create(
             user=user,
             subtotal_amount=snapshot["subtotal_amount"],
@@ -363,48 +617,88 @@ def create_pending_order_from_cart(*, user, address_id, coupon_code=""):
             status="pending",
         )
 
-        for item in snapshot["cart_items"]:
+        reserved_until = get_reservation_expiry()
+        order_items = []
+        item_images = []
+        reservations = []
+        for item, price in zip(snapshot["cart_items"], prices):
             product = item.product
             variant = item.variant
-            if product.stock_type == "variants":
-                price = variant.slashed_price or variant.mrp or Decimal("0.00")
-            else:
-                price = get_product_price(product) or Decimal("0.00")
-
-            order_item = OrderItem.objects.create(
+            custom_images = list(item.custom_images.all())
+            order_item = OrderItem(
                 order=order,
                 product=product,
                 variant=variant,
                 quantity=item.quantity,
                 price=price,
                 custom_text=item.custom_text,
-                custom_image=item.custom_image if not item.custom_images.exists() else None,
+                custom_image=item.custom_image if not custom_images else None,
             )
             order_item.capture_product_snapshot(product=product, variant=variant)
-            order_item.save(update_fields=[
-                "product_title",
-                "product_slug",
-                "product_image",
-                "product_category_name",
-                "product_category_slug",
-                "product_sub_category_name",
-                "product_sub_category_slug",
-                "variant_size_name",
-                "variant_color_name",
-                "variant_sku",
-            ])
-
-            for image in item.custom_images.all():
-                OrderItemImage.objects.create(order_item=order_item, image=image.image)
-
-            StockReservation.objects.create(
-                order=order,
-                product=product if product.stock_type != "variants" else None,
-                variant=variant if product.stock_type == "variants" else None,
-                quantity=item.quantity,
-                reserved_until=get_reservation_expiry(),
+            order_items.append(order_item)
+            item_images.append(custom_images)
+
+            reservations.append(
+                StockReservation(
+                    order=order,
+                    product=product if product.stock_type != "variants" else None,
+                    variant=variant if product.stock_type == "variants" else None,
+                    quantity=item.quantity,
+                    reserved_until=reserved_until,
+                )
             )
 
+        OrderItem.objects.bulk_create(order_items)
+        OrderItemImage.objects.bulk_create(
+            [
+                OrderItemImage(order_item=order_item, image=image.image)
+                for order_item, custom_images in zip(order_items, item_images)
+                for image in custom_images
+            ]
+        )
+        StockReservation.objects.bulk_create(reservations)
+        apply_reserved_quantity_deltas(requested_by_target)
+        record_inventory_movements(
+            InventoryMovement.KIND_RESERVATION,
+            reserved=requested_by_target,
+            reference=order.order_number,
+        )
+
+    return order
+
+
+def abandon_pending_order(order, *, reason):
+    """Compensate a reserved order whose gateway order could not be created."""
+    release_order_reservations(order)
+    order.status = "failed"
+    order.save(update_fields=["status", "updated_at"])
+    logger.warning(
+        "Payment order create failed order_id=%s order_number=%s reason=%s",
+        order.id,
+        order.order_number,
+        reason,
+    )
+
+
+def create_pending_order_from_cart(*, user, address_id, coupon_code="", quote=""):
+    snapshot = build_checkout_snapshot(user, address_id, coupon_code, quote)
+    client = get_razorpay_client()
+    key_id, _ = get_razorpay_credentials()
+
+    try:
+        hot_units = take_hot_inventory(snapshot["cart_items"])
+    except HotInventorySoldOut as exc:
+        raise PaymentError(str(exc)) from exc
+
+    try:
+        order = reserve_pending_order(user=user, snapshot=snapshot)
+    except Exception:
+        return_hot_inventory(hot_units)
+        raise
+
+    # Phase two runs without row locks so a slow gateway does not stall
+    # other checkouts of the same products.
+    try:
         razorpay_order = client.order.create(
             {
                 "amount": amount_to_paise(order.total_amount),
@@ -418,9 +712,13 @@ def create_pending_order_from_cart(*, user, address_id, coupon_code=""):
                 },
             }
         )
+        razorpay_order_id = razorpay_order["id"]
+    except Exception as exc:
+        abandon_pending_order(order, reason=str(exc) or exc.__class__.__name__)
+        raise
 
-        order.razorpay_order_id = razorpay_order["id"]
-        order.save(update_fields=["razorpay_order_id", "updated_at"])
+    order.razorpay_order_id = razorpay_order_id
+    order.save(update_fields=["razorpay_order_id", "updated_at"])
 
     return {
         "key_id": key_id,
@@ -450,6 +748,37 @@ def lock_inventory_for_order(order):
     return order_items, products_by_id, variants_by_id
 
 
+def _per_target_case(values):
+    return Case(
+        *[When(id=target_id, then=Value(quantity)) for target_id, quantity in values.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def _deduct_stock_targets(model, quantities, reserved):
+    """
+    One guarded UPDATE per table: deduct ``quantities`` from ``stock`` and the
+    consumed ``reserved`` units from ``reserved_quantity``. Rows without
+    enough stock are left untouched, so the affected-row count doubles as the
+    oversell check.
+    """
+    if not quantities:
+        return True
+
+    updated = model.objects.filter(
+        id__in=quantities,
+        stock__gte=_per_target_case(quantities),
+    ).update(
+        stock=F("stock") - _per_target_case(quantities),
+        reserved_quantity=Greatest(
+            F("reserved_quantity") - _per_target_case(reserved),
+            Value(0),
+        ),
+    )
+    return updated == len(quantities)
+
+
 def deduct_stock_for_order(order):
     order_items, products_by_id, variants_by_id = lock_inventory_for_order(order)
     reservations = list(
@@ -458,57 +787,68 @@ def deduct_stock_for_order(order):
             released_at__isnull=True,
         )
     )
-    reservations_by_target = {}
-    for reservation in reservations:
-        key = ("variant", reservation.variant_id) if reservation.variant_id else ("product", reservation.product_id)
-        reservations_by_target[key] = reservations_by_target.get(key, 0) + reservation.quantity
-
-    for item in order_items:
-        product = item.product
-        if item.variant_id:
-            variant = variants_by_id.get(item.variant_id)
-            available_stock = variant.stock if variant else 0
-            reserved_stock = reservations_by_target.get(("variant", item.variant_id), 0)
-            if item.quantity > available_stock or reserved_stock < item.quantity:
-                raise PaymentError(
-                    f"{product.title} no longer has enough stock to complete payment."
-                )
-        else:
-            locked_product = products_by_id.get(item.product_id)
-            available_stock = locked_product.stock if locked_product else 0
-            reserved_stock = reservations_by_target.get(("product", item.product_id), 0)
-            if item.quantity > available_stock or reserved_stock < item.quantity:
-                raise PaymentError(
-                    f"{product.title} no longer has enough stock to complete payment."
-                )
+    reserved_by_target = get_reservation_deltas(reservations, 1)
 
+    required_by_target = {}
+    products_by_target = {}
     for item in order_items:
-        if item.variant_id:
-            variant = variants_by_id[item.variant_id]
-            variant.stock -= item.quantity
-            variant.save(update_fields=["stock"])
-        else:
-            locked_product = products_by_id[item.product_id]
-            locked_product.stock -= item.quantity
-            locked_product.save(update_fields=["stock"])
+        key = ("variant", item.variant_id) if item.variant_id else ("product", item.product_id)
+        required_by_target[key] = required_by_target.get(key, 0) + item.quantity
+        products_by_target.setdefault(key, item.product)
+
+    def stock_conflict(key):
+        product = products_by_target[key]
+        return PaymentError(f"{product.title} no longer has enough stock to complete payment.")
+
+    for key, quantity in required_by_target.items():
+        if reserved_by_target.get(key, 0) < quantity:
+            raise stock_conflict(key)
+
+    for kind, model, locked_by_id in (
+        ("variant", ProductVariant, variants_by_id),
+        ("product", Product, products_by_id),
+    ):
+        quantities = {
+            target_id: quantity
+            for (target_kind, target_id), quantity in required_by_target.items()
+            if target_kind == kind
+        }
+        reserved = {target_id: reserved_by_target[(kind, target_id)] for target_id in quantities}
+        if not _deduct_stock_targets(model, quantities, reserved):
+            # Raising rolls back the capture transaction, including any table
+            # already updated above.
+            short_id = next(
+                (
+                    target_id
+                    for target_id, quantity in quantities.items()
+                    if target_id not in locked_by_id or locked_by_id[target_id].stock < quantity
+                ),
+                next(iter(quantities)),
+            )
+            raise stock_conflict((kind, short_id))
 
-    now = timezone.now()
-    for reservation in reservations:
-        reservation.consumed_at = now
-        reservation.save(update_fields=["consumed_at"])
+    order.stock_reservations.filter(
+        id__in=[reservation.id for reservation in reservations]
+    ).update(consumed_at=timezone.now())
+    record_inventory_movements(
+        InventoryMovement.KIND_SALE,
+        stock={key: -quantity for key, quantity in required_by_target.items()},
+        reserved=get_reservation_deltas(reservations, -1),
+        reference=order.order_number,
+    )
+    # Queryset updates skip the catalog signals, so invalidate explicitly.
+    bump_catalog_version()
 
 
 def release_order_reservations(order):
-    order.stock_reservations.filter(
-        consumed_at__isnull=True,
-        released_at__isnull=True,
-    ).update(released_at=timezone.now())
+    release_reservations(order.stock_reservations.all())
 
 
 def clear_user_cart(user):
     cart = Cart.objects.filter(user=user).first()
     if cart:
         CartItem.objects.filter(cart=cart).delete()
+        bump_cart_version(user.id)
 
 
 def ensure_coupon_usage(order):
@@ -765,7 +1105,11 @@ def process_refund_webhook(payload):
     return order
 
 
-def process_razorpay_webhook(*, body, signature):
+def record_razorpay_webhook(*, body, signature, event_id=""):
+    """
+    Verify a webhook and store it in the inbox for ``drain_webhook_events``.
+    Returns ``(event, created)``; redeliveries return the stored event.
+    """
     if not verify_razorpay_webhook_signature(body=body, signature=signature):
         raise PaymentError("Webhook signature verification failed.")
 
@@ -773,7 +1117,121 @@ def process_razorpay_webhook(*, body, signature):
         payload = json.loads(body.decode("utf-8"))
     except (UnicodeDecodeError, json.JSONDecodeError) as exc:
         raise PaymentError("Invalid webhook payload.") from exc
+    if not isinstance(payload, dict):
+        raise PaymentError("Invalid webhook payload.")
+
+    # Razorpay sends X-Razorpay-Event-Id; fall back to the body hash so
+    # identical redeliveries still collapse onto one row.
+    event_id = str(event_id or "").strip()[:128] or hashlib.sha256(body).hexdigest()
+    try:
+        with transaction.atomic():
+            event = WebhookEvent.objects.create(
+                provider=WebhookEvent.PROVIDER_RAZORPAY,
+                event_id=event_id,
+                event_type=str(payload.get("event") or "")[:64],
+                payload=payload,
+            )
+    except IntegrityError:
+        return (
+            WebhookEvent.objects.get(provider=WebhookEvent.PROVIDER_RAZORPAY, event_id=event_id),
+            False,
+        )
+    return event, True
+
+
+def get_webhook_retry_delay(attempts):
+    delay = settings.WEBHOOK_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(delay, WEBHOOK_RETRY_MAX_SECONDS))
+
+
+def process_webhook_event(event):
+    """Handle one claimed inbox event and record the outcome on it."""
+    try:
+        result = handle_razorpay_webhook_payload(event.payload)
+    except PaymentError as exc:
+        # The event cannot be settled (unknown order, malformed payload);
+        # retrying would not change that.
+        logger.warning(
+            "Razorpay webhook event failed event_id=%s event=%s error=%s",
+            event.event_id,
+            event.event_type,
+            exc,
+        )
+        event.status = WebhookEvent.STATUS_FAILED
+        event.last_error = str(exc)
+    except Exception as exc:
+        logger.exception(
+            "Razorpay webhook event errored event_id=%s event=%s attempts=%s",
+            event.event_id,
+            event.event_type,
+            event.attempts,
+        )
+        event.last_error = f"{exc.__class__.__name__}: {exc}"
+        if event.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+            event.status = WebhookEvent.STATUS_FAILED
+        else:
+            event.next_attempt_at = timezone.now() + get_webhook_retry_delay(event.attempts)
+    else:
+        event.status = WebhookEvent.STATUS_PROCESSED
+        event.result = result
+        event.last_error = ""
+
+    if event.status != WebhookEvent.STATUS_PENDING:
+        event.processed_at = timezone.now()
+    event.save(update_fields=["status", "next_attempt_at", "last_error", "result", "processed_at"])
+    return event
+
+
+def _claim_webhook_event(event_id, now):
+    """
+    Claim a due inbox event by pushing ``next_attempt_at`` past a lease, so
+    concurrent workers skip it and an event held by a crashed worker is
+    retried once the lease ends. Returns whether this caller got it.
+    """
+    return bool(
+        WebhookEvent.objects.filter(
+            id=event_id,
+            status=WebhookEvent.STATUS_PENDING,
+            next_attempt_at__lte=now,
+        ).update(
+            next_attempt_at=timezone.now() + timedelta(seconds=WEBHOOK_PROCESSING_LEASE_SECONDS),
+            attempts=F("attempts") + 1,
+        )
+    )
+
 
+def settle_webhook_event(event_id):
+    """Process one stored event now if it is still due and unclaimed."""
+    if not _claim_webhook_event(event_id, timezone.now()):
+        return None
+    return process_webhook_event(WebhookEvent.objects.get(id=event_id))
+
+
+def drain_webhook_events(*, limit=100):
+    """
+    Process due inbox events in arrival order. Returns the number of events
+    handled.
+    """
+    now = timezone.now()
+    event_ids = list(
+        WebhookEvent.objects.filter(
+            status=WebhookEvent.STATUS_PENDING,
+            next_attempt_at__lte=now,
+        )
+        .order_by("id")
+        .values_list("id", flat=True)[:limit]
+    )
+
+    handled = 0
+    for event_id in event_ids:
+        if not _claim_webhook_event(event_id, now):
+            continue
+        process_webhook_event(WebhookEvent.objects.get(id=event_id))
+        handled += 1
+    return handled
+
+
+def handle_razorpay_webhook_payload(payload):
     event = payload.get("event") or ""
     if event in {"refund.created", "refund.processed", "refund.failed"}:
         with transaction.atomic():
@@ -843,6 +1301,17 @@ def process_razorpay_webhook(*, body, signature):
     }
 
 
+def apply_captured_payment(order, payment):
+    """Settle ``order`` with a captured ``payment`` entity in one short transaction."""
+    with transaction.atomic():
+        locked_order = Order.objects.select_for_update().select_related("user").get(id=order.id)
+        return process_captured_payment_with_stock_safety(
+            order=locked_order,
+            razorpay_order_id=locked_order.razorpay_order_id,
+            razorpay_payment_id=payment.get("id", ""),
+        )
+
+
 def reconcile_order_payment(order):
     if order.payment_processed or not order.razorpay_order_id:
         return order
@@ -853,13 +1322,126 @@ def reconcile_order_payment(order):
     if not successful_payment:
         return order
 
-    with transaction.atomic():
-        locked_order = Order.objects.select_for_update().select_related("user").get(id=order.id)
-        return process_captured_payment_with_stock_safety(
-            order=locked_order,
-            razorpay_order_id=locked_order.razorpay_order_id,
-            razorpay_payment_id=successful_payment.get("id", ""),
-        )
+    return apply_captured_payment(order, successful_payment)
+
+
+@dataclass
+class ReconciliationSummary:
+    checked: int = 0
+    reconciled: int = 0
+    unpaid: int = 0
+    fetch_errors: int = 0
+    apply_errors: int = 0
+    fetch_seconds: list = field(default_factory=list)
+    # order id -> "reconciled" | "unpaid" | "fetch_error" | "apply_error"
+    outcomes: dict = field(default_factory=dict)
+
+    def record(self, order_id, outcome):
+        self.outcomes[order_id] = outcome
+        if outcome == "reconciled":
+            self.reconciled += 1
+        elif outcome == "unpaid":
+            self.unpaid += 1
+        elif outcome == "fetch_error":
+            self.fetch_errors += 1
+        else:
+            self.apply_errors += 1
+
+    def as_dict(self):
+        latencies = sorted(self.fetch_seconds)
+        return {
+            "checked": self.checked,
+            "reconciled": self.reconciled,
+            "unpaid": self.unpaid,
+            "fetch_errors": self.fetch_errors,
+            "apply_errors": self.apply_errors,
+            "fetch_latency_ms": {
+                "avg": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else 0,
+                "p95": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1) if latencies else 0,
+                "max": round(latencies[-1] * 1000, 1) if latencies else 0,
+            },
+        }
+
+
+def fetch_captured_payments(orders, *, workers=None, rate_per_second=None):
+    """
+    Look up the captured payment of each order on a bounded thread pool, with
+    a token bucket keeping gateway calls under ``rate_per_second``. Threads
+    only talk to Razorpay; nothing here touches the database.
+
+    Returns ``{order.id: (payment | None, error | None, seconds)}``.
+    """
+    workers = max(int(workers or settings.RAZORPAY_RECONCILE_WORKERS), 1)
+    bucket = TokenBucket(
+        rate_per_second or settings.RAZORPAY_RECONCILE_RATE_PER_SECOND,
+        capacity=workers,
+    )
+    local = threading.local()
+
+    def fetch(order):
+        bucket.acquire()
+        started = time.monotonic()
+        try:
+            # razorpay.Client wraps a requests session; keep one per thread.
+            if not hasattr(local, "client"):
+                local.client = get_razorpay_client()
+            payment = get_captured_payment_for_order(order=order, client=local.client)
+        except Exception as exc:
+            return order.id, (None, exc, time.monotonic() - started)
+        return order.id, (payment, None, time.monotonic() - started)
+
+    if not orders:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(workers, len(orders))) as executor:
+        return dict(executor.map(fetch, orders))
+
+
+def reconcile_orders(orders, *, workers=None, rate_per_second=None):
+    """
+    Reconcile ``orders`` against Razorpay: gateway state is fetched
+    concurrently, then each captured payment is applied in its own short
+    transaction. Returns a ``ReconciliationSummary``.
+    """
+    orders = [order for order in orders if not order.payment_processed and order.razorpay_order_id]
+    summary = ReconciliationSummary(checked=len(orders))
+    if not orders:
+        return summary
+
+    # Fail fast on missing credentials instead of once per order.
+    get_razorpay_credentials()
+    fetched = fetch_captured_payments(orders, workers=workers, rate_per_second=rate_per_second)
+
+    for order in orders:
+        payment, error, seconds = fetched[order.id]
+        summary.fetch_seconds.append(seconds)
+        if error is not None:
+            logger.warning(
+                "Reconciliation fetch failed order_id=%s razorpay_order_id=%s error=%s",
+                order.id,
+                order.razorpay_order_id,
+                error,
+            )
+            summary.record(order.id, "fetch_error")
+            continue
+        if not payment:
+            summary.record(order.id, "unpaid")
+            continue
+
+        try:
+            updated_order = apply_captured_payment(order, payment)
+        except Exception as exc:
+            logger.warning(
+                "Reconciliation apply failed order_id=%s razorpay_order_id=%s error=%s",
+                order.id,
+                order.razorpay_order_id,
+                exc,
+            )
+            summary.record(order.id, "apply_error")
+            continue
+        summary.record(order.id, "reconciled" if updated_order.payment_processed else "unpaid")
+
+    logger.info("Reconciled payments summary=%s", summary.as_dict())
+    return summary
 
 
 def reconcile_stale_orders(*, limit=50):
@@ -868,17 +1450,7 @@ def reconcile_stale_orders(*, limit=50):
         razorpay_order_id__isnull=False,
     ).exclude(razorpay_order_id="").filter(status__in=["pending", "failed"]).order_by("created_at")[:limit]
 
-    reconciled = 0
-    for order in queryset:
-        try:
-            updated_order = reconcile_order_payment(order)
-        except PaymentError:
-            continue
-
-        if updated_order.payment_processed:
-            reconciled += 1
-
-    return reconciled
+    return reconcile_orders(list(queryset))
 
 
 def verify_and_capture_payment(
@@ -962,8 +1534,6 @@ def mark_order_payment_failed(*, user, order_id, message=None):
         if order.payment_processed or order.status == "paid":
             return message or "Payment already verified."
 
-        release_expired_reservations()
-
         active_reservations_exist = order.stock_reservations.filter(
             consumed_at__isnull=True,
             released_at__isnull=True,
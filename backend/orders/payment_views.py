@@ -1,18 +1,25 @@
+import logging
+
+from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
 from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
+from .idempotency import idempotent
 from .payment_services import (
     PaymentError,
     create_pending_order_from_cart,
     mark_order_payment_failed,
-    process_razorpay_webhook,
+    record_razorpay_webhook,
     reconcile_stale_orders,
+    settle_webhook_event,
     verify_and_capture_payment,
 )
 from .throttles import OrderFlowThrottle
 
+logger = logging.getLogger(__name__)
+
 
 def _coerce_positive_int(value, *, field_name):
     # SECURITY FIX: reject malformed identifiers early to avoid relying on
@@ -31,9 +38,11 @@ def _coerce_positive_int(value, *, field_name):
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 @throttle_classes([OrderFlowThrottle])
+@idempotent("create-payment-order")
 def create_payment_order(request):
     address_id = request.data.get("address_id")
     coupon_code = str(request.data.get("coupon_code", "") or "").strip()
+    quote = str(request.data.get("quote", "") or "").strip()
 
     if not address_id:
         return Response({"error": "Address required."}, status=400)
@@ -46,6 +55,7 @@ def create_payment_order(request):
             user=request.user,
             address_id=address_id,
             coupon_code=coupon_code,
+            quote=quote,
         )
     except PaymentError as exc:
         return Response({"error": str(exc)}, status=400)
@@ -83,6 +93,7 @@ def create_payment_order(request):
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 @throttle_classes([OrderFlowThrottle])
+@idempotent("verify-payment")
 def verify_payment(request):
     order_id = request.data.get("order_id")
     razorpay_order_id = str(request.data.get("razorpay_order_id", "") or "").strip()
@@ -158,10 +169,15 @@ def mark_payment_failed(request):
 @api_view(["POST"])
 @permission_classes([AllowAny])
 def razorpay_webhook(request):
+    # Verify and store the event; the process_webhook_events worker settles
+    # it, so slow reconciliation never delays the acknowledgement. Without a
+    # worker, settle just this event here; anything older or failed is left
+    # to the maintenance run.
     try:
-        result = process_razorpay_webhook(
+        event, created = record_razorpay_webhook(
             body=request.body,
             signature=request.headers.get("X-Razorpay-Signature", ""),
+            event_id=request.headers.get("X-Razorpay-Event-Id", ""),
         )
     except PaymentError as exc:
         if "signature verification failed" in str(exc).lower():
@@ -172,7 +188,20 @@ def razorpay_webhook(request):
     except Exception:
         return Response({"error": "Unable to process webhook."}, status=500)
 
-    return Response({"message": "Webhook processed.", **result})
+    if created and not settings.WEBHOOK_WORKER_ENABLED:
+        try:
+            settle_webhook_event(event.id)
+        except Exception:
+            # The event is stored; the worker or maintenance run retries it.
+            logger.exception("Inline webhook settle failed event_id=%s", event.event_id)
+
+    return Response(
+        {
+            "message": "Webhook received.",
+            "event": event.event_type,
+            "duplicate": not created,
+        }
+    )
 
 
 @api_view(["POST"])
@@ -185,10 +214,16 @@ def reconcile_payments(request):
             return Response({"error": "Forbidden."}, status=403)
 
         limit = request.data.get("limit", 50)
-        reconciled = reconcile_stale_orders(limit=_coerce_positive_int(limit, field_name="limit"))
+        summary = reconcile_stale_orders(limit=_coerce_positive_int(limit, field_name="limit"))
     except ImproperlyConfigured as exc:
         return Response({"error": str(exc)}, status=500)
     except Exception:
         return Response({"error": "Unable to reconcile payments."}, status=500)
 
-    return Response({"message": "Reconciliation completed.", "reconciled": reconciled})
+    return Response(
+        {
+            "message": "Reconciliation completed.",
+            "reconciled": summary.reconciled,
+            "summary": summary.as_dict(),
+        }
+    )
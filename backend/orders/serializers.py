@@ -4,6 +4,7 @@ from rest_framework import serializers
 
 from products.models import Product
 from products.models import ProductVariant
+from .models import CustomizationUpload
 from utils.validation import validate_custom_image, validate_custom_text
 
 
@@ -29,6 +30,11 @@ class AddToCartSerializer(serializers.Serializer):
         required=False,
         allow_empty=True,
     )
+    custom_upload_ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+        allow_empty=True,
+    )
 
     default_error_messages = {
         "variant_not_supported": "Variants are not supported for this product.",
@@ -36,6 +42,8 @@ class AddToCartSerializer(serializers.Serializer):
         "custom_image_not_allowed": "This product does not allow image customization.",
         "custom_image_limit": "Please upload exactly {limit} custom image(s) for this product.",
         "custom_text_not_allowed": "This product does not allow text customization.",
+        "custom_upload_conflict": "Send either custom_images or custom_upload_ids, not both.",
+        "custom_upload_not_ready": "One or more uploaded images are missing or still processing.",
     }
 
     def validate_custom_text(self, value):
@@ -69,11 +77,16 @@ class AddToCartSerializer(serializers.Serializer):
 
         custom_images = attrs.get("custom_images", [])
         custom_text = attrs.get("custom_text")
+        custom_uploads = self._get_custom_uploads(attrs.get("custom_upload_ids") or [])
+
+        if custom_images and custom_uploads:
+            self.fail("custom_upload_conflict")
 
-        if custom_images and not product.allow_custom_image:
+        image_count = len(custom_images) or len(custom_uploads)
+        if image_count and not product.allow_custom_image:
             self.fail("custom_image_not_allowed")
 
-        if custom_images and len(custom_images) != product.custom_image_limit:
+        if image_count and image_count != product.custom_image_limit:
             self.fail("custom_image_limit", limit=product.custom_image_limit)
 
         if custom_text and not product.allow_custom_text:
@@ -82,6 +95,51 @@ class AddToCartSerializer(serializers.Serializer):
         attrs["product"] = product
         attrs["variant"] = variant
         attrs["custom_images"] = custom_images
+        attrs["custom_uploads"] = custom_uploads
         attrs["custom_text"] = custom_text
         return attrs
+
+    def _get_custom_uploads(self, upload_ids):
+        if not upload_ids:
+            return []
+
+        unique_ids = list(dict.fromkeys(upload_ids))
+        uploads = list(
+            CustomizationUpload.objects.filter(
+                id__in=unique_ids,
+                user=self.context.get("user"),
+                status=CustomizationUpload.STATUS_READY,
+            )
+        )
+        if len(uploads) != len(unique_ids) or len(unique_ids) != len(upload_ids):
+            self.fail("custom_upload_not_ready")
+        uploads.sort(key=lambda upload: unique_ids.index(upload.id))
+        return uploads
     
+
+
+class CartBatchOperationSerializer(serializers.Serializer):
+    """
+    One entry of a ``/cart/batch/`` request. Only plain (non-customized)
+    lines can be added in a batch; customized adds still go through
+    ``add_to_cart`` because they carry uploads.
+    """
+
+    OP_ADD = "add"
+    OP_UPDATE = "update"
+    OP_REMOVE = "remove"
+
+    op = serializers.ChoiceField(choices=[OP_ADD, OP_UPDATE, OP_REMOVE])
+    item_id = serializers.IntegerField(required=False)
+    product_id = serializers.IntegerField(required=False)
+    variant_id = serializers.IntegerField(required=False, allow_null=True)
+    quantity = serializers.IntegerField(required=False, default=1, min_value=1)
+    remove_from_wishlist = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, attrs):
+        if attrs["op"] == self.OP_ADD:
+            if not attrs.get("product_id"):
+                raise serializers.ValidationError({"product_id": "product_id is required for add."})
+        elif not attrs.get("item_id"):
+            raise serializers.ValidationError({"item_id": f"item_id is required for {attrs['op']}."})
+        return attrs
@@ -1,10 +1,18 @@
 from django.conf import settings
+from django.db import transaction
 from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
-from products.models import Banner, Category, Product, ProductImage, SubCategory
+from products.models import Banner, Category, Product, ProductImage, ProductVariant, SubCategory
 
-from .models import CartItem, CartItemImage, Order, OrderItem, OrderItemImage
+from .coupon_counters import (
+    COUPON_INACTIVE_ORDER_STATUSES,
+    count_coupon_usage,
+    discard_coupon_usage,
+    sync_order_coupon_usage_counters,
+)
+from .hot_inventory import hot_inventory_enabled, reseed_hot_inventory
+from .models import CartItem, CartItemImage, CouponUsage, Order, OrderItem, OrderItemImage
 from utils.media_cleanup import (
     ALL_MEDIA_REFERENCE_SPECS,
     MEDIA_PURGE_ORDER_STATUSES,
@@ -88,11 +96,14 @@ def delete_orphaned_media_files(sender, instance, **kwargs):
 
 
 @receiver(pre_save, sender=Order)
-def mark_order_for_customization_media_purge(sender, instance, **kwargs):
-    if not instance.pk:
-        return
+def capture_previous_order(sender, instance, **kwargs):
+    # Load the stored row once for the pre_save handlers below.
+    instance._previous_order = _get_previous_instance(sender, instance)
 
-    previous_order = _get_previous_instance(sender, instance)
+
+@receiver(pre_save, sender=Order)
+def mark_order_for_customization_media_purge(sender, instance, **kwargs):
+    previous_order = getattr(instance, "_previous_order", None)
     if previous_order is None:
         return
 
@@ -122,3 +133,52 @@ def purge_order_customization_media_when_delivered(sender, instance, **kwargs):
 
     instance._purge_customization_media_after_save = False
     purge_order_customization_media(instance)
+
+
+@receiver(post_save, sender=CouponUsage)
+def count_new_coupon_usage(sender, instance, created, **kwargs):
+    if created and instance.order.status not in COUPON_INACTIVE_ORDER_STATUSES:
+        count_coupon_usage(instance)
+
+
+@receiver(post_delete, sender=CouponUsage)
+def uncount_deleted_coupon_usage(sender, instance, **kwargs):
+    discard_coupon_usage(instance)
+
+
+@receiver(pre_save, sender=Order)
+def track_coupon_usage_status_change(sender, instance, update_fields=None, **kwargs):
+    instance._sync_coupon_usage_counters = False
+    if update_fields is not None and "status" not in update_fields:
+        return
+
+    previous_order = getattr(instance, "_previous_order", None)
+    if previous_order is None:
+        return
+
+    was_inactive = previous_order.status in COUPON_INACTIVE_ORDER_STATUSES
+    is_inactive = instance.status in COUPON_INACTIVE_ORDER_STATUSES
+    instance._sync_coupon_usage_counters = was_inactive != is_inactive
+
+
+@receiver(post_save, sender=Order)
+def sync_coupon_usage_counters_on_status_change(sender, instance, **kwargs):
+    if not getattr(instance, "_sync_coupon_usage_counters", False):
+        return
+
+    instance._sync_coupon_usage_counters = False
+    sync_order_coupon_usage_counters(instance)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductVariant)
+def reseed_hot_inventory_on_save(sender, instance, raw=False, **kwargs):
+    # Stock edits reach the mirror right away instead of after its TTL.
+    if raw or not hot_inventory_enabled():
+        return
+    if sender is Product and not instance.hot_inventory:
+        return
+
+    kind = "variant" if sender is ProductVariant else "product"
+    target_id = instance.pk
+    transaction.on_commit(lambda: reseed_hot_inventory(kind, target_id))
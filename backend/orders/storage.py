@@ -0,0 +1,25 @@
+import os
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class PrivateUploadStorage(FileSystemStorage):
+    """
+    Local storage under ``PRIVATE_MEDIA_ROOT`` for raw customization uploads
+    that have not been sanitized yet. It sits outside ``MEDIA_ROOT`` and the
+    Cloudinary media storage, so nothing ever serves these files.
+    """
+
+    @property
+    def base_location(self):
+        return settings.PRIVATE_MEDIA_ROOT
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+    def url(self, name):
+        raise ValueError("Private uploads have no public URL.")
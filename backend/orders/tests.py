@@ -1,31 +1,43 @@
 from datetime import timedelta
 from decimal import Decimal
 import hashlib
+from io import StringIO
+import json
 import os
 import shutil
 import tempfile
 from unittest.mock import patch
 
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.cache import cache
 from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
 from django.test import TestCase, TransactionTestCase
-from django.test.utils import override_settings
+from django.test.utils import CaptureQueriesContext, override_settings
 from django.urls import reverse
 from django.utils import timezone
 from django.core.files.uploadedfile import SimpleUploadedFile
 from PIL import Image
 from rest_framework.test import APIClient
 
-from orders.models import Cart, CartItem, Coupon, CouponUsage, Order, OrderItem, OrderItemImage, StockReservation
-from orders.payment_services import PaymentError, reconcile_order_payment, refund_order
+from orders.models import Cart, CartItem, Coupon, CouponUsage, CouponUserCounter, CustomizationUpload, IdempotencyKey, Order, OrderItem, OrderItemImage, StockReservation, WebhookEvent
+from orders.payment_services import (
+    PaymentError,
+    ReconciliationSummary,
+    drain_webhook_events,
+    reconcile_order_payment,
+    refund_order,
+)
 from orders.views import (
     build_delhivery_shipment_payload,
     create_delhivery_reverse_shipment_for_order_id,
     create_replacement_order_for_order_id,
 )
-from products.models import Category, Color, Product, ProductVariant, Size, SubCategory
+from products.models import Category, Color, InventoryMovement, Product, ProductVariant, Size, SubCategory
 from utils.delhivery_service import DelhiveryServiceError
+from wishlist.models import WishlistItem
 
 
 def build_test_image(name, size=(100, 100), image_format="PNG", content_type="image/png"):
@@ -183,6 +195,119 @@ class AvailableCouponsTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data["coupons"], [])
 
+    def test_available_coupon_queries_do_not_grow_with_coupon_count(self):
+        def create_coupons(prefix, count):
+            for index in range(count):
+                coupon = Coupon.objects.create(
+                    code=f"{prefix}{index}",
+                    title=f"Offer {index}",
+                    description="Limited offer",
+                    discount_type=Coupon.TYPE_FIXED,
+                    discount_value=Decimal("10.00"),
+                    usage_limit=100,
+                    usage_limit_per_user=2,
+                    first_order_only=index % 2 == 0,
+                )
+                coupon.categories.add(self.category)
+
+        create_coupons("FEW", 2)
+        with CaptureQueriesContext(connection) as few_queries:
+            response = self.client.get(reverse("available_coupons"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["coupons"]), 2)
+
+        create_coupons("MANY", 10)
+        with CaptureQueriesContext(connection) as many_queries:
+            response = self.client.get(reverse("available_coupons"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["coupons"]), 12)
+        self.assertEqual(len(many_queries), len(few_queries))
+
+
+class CouponUsageCounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="counter-user",
+            email="counter@example.com",
+            password="testpass123",
+        )
+        self.coupon = Coupon.objects.create(
+            code="COUNTED",
+            title="Counted",
+            discount_type=Coupon.TYPE_FIXED,
+            discount_value=Decimal("50.00"),
+            usage_limit=10,
+            usage_limit_per_user=2,
+        )
+        self.order = Order.objects.create(
+            user=self.user,
+            subtotal_amount=Decimal("400.00"),
+            discount_amount=Decimal("50.00"),
+            total_amount=Decimal("350.00"),
+            coupon_code=self.coupon.code,
+            shipping_address="Address line",
+            city="Delhi",
+            postal_code="110001",
+            phone="9999999999",
+            status="paid",
+        )
+
+    def assert_counts(self, total, per_user):
+        self.coupon.refresh_from_db()
+        self.assertEqual(self.coupon.used_count, total)
+        counter = CouponUserCounter.objects.filter(coupon=self.coupon, user=self.user).first()
+        self.assertEqual(counter.used_count if counter else 0, per_user)
+
+    def test_counters_follow_usage_and_order_status(self):
+        usage = CouponUsage.objects.create(
+            coupon=self.coupon,
+            user=self.user,
+            order=self.order,
+            discount_amount=Decimal("50.00"),
+        )
+        self.assert_counts(1, 1)
+
+        self.order.status = "cancelled"
+        with CaptureQueriesContext(connection) as queries:
+            self.order.save(update_fields=["status", "updated_at"])
+        self.assert_counts(0, 0)
+        # The pre_save handlers share one load of the stored order.
+        previous_row_loads = [
+            query for query in queries.captured_queries
+            if query["sql"].startswith("SELECT") and 'FROM "orders_order"' in query["sql"]
+        ]
+        self.assertEqual(len(previous_row_loads), 1)
+
+        # Saving again in an inactive status must not decrement twice.
+        self.order.save()
+        self.assert_counts(0, 0)
+
+        self.order.status = "processing"
+        self.order.save()
+        self.assert_counts(1, 1)
+
+        usage.delete()
+        self.assert_counts(0, 0)
+
+    def test_reconcile_command_repairs_drifted_counters(self):
+        CouponUsage.objects.create(
+            coupon=self.coupon,
+            user=self.user,
+            order=self.order,
+            discount_amount=Decimal("50.00"),
+        )
+        Coupon.objects.filter(id=self.coupon.id).update(used_count=7)
+        CouponUserCounter.objects.all().delete()
+
+        call_command("reconcile_coupon_usage", "--dry-run", stdout=StringIO())
+        self.assert_counts(7, 0)
+
+        output = StringIO()
+        call_command("reconcile_coupon_usage", stdout=output)
+
+        self.assert_counts(1, 1)
+        self.assertIn("coupons=1 user_counters=1", output.getvalue())
+
 
 class CartValidationTests(TestCase):
     def setUp(self):
@@ -371,6 +496,285 @@ class CartValidationTests(TestCase):
         cart_item.refresh_from_db()
         self.assertEqual(cart_item.variant_id, restored_variant.id)
 
+    def test_add_to_cart_merges_plain_lines_with_single_upsert(self):
+        Cart.objects.create(user=self.user)
+        payload = {"product_id": self.variant_product.id, "variant_id": self.variant.id, "quantity": 2}
+
+        first = self.client.post(reverse("add_to_cart"), payload, format="json")
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.post(reverse("add_to_cart"), payload, format="json")
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.data["cart_item"]["id"], first.data["cart_item"]["id"])
+        # Clamped to the variant's stock of 3.
+        self.assertEqual(second.data["cart_item"]["quantity"], 3)
+        writes = [q for q in queries.captured_queries if q["sql"].startswith(("INSERT", "UPDATE"))]
+        self.assertEqual(len(writes), 1)
+        cart_item = CartItem.objects.get(cart__user=self.user)
+        self.assertEqual(cart_item.quantity, 3)
+        self.assertEqual(cart_item.merge_key, f"{self.variant_product.id}:{self.variant.id}")
+        self.assertEqual(cart_item.variant_sku, self.variant.sku)
+
+        self.simple_product.allow_custom_text = True
+        self.simple_product.save(update_fields=["allow_custom_text"])
+        for _ in range(2):
+            self.client.post(
+                reverse("add_to_cart"),
+                {"product_id": self.simple_product.id, "quantity": 1, "custom_text": "Hello"},
+                format="json",
+            )
+        customized = CartItem.objects.filter(product=self.simple_product)
+        self.assertEqual(customized.count(), 2)
+        self.assertFalse(customized.filter(merge_key__isnull=False).exists())
+
+    def test_cart_batch_applies_operations_atomically(self):
+        cart = Cart.objects.create(user=self.user)
+        simple_item = CartItem.objects.create(cart=cart, product=self.simple_product, quantity=1)
+        variant_item = CartItem.objects.create(
+            cart=cart,
+            product=self.variant_product,
+            variant=self.variant,
+            quantity=1,
+        )
+        WishlistItem.objects.create(user=self.user, product=self.other_variant_product)
+
+        response = self.client.post(
+            reverse("cart_batch"),
+            {
+                "operations": [
+                    {"op": "update", "item_id": simple_item.id, "quantity": 4},
+                    {"op": "remove", "item_id": variant_item.id},
+                    {
+                        "op": "add",
+                        "product_id": self.other_variant_product.id,
+                        "variant_id": self.other_variant.id,
+                        "quantity": 1,
+                        "remove_from_wishlist": True,
+                    },
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 2)
+        quantities = {item["product"]["id"]: item["quantity"] for item in response.data["items"]}
+        self.assertEqual(quantities, {self.simple_product.id: 4, self.other_variant_product.id: 1})
+        self.assertFalse(WishlistItem.objects.filter(user=self.user).exists())
+
+        failed = self.client.post(
+            reverse("cart_batch"),
+            {
+                "operations": [
+                    {"op": "update", "item_id": simple_item.id, "quantity": 2},
+                    {"op": "update", "item_id": simple_item.id, "quantity": 99},
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(failed.status_code, 400)
+        self.assertEqual(failed.data["index"], 1)
+        self.assertEqual(failed.data["error"], "Only 5 items available in stock.")
+        simple_item.refresh_from_db()
+        self.assertEqual(simple_item.quantity, 4)
+
+    def test_cart_batch_adds_see_earlier_updates_and_removals(self):
+        cart = Cart.objects.create(user=self.user)
+        merge_key = CartItem.build_merge_key(self.simple_product.id)
+        simple_item = CartItem.objects.create(
+            cart=cart,
+            product=self.simple_product,
+            quantity=1,
+            merge_key=merge_key,
+        )
+        add_simple = {"op": "add", "product_id": self.simple_product.id, "quantity": 1}
+
+        response = self.client.post(
+            reverse("cart_batch"),
+            {"operations": [{"op": "update", "item_id": simple_item.id, "quantity": 3}, add_simple]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        simple_item.refresh_from_db()
+        self.assertEqual(simple_item.quantity, 4)
+
+        response = self.client.post(
+            reverse("cart_batch"),
+            {"operations": [{"op": "remove", "item_id": simple_item.id}, add_simple]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(CartItem.objects.filter(id=simple_item.id).exists())
+        readded = CartItem.objects.get(cart=cart, product=self.simple_product)
+        self.assertEqual(readded.quantity, 1)
+        self.assertEqual(readded.merge_key, merge_key)
+
+    def test_cart_batch_rejects_invalid_payloads(self):
+        self.assertEqual(
+            self.client.post(reverse("cart_batch"), {"operations": []}, format="json").status_code,
+            400,
+        )
+        response = self.client.post(
+            reverse("cart_batch"),
+            {"operations": [{"op": "remove", "item_id": 1}, {"op": "update"}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["index"], 1)
+
+    def test_guest_cart_lives_in_signed_cookie_and_merges_on_login(self):
+        guest = APIClient()
+        with CaptureQueriesContext(connection) as queries:
+            added = guest.post(
+                reverse("add_to_guest_cart"),
+                {"product_id": self.variant_product.id, "variant_id": self.variant.id, "quantity": 2},
+                format="json",
+            )
+        self.assertEqual(added.status_code, 201)
+        self.assertFalse(
+            [q for q in queries.captured_queries if q["sql"].startswith(("INSERT", "UPDATE"))]
+        )
+        guest.post(
+            reverse("add_to_guest_cart"),
+            {"product_id": self.simple_product.id, "quantity": 9},
+            format="json",
+        )
+        self.assertEqual(
+            guest.post(
+                reverse("add_to_guest_cart"),
+                {"product_id": self.variant_product.id, "quantity": 1},
+                format="json",
+            ).data["error"],
+            "Please select a variant.",
+        )
+
+        guest_cart = guest.get(reverse("get_guest_cart"))
+        self.assertEqual(guest_cart.data["count"], 2)
+        quantities = {item["product"]["id"]: item["quantity"] for item in guest_cart.data["items"]}
+        # Clamped to the product's stock of 5.
+        self.assertEqual(quantities, {self.variant_product.id: 2, self.simple_product.id: 5})
+        self.assertFalse(CartItem.objects.exists())
+
+        tampered = APIClient()
+        tampered.cookies["guest_cart"] = guest.cookies["guest_cart"].value[:-2] + "xx"
+        self.assertEqual(tampered.get(reverse("get_guest_cart")).data["count"], 0)
+
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(
+            cart=cart,
+            product=self.variant_product,
+            variant=self.variant,
+            quantity=2,
+            merge_key=CartItem.build_merge_key(self.variant_product.id, self.variant.id),
+        )
+        guest.force_authenticate(user=self.user)
+        merged = guest.post(reverse("merge_guest_cart"))
+
+        self.assertEqual(merged.status_code, 200)
+        self.assertEqual(merged.data["merged"], 2)
+        quantities = {item["product"]["id"]: item["quantity"] for item in merged.data["items"]}
+        self.assertEqual(quantities, {self.variant_product.id: 3, self.simple_product.id: 5})
+        guest.force_authenticate(user=None)
+        self.assertEqual(guest.get(reverse("get_guest_cart")).data["count"], 0)
+
+    def test_get_cart_resolves_variants_in_constant_queries(self):
+        cart = Cart.objects.create(user=self.user)
+
+        def add_orphaned_items(count, offset):
+            for index in range(offset, offset + count):
+                product = Product.objects.create(
+                    title=f"Batch Frame {index}",
+                    stock=0,
+                    stock_type="variants",
+                    category=self.category,
+                    sub_category=self.subcategory,
+                )
+                variant = ProductVariant.objects.create(
+                    product=product,
+                    size=self.size,
+                    color=self.color,
+                    mrp=Decimal("600.00"),
+                    stock=4,
+                )
+                # Snapshot-only rows: one matched by SKU, the rest by size/colour.
+                CartItem.objects.create(
+                    cart=cart,
+                    product=product,
+                    variant_sku=variant.sku if index % 2 else "",
+                    variant_size_name=self.size.name,
+                    variant_color_name=self.color.name,
+                )
+
+        def count_queries():
+            CartItem.objects.filter(cart=cart).update(variant=None)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse("get_cart"))
+            self.assertEqual(response.status_code, 200)
+            return len(queries), response
+
+        add_orphaned_items(2, 0)
+        small_count, _ = count_queries()
+        add_orphaned_items(6, 2)
+        large_count, response = count_queries()
+
+        self.assertEqual(small_count, large_count)
+        self.assertEqual(len(response.data["items"]), 8)
+        self.assertTrue(all(item["variant"]["status"] == "available" for item in response.data["items"]))
+        self.assertFalse(CartItem.objects.filter(cart=cart, variant__isnull=True).exists())
+
+    def test_get_cart_serves_cached_summary_and_not_modified(self):
+        self.client.post(
+            reverse("add_to_cart"),
+            {"product_id": self.simple_product.id, "quantity": 1},
+            format="json",
+        )
+        first = self.client.get(reverse("get_cart"))
+        etag = first["ETag"]
+
+        with CaptureQueriesContext(connection) as queries:
+            cached = self.client.get(reverse("get_cart"))
+        self.assertEqual(cached.data, first.data)
+        self.assertEqual(len(queries), 0)
+
+        not_modified = self.client.get(reverse("get_cart"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+
+        cart_item = CartItem.objects.get(cart__user=self.user)
+        self.client.post(
+            reverse("update_cart_item", args=[cart_item.id]),
+            {"quantity": 2},
+            format="json",
+        )
+        updated = self.client.get(reverse("get_cart"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(updated.status_code, 200)
+        self.assertEqual(updated.data["items"][0]["quantity"], 2)
+        self.assertNotEqual(updated["ETag"], etag)
+
+        self.simple_product.slashed_price = Decimal("350.00")
+        self.simple_product.save()
+        repriced = self.client.get(reverse("get_cart"))
+        self.assertEqual(repriced.data["total"], "700.0")
+
+        self.client.delete(reverse("clear_cart"))
+        self.assertEqual(self.client.get(reverse("get_cart")).data["count"], 0)
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_get_cart_skips_summary_cache_without_a_shared_cache(self):
+        self.client.post(
+            reverse("add_to_cart"),
+            {"product_id": self.simple_product.id, "quantity": 1},
+            format="json",
+        )
+        first = self.client.get(reverse("get_cart"))
+        self.assertNotIn("ETag", first)
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(reverse("get_cart"), HTTP_IF_NONE_MATCH="*")
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data, first.data)
+        self.assertGreater(len(queries), 0)
+
     def test_strips_html_from_custom_text_before_saving(self):
         self.simple_product.allow_custom_text = True
         self.simple_product.save(update_fields=["allow_custom_text"])
@@ -475,6 +879,107 @@ class CartValidationTests(TestCase):
         cart_item = CartItem.objects.get(product=self.simple_product)
         self.assertEqual(cart_item.custom_images.count(), 2)
 
+    def test_upload_session_sanitizes_out_of_band_and_attaches_by_id(self):
+        self.simple_product.allow_custom_image = True
+        self.simple_product.custom_image_limit = 2
+        self.simple_product.save(update_fields=["allow_custom_image", "custom_image_limit"])
+
+        upload_ids = []
+        for name in ("upload-1.png", "upload-2.png"):
+            with patch("orders.customization_uploads.validate_custom_image") as mock_validate:
+                response = self.client.post(
+                    reverse("create_customization_upload"),
+                    {"image": build_test_image(name, size=(600, 600))},
+                    format="multipart",
+                )
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.data["status"], "pending")
+            mock_validate.assert_not_called()
+            upload_ids.append(response.data["id"])
+
+        raw_path = CustomizationUpload.objects.get(id=upload_ids[0]).raw_file.path
+        self.assertTrue(raw_path.startswith(os.path.abspath(settings.PRIVATE_MEDIA_ROOT)))
+        self.assertFalse(raw_path.startswith(os.path.abspath(settings.MEDIA_ROOT)))
+
+        pending_add = self.client.post(
+            reverse("add_to_cart"),
+            {"product_id": self.simple_product.id, "custom_upload_ids": upload_ids},
+            format="json",
+        )
+        self.assertEqual(pending_add.status_code, 400)
+
+        call_command("process_customization_uploads", stdout=StringIO())
+        status_response = self.client.get(reverse("get_customization_upload", args=[upload_ids[0]]))
+        self.assertEqual(status_response.data["status"], "ready")
+        ready = CustomizationUpload.objects.get(id=upload_ids[0])
+        self.assertFalse(ready.raw_file)
+        self.assertTrue(ready.image.name.startswith("custom_orders/"))
+        image_names = set(
+            CustomizationUpload.objects.filter(id__in=upload_ids).values_list("image", flat=True)
+        )
+
+        response = self.client.post(
+            reverse("add_to_cart"),
+            {"product_id": self.simple_product.id, "custom_upload_ids": upload_ids},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        cart_item = CartItem.objects.get(product=self.simple_product)
+        self.assertEqual(set(cart_item.custom_images.values_list("image", flat=True)), image_names)
+        self.assertFalse(CustomizationUpload.objects.exists())
+
+    @override_settings(CUSTOMIZATION_UPLOAD_WORKER_ENABLED=True)
+    def test_upload_session_rejects_invalid_image_contents(self):
+        response = self.client.post(
+            reverse("create_customization_upload"),
+            {"image": SimpleUploadedFile("fake.png", b"not an image", content_type="image/png")},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 201)
+        status_url = reverse("get_customization_upload", args=[response.data["id"]])
+
+        # Within the grace period the poll leaves the upload to the worker.
+        with patch("orders.customization_uploads.validate_custom_image") as mock_validate:
+            self.assertEqual(self.client.get(status_url).data["status"], "pending")
+        mock_validate.assert_not_called()
+
+        CustomizationUpload.objects.filter(id=response.data["id"]).update(
+            created_at=timezone.now()
+            - timedelta(seconds=settings.CUSTOMIZATION_UPLOAD_INLINE_GRACE_SECONDS + 1)
+        )
+        status_response = self.client.get(status_url)
+
+        self.assertEqual(status_response.data["status"], "rejected")
+        self.assertEqual(status_response.data["error"], "Uploaded file is not a valid image.")
+
+    @override_settings(CUSTOMIZATION_UPLOAD_MAX_PENDING=1)
+    def test_upload_session_without_a_worker_sanitizes_on_first_poll_and_caps_pending(self):
+        first = self.client.post(
+            reverse("create_customization_upload"),
+            {"image": build_test_image("first.png", size=(300, 300))},
+            format="multipart",
+        )
+        self.assertEqual(first.status_code, 201)
+
+        capped = self.client.post(
+            reverse("create_customization_upload"),
+            {"image": build_test_image("second.png", size=(300, 300))},
+            format="multipart",
+        )
+        self.assertEqual(capped.status_code, 400)
+        self.assertIn("still processing", capped.data["error"])
+
+        status_response = self.client.get(reverse("get_customization_upload", args=[first.data["id"]]))
+        self.assertEqual(status_response.data["status"], "ready")
+
+        after = self.client.post(
+            reverse("create_customization_upload"),
+            {"image": build_test_image("second.png", size=(300, 300))},
+            format="multipart",
+        )
+        self.assertEqual(after.status_code, 201)
+
     def test_remove_from_cart_accepts_post_fallback(self):
         add_response = self.client.post(
             reverse("add_to_cart"),
@@ -600,122 +1105,674 @@ class SecureOrderMediaTests(TestCase):
 
         self.assertEqual(response.status_code, 200)
 
-    def test_order_detail_uses_secure_media_urls(self):
-        client = APIClient()
-        client.force_authenticate(user=self.owner)
+    def test_order_detail_uses_secure_media_urls(self):
+        client = APIClient()
+        client.force_authenticate(user=self.owner)
+
+        response = client.get(reverse("order_detail", kwargs={"order_id": self.order.id}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("/api/orders/media/order_customizations/", response.data["order"]["items"][0]["custom_image"])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PaymentFlowSafetyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="pay-user",
+            email="pay@example.com",
+            password="testpass123",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.category = Category.objects.create(name="Frames Safe")
+        self.subcategory = SubCategory.objects.create(
+            category=self.category,
+            name="Wall Frames Safe",
+        )
+        self.product = Product.objects.create(
+            title="Limited Frame",
+            mrp=Decimal("500.00"),
+            slashed_price=Decimal("400.00"),
+            stock=1,
+            category=self.category,
+            sub_category=self.subcategory,
+        )
+        self.cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=self.cart, product=self.product, quantity=1)
+
+        from accounts.models import Address
+
+        self.address = Address.objects.create(
+            user=self.user,
+            full_name="Test User",
+            phone="9999999999",
+            address_line_1="Street 1",
+            address_line_2="",
+            city="Delhi",
+            state="Delhi",
+            postal_code="110001",
+            is_default=True,
+        )
+        self.delhivery_serviceability_patcher = patch(
+            "orders.payment_services.DelhiveryService.get_pincode_serviceability",
+            return_value={
+                "delivery_codes": [
+                    {
+                        "postal_code": {
+                            "cod": "N",
+                            "pre_paid": "Y",
+                            "pickup": "Y",
+                            "is_oda": "N",
+                            "remarks": "",
+                        }
+                    }
+                ]
+            },
+        )
+        self.mock_delhivery_serviceability = self.delhivery_serviceability_patcher.start()
+        self.addCleanup(self.delhivery_serviceability_patcher.stop)
+
+    @patch("orders.payment_services.get_razorpay_client")
+    def test_second_checkout_for_last_item_is_blocked_by_reservation(self, mock_client):
+        mock_client.return_value.order.create.return_value = {
+            "id": "order_rzp_1",
+            "amount": 40000,
+            "currency": "INR",
+        }
+
+        response = self.client.post(
+            reverse("create_payment_order"),
+            {"address_id": self.address.id},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(StockReservation.objects.count(), 1)
+
+        second_user = User.objects.create_user(
+            username="pay-user-2",
+            email="pay2@example.com",
+            password="testpass123",
+        )
+        second_cart = Cart.objects.create(user=second_user)
+        CartItem.objects.create(cart=second_cart, product=self.product, quantity=1)
+        from accounts.models import Address
+
+        second_address = Address.objects.create(
+            user=second_user,
+            full_name="Test User 2",
+            phone="8888888888",
+            address_line_1="Street 2",
+            address_line_2="",
+            city="Delhi",
+            state="Delhi",
+            postal_code="110002",
+            is_default=True,
+        )
+        second_client = APIClient()
+        second_client.force_authenticate(user=second_user)
+
+        second_response = second_client.post(
+            reverse("create_payment_order"),
+            {"address_id": second_address.id},
+            format="json",
+        )
+        self.assertEqual(second_response.status_code, 400)
+        self.assertIn("enough stock", second_response.data["error"])
+
+    @patch("orders.payment_services.get_razorpay_client")
+    def test_checkout_reuses_current_cart_quote(self, mock_client):
+        mock_client.return_value.order.create.return_value = {
+            "id": "order_rzp_quote",
+            "amount": 35000,
+            "currency": "INR",
+        }
+        Coupon.objects.create(
+            code="QUOTE50",
+            title="Quote",
+            discount_type=Coupon.TYPE_FIXED,
+            discount_value=Decimal("50.00"),
+        )
+        coupons_response = self.client.get(reverse("available_coupons"))
+        quote = coupons_response.data["coupons"][0]["quote"]
+        self.assertTrue(coupons_response.data["quote"])
+
+        with patch("orders.payment_services.evaluate_coupon_for_cart") as mock_evaluate:
+            response = self.client.post(
+                reverse("create_payment_order"),
+                {"address_id": self.address.id, "coupon_code": "quote50", "quote": quote},
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, 201)
+        mock_evaluate.assert_not_called()
+        self.assertEqual(response.data["order"]["discount"], "50.00")
+        self.assertEqual(response.data["order"]["total"], "350.00")
+
+    @patch("orders.payment_services.get_razorpay_client")
+    def test_checkout_reprices_when_cart_quote_is_stale(self, mock_client):
+        mock_client.return_value.order.create.return_value = {
+            "id": "order_rzp_stale_quote",
+            "amount": 30000,
+            "currency": "INR",
+        }
+        quote = self.client.get(reverse("available_coupons")).data["quote"]
+
+        self.product.slashed_price = Decimal("300.00")
+        self.product.save()
+
+        response = self.client.post(
+            reverse("create_payment_order"),
+            {"address_id": self.address.id, "quote": quote},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["order"]["total"], "300.00")
+
+    @patch("orders.payment_services.get_razorpay_client")
+    def test_checkout_reprices_when_quote_disagrees_with_order_items(self, mock_client):
+        mock_client.return_value.order.create.return_value = {
+            "id": "order_rzp_missed_bump",
+            "amount": 30000,
+            "currency": "INR",
+        }
+        quote = self.client.get(reverse("available_coupons")).data["quote"]
+
+        # A change this worker's version counters never saw.
+        Product.objects.filter(id=self.product.id).update(slashed_price=Decimal("300.00"))
+
+        response = self.client.post(
+            reverse("create_payment_order"),
+            {"address_id": self.address.id, "quote": quote},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["order"]["total"], "300.00")
+        order = Order.objects.get(id=response.data["order"]["id"])
+        self.assertEqual(order.subtotal_amount, Decimal("300.00"))
+        self.assertEqual(order.items.get().price, Decimal("300.00"))
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_cart_quotes_are_ignored_without_a_shared_cache(self):
+        from orders.cart_quotes import load_cart_quote
+
+        with override_settings(CACHE_IS_SHARED=True):
+            quote = self.client.get(reverse("available_coupons")).data["quote"]
+            self.assertIsNotNone(load_cart_quote(quote, user=self.user))
+
+        self.assertIsNone(load_cart_quote(quote, user=self.user))
+
+    @patch("orders.payment_services.get_razorpay_client")
+    def test_checkout_queries_do_not_grow_with_cart_size(self, mock_client):
+        mock_client.return_value.order.create.side_effect = lambda data: {
+            "id": f"order_rzp_bulk_{data['receipt']}",
+            "amount": data["amount"],
+            "currency": "INR",
+        }
+
+        def add_products(count):
+            for index in range(count):
+                product = Product.objects.create(
+                    title=f"Bulk Frame {CartItem.objects.count()}-{index}",
+                    mrp=Decimal("300.00"),
+                    stock=5,
+                    category=self.category,
+                    sub_category=self.subcategory,
+                )
+                CartItem.objects.create(cart=self.cart, product=product, quantity=2)
+
+        def checkout():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    reverse("create_payment_order"),
+                    {"address_id": self.address.id},
+                    format="json",
+                )
+            self.assertEqual(response.status_code, 201)
+            return len(queries)
+
+        add_products(1)
+        small_cart_queries = checkout()
+        from orders.payment_services import release_order_reservations
+
+        release_order_reservations(Order.objects.get(user=self.user))
+        add_products(4)
+        large_cart_queries = checkout()
+
+        self.assertEqual(large_cart_queries, small_cart_queries)
+        order = Order.objects.latest("id")
+        self.assertEqual(order.items.count(), 6)
+        self.assertEqual(order.stock_reservations.count(), 6)
+        self.assertTrue(all(item.product_title for item in order.items.all()))
+
+    @patch("orders.payment_services.get_razorpay_client")
+    def test_gateway_failure_releases_reservation_of_pending_order(self, mock_client):
+        def fail_gateway(data):
+            # The pending order and its reservation exist before the gateway call.
+            self.assertTrue(
+                StockReservation.objects.filter(order__order_number=data["receipt"]).exists()
+            )
+            raise ConnectionError("gateway timeout")
+
+        mock_client.return_value.order.create.side_effect = fail_gateway
+
+        response = self.client.post(
+            reverse("create_payment_order"),
+            {"address_id": self.address.id},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 500)
+        order = Order.objects.get(user=self.user)
+        self.assertEqual(order.status, "failed")
+        self.assertFalse(order.razorpay_order_id)
+        self.assertFalse(
+            order.stock_reservations.filter(released_at__isnull=True).exists()
+        )
+
+        mock_client.return_value.order.create.side_effect = None
+        mock_client.return_value.order.create.return_value = {
+            "id": "order_rzp_retry",
+            "amount": 40000,
+            "currency": "INR",
+        }
+        retry_response = self.client.post(
+            reverse("create_payment_order"),
+            {"address_id": self.address.id},
+            format="json",
+        )
+        self.assertEqual(retry_response.status_code, 201)
+
+    @override_settings(HOT_INVENTORY_ENABLED=True)
+    @patch("orders.payment_services.get_razorpay_client")
+    def test_hot_inventory_turns_away_buyers_once_sold_out(self, mock_client):
+        from orders.hot_inventory import HOT_INVENTORY_CACHE_KEY, sync_hot_inventory
+        from orders.payment_services import release_order_reservations
+
+        self.product.hot_inventory = True
+        self.product.save(update_fields=["hot_inventory"])
+        mirror_key = HOT_INVENTORY_CACHE_KEY.format(kind="product", target_id=self.product.id)
+        mock_client.return_value.order.create.return_value = {
+            "id": "order_rzp_hot",
+            "amount": 40000,
+            "currency": "INR",
+        }
+
+        first_response = self.client.post(
+            reverse("create_payment_order"),
+            {"address_id": self.address.id},
+            format="json",
+        )
+        self.assertEqual(first_response.status_code, 201)
+        self.assertEqual(cache.get(mirror_key), 0)
+
+        second_user = User.objects.create_user(
+            username="hot-user-2",
+            email="hot2@example.com",
+            password="testpass123",
+        )
+        second_cart = Cart.objects.create(user=second_user)
+        CartItem.objects.create(cart=second_cart, product=self.product, quantity=1)
+        self.address.user = second_user
+        self.address.save(update_fields=["user"])
+        second_client = APIClient()
+        second_client.force_authenticate(user=second_user)
+
+        with patch("orders.payment_services.reserve_pending_order") as mock_reserve:
+            second_response = second_client.post(
+                reverse("create_payment_order"),
+                {"address_id": self.address.id},
+                format="json",
+            )
+        self.assertEqual(second_response.status_code, 400)
+        self.assertIn("sold out right now", second_response.data["error"])
+        mock_reserve.assert_not_called()
+        self.assertEqual(cache.get(mirror_key), 0)
+
+        release_order_reservations(Order.objects.get(user=self.user))
+        self.assertEqual(cache.get(mirror_key), 1)
+
+        cache.set(mirror_key, 0)
+        self.assertEqual(sync_hot_inventory(), 1)
+        self.assertEqual(cache.get(mirror_key), 1)
+
+        self.product.refresh_from_db()
+        self.product.stock = 5
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        self.assertEqual(cache.get(mirror_key), 5)
+
+        with override_settings(CACHE_IS_SHARED=False):
+            self.assertEqual(sync_hot_inventory(), 0)
+
+    @patch("orders.payment_services.get_razorpay_client")
+    def test_create_payment_order_replays_repeated_idempotency_key(self, mock_client):
+        mock_client.return_value.order.create.return_value = {
+            "id": "order_rzp_idem",
+            "amount": 40000,
+            "currency": "INR",
+        }
+
+        first_response = self.client.post(
+            reverse("create_payment_order"),
+            {"address_id": self.address.id},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY="checkout-attempt-1",
+        )
+        self.assertEqual(first_response.status_code, 201)
+
+        replayed_response = self.client.post(
+            reverse("create_payment_order"),
+            {"address_id": self.address.id},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY="checkout-attempt-1",
+        )
+        self.assertEqual(replayed_response.status_code, 201)
+        self.assertEqual(replayed_response["Idempotent-Replayed"], "true")
+        self.assertEqual(replayed_response.data, first_response.data)
+        self.assertEqual(Order.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(StockReservation.objects.count(), 1)
+        mock_client.return_value.order.create.assert_called_once()
+
+        mismatched_response = self.client.post(
+            reverse("create_payment_order"),
+            {"address_id": self.address.id, "coupon_code": "OTHER"},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY="checkout-attempt-1",
+        )
+        self.assertEqual(mismatched_response.status_code, 422)
+
+    @patch("orders.payment_services.verify_razorpay_signature", return_value=True)
+    @patch("orders.payment_services.get_razorpay_client")
+    def test_verify_payment_replays_repeated_idempotency_key(self, mock_client, mock_verify_signature):
+        mock_client.return_value.order.create.return_value = {
+            "id": "order_rzp_idem_verify",
+            "amount": 40000,
+            "currency": "INR",
+        }
+        create_response = self.client.post(
+            reverse("create_payment_order"),
+            {"address_id": self.address.id},
+            format="json",
+        )
+        self.assertEqual(create_response.status_code, 201)
+        order_id = create_response.data["order"]["id"]
+        mock_client.return_value.payment.fetch.return_value = {
+            "id": "pay_idem_verify",
+            "order_id": "order_rzp_idem_verify",
+            "status": "captured",
+            "amount": 40000,
+            "notes": {"order_id": str(order_id), "user_id": str(self.user.id)},
+        }
+        payload = {
+            "order_id": order_id,
+            "razorpay_order_id": "order_rzp_idem_verify",
+            "razorpay_payment_id": "pay_idem_verify",
+            "razorpay_signature": "sig",
+        }
+
+        responses = [
+            self.client.post(
+                reverse("verify_payment"),
+                payload,
+                format="json",
+                HTTP_IDEMPOTENCY_KEY="verify-pay_idem_verify",
+            )
+            for _ in range(2)
+        ]
+
+        self.assertEqual([response.status_code for response in responses], [200, 200])
+        self.assertEqual(responses[1].data, responses[0].data)
+        self.assertEqual(responses[1]["Idempotent-Replayed"], "true")
+        mock_client.return_value.payment.fetch.assert_called_once_with("pay_idem_verify")
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 0)
+
+    @patch("orders.payment_services.get_razorpay_client")
+    def test_idempotency_keys_are_stored_in_the_database(self, mock_client):
+        mock_client.return_value.order.create.return_value = {
+            "id": "order_rzp_idem_db",
+            "amount": 40000,
+            "currency": "INR",
+        }
+        key_hash = hashlib.sha256(b"checkout-attempt-db").hexdigest()
+        held = IdempotencyKey.objects.create(
+            scope="create-payment-order",
+            user=self.user,
+            key_hash=key_hash,
+            fingerprint=hashlib.sha256(
+                json.dumps({"address_id": self.address.id}, sort_keys=True).encode("utf-8")
+            ).hexdigest(),
+            expires_at=timezone.now() + timedelta(minutes=2),
+        )
+
+        def post():
+            return self.client.post(
+                reverse("create_payment_order"),
+                {"address_id": self.address.id},
+                format="json",
+                HTTP_IDEMPOTENCY_KEY="checkout-attempt-db",
+            )
+
+        self.assertEqual(post().status_code, 409)
+        mock_client.return_value.order.create.assert_not_called()
+
+        IdempotencyKey.objects.filter(pk=held.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        response = post()
+        self.assertEqual(response.status_code, 201)
+
+        stored = IdempotencyKey.objects.get(user=self.user, key_hash=key_hash)
+        self.assertEqual(stored.state, IdempotencyKey.STATE_DONE)
+        self.assertEqual(stored.status_code, 201)
+        self.assertGreater(stored.expires_at, timezone.now() + timedelta(hours=1))
+
+    @patch("orders.payment_services.get_razorpay_client")
+    def test_reserved_quantity_tracks_reservation_lifecycle(self, mock_client):
+        mock_client.return_value.order.create.return_value = {
+            "id": "order_rzp_reserved",
+            "amount": 40000,
+            "currency": "INR",
+        }
+        stale_product = Product.objects.get(id=self.product.id)
+
+        response = self.client.post(
+            reverse("create_payment_order"),
+            {"address_id": self.address.id},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.reserved_quantity, 1)
+        self.assertEqual(self.product.available_stock, 0)
 
-        response = client.get(reverse("order_detail", kwargs={"order_id": self.order.id}))
+        # A full save of an instance loaded earlier keeps the counter.
+        stale_product.title = "Limited Frame Renamed"
+        stale_product.save()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.reserved_quantity, 1)
 
-        self.assertEqual(response.status_code, 200)
-        self.assertIn("/api/orders/media/order_customizations/", response.data["order"]["items"][0]["custom_image"])
+        Product.objects.filter(id=self.product.id).update(reserved_quantity=5)
+        output = StringIO()
+        call_command("rebuild_reserved_stock", stdout=output)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.reserved_quantity, 1)
+        self.assertIn("products=1", output.getvalue())
 
+        StockReservation.objects.update(reserved_until=timezone.now() - timedelta(minutes=1))
+        call_command("cleanup_expired_reservations", stdout=StringIO())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.reserved_quantity, 0)
 
-@override_settings(SECURE_SSL_REDIRECT=False)
-class PaymentFlowSafetyTests(TestCase):
-    def setUp(self):
-        cache.clear()
-        self.client = APIClient()
-        self.user = User.objects.create_user(
-            username="pay-user",
-            email="pay@example.com",
-            password="testpass123",
+    @patch("orders.payment_services.get_razorpay_client")
+    def test_inventory_ledger_follows_checkout_and_payment(self, mock_client):
+        from orders.payment_services import deduct_stock_for_order
+        from products.inventory_ledger import (
+            find_inventory_drift,
+            get_ledger_levels,
+            take_inventory_snapshots,
         )
-        self.client.force_authenticate(user=self.user)
 
-        self.category = Category.objects.create(name="Frames Safe")
-        self.subcategory = SubCategory.objects.create(
-            category=self.category,
-            name="Wall Frames Safe",
+        mock_client.return_value.order.create.return_value = {
+            "id": "order_rzp_ledger",
+            "amount": 40000,
+            "currency": "INR",
+        }
+        response = self.client.post(
+            reverse("create_payment_order"),
+            {"address_id": self.address.id},
+            format="json",
         )
-        self.product = Product.objects.create(
-            title="Limited Frame",
-            mrp=Decimal("500.00"),
-            slashed_price=Decimal("400.00"),
-            stock=1,
-            category=self.category,
-            sub_category=self.subcategory,
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(user=self.user)
+        self.assertEqual(
+            get_ledger_levels(("product", self.product.id)),
+            {"stock": 1, "reserved_quantity": 1, "available": 0},
         )
-        self.cart = Cart.objects.create(user=self.user)
-        CartItem.objects.create(cart=self.cart, product=self.product, quantity=1)
 
-        from accounts.models import Address
+        deduct_stock_for_order(order)
 
-        self.address = Address.objects.create(
+        self.assertEqual(
+            list(
+                InventoryMovement.objects.filter(product=self.product).values_list(
+                    "kind", "stock_delta", "reserved_delta", "reference"
+                )
+            ),
+            [
+                ("adjustment", 1, 0, ""),
+                ("reservation", 0, 1, order.order_number),
+                ("sale", -1, -1, order.order_number),
+            ],
+        )
+        self.assertEqual(take_inventory_snapshots(settle_seconds=0)["movements"], 3)
+        self.assertEqual(
+            get_ledger_levels(("product", self.product.id)),
+            {"stock": 0, "reserved_quantity": 0, "available": 0},
+        )
+        self.assertEqual(find_inventory_drift(), {})
+
+    def create_expired_reservation(self, product, quantity=1):
+        order = Order.objects.create(
             user=self.user,
-            full_name="Test User",
-            phone="9999999999",
-            address_line_1="Street 1",
-            address_line_2="",
+            subtotal_amount=Decimal("400.00"),
+            total_amount=Decimal("400.00"),
+            shipping_address="Street 1",
             city="Delhi",
-            state="Delhi",
             postal_code="110001",
-            is_default=True,
+            phone="9999999999",
         )
-        self.delhivery_serviceability_patcher = patch(
-            "orders.payment_services.DelhiveryService.get_pincode_serviceability",
-            return_value={
-                "delivery_codes": [
-                    {
-                        "postal_code": {
-                            "cod": "N",
-                            "pre_paid": "Y",
-                            "pickup": "Y",
-                            "is_oda": "N",
-                            "remarks": "",
-                        }
-                    }
-                ]
-            },
+        Product.objects.filter(id=product.id).update(
+            reserved_quantity=F("reserved_quantity") + quantity
         )
-        self.mock_delhivery_serviceability = self.delhivery_serviceability_patcher.start()
-        self.addCleanup(self.delhivery_serviceability_patcher.stop)
+        return StockReservation.objects.create(
+            order=order,
+            product=product,
+            quantity=quantity,
+            reserved_until=timezone.now() - timedelta(minutes=1),
+        )
+
+    def test_sweeper_releases_expired_reservations_in_batches(self):
+        for _ in range(5):
+            self.create_expired_reservation(self.product)
+
+        output = StringIO()
+        call_command(
+            "cleanup_expired_reservations",
+            "--batch-size",
+            "2",
+            "--max-batches",
+            "2",
+            stdout=output,
+        )
+
+        self.assertIn("Released 4 expired reservation(s).", output.getvalue())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.reserved_quantity, 1)
+
+        call_command("cleanup_expired_reservations", "--batch-size", "2", stdout=StringIO())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.reserved_quantity, 0)
 
     @patch("orders.payment_services.get_razorpay_client")
-    def test_second_checkout_for_last_item_is_blocked_by_reservation(self, mock_client):
+    def test_checkout_only_releases_expired_holds_on_its_own_stock(self, mock_client):
         mock_client.return_value.order.create.return_value = {
-            "id": "order_rzp_1",
+            "id": "order_rzp_scoped_release",
             "amount": 40000,
             "currency": "INR",
         }
+        other_product = Product.objects.create(
+            title="Other Frame",
+            mrp=Decimal("500.00"),
+            stock=3,
+            category=self.category,
+            sub_category=self.subcategory,
+        )
+        own_hold = self.create_expired_reservation(self.product)
+        other_hold = self.create_expired_reservation(other_product)
 
         response = self.client.post(
             reverse("create_payment_order"),
             {"address_id": self.address.id},
             format="json",
         )
-        self.assertEqual(response.status_code, 201)
-        self.assertEqual(StockReservation.objects.count(), 1)
 
-        second_user = User.objects.create_user(
-            username="pay-user-2",
-            email="pay2@example.com",
-            password="testpass123",
-        )
-        second_cart = Cart.objects.create(user=second_user)
-        CartItem.objects.create(cart=second_cart, product=self.product, quantity=1)
-        from accounts.models import Address
+        self.assertEqual(response.status_code, 201)
+        own_hold.refresh_from_db()
+        other_hold.refresh_from_db()
+        self.assertIsNotNone(own_hold.released_at)
+        self.assertIsNone(other_hold.released_at)
 
-        second_address = Address.objects.create(
-            user=second_user,
-            full_name="Test User 2",
-            phone="8888888888",
-            address_line_1="Street 2",
-            address_line_2="",
-            city="Delhi",
-            state="Delhi",
-            postal_code="110002",
-            is_default=True,
-        )
-        second_client = APIClient()
-        second_client.force_authenticate(user=second_user)
+    @patch("orders.payment_services.get_razorpay_client")
+    def test_stock_deduction_uses_one_update_per_table(self, mock_client):
+        from django.db import transaction
+        from orders.payment_services import deduct_stock_for_order
 
-        second_response = second_client.post(
+        mock_client.return_value.order.create.return_value = {
+            "id": "order_rzp_deduct",
+            "amount": 100000,
+            "currency": "INR",
+        }
+        extra_products = [
+            Product.objects.create(
+                title=f"Deduct Frame {index}",
+                mrp=Decimal("300.00"),
+                stock=4,
+                category=self.category,
+                sub_category=self.subcategory,
+            )
+            for index in range(3)
+        ]
+        for product in extra_products:
+            CartItem.objects.create(cart=self.cart, product=product, quantity=2)
+        response = self.client.post(
             reverse("create_payment_order"),
-            {"address_id": second_address.id},
+            {"address_id": self.address.id},
             format="json",
         )
-        self.assertEqual(second_response.status_code, 400)
-        self.assertIn("enough stock", second_response.data["error"])
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(id=response.data["order"]["id"])
+
+        Product.objects.filter(id=extra_products[2].id).update(stock=1)
+        with self.assertRaisesMessage(PaymentError, "Deduct Frame 2 no longer has enough stock"):
+            with transaction.atomic():
+                deduct_stock_for_order(order)
+        extra_products[0].refresh_from_db()
+        self.assertEqual(extra_products[0].stock, 4)
+
+        Product.objects.filter(id=extra_products[2].id).update(stock=4)
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                deduct_stock_for_order(order)
+
+        updates = [query["sql"] for query in queries if query["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 2)
+        for product in extra_products:
+            product.refresh_from_db()
+            self.assertEqual((product.stock, product.reserved_quantity), (2, 0))
+        self.assertFalse(order.stock_reservations.filter(consumed_at__isnull=True).exists())
 
     def test_checkout_rejects_address_missing_required_shipping_fields(self):
         self.address.full_name = ""
@@ -813,6 +1870,7 @@ class PaymentFlowSafetyTests(TestCase):
             format="json",
             HTTP_X_RAZORPAY_SIGNATURE="sig",
         )
+        drain_webhook_events()
         self.assertEqual(webhook_response.status_code, 200)
 
         order = Order.objects.get(id=order_id)
@@ -866,6 +1924,7 @@ class PaymentFlowSafetyTests(TestCase):
             format="json",
             HTTP_X_RAZORPAY_SIGNATURE="sig",
         )
+        drain_webhook_events()
         second_response = self.client.post(
             reverse("razorpay_webhook"),
             webhook_payload,
@@ -875,12 +1934,116 @@ class PaymentFlowSafetyTests(TestCase):
 
         self.assertEqual(first_response.status_code, 200)
         self.assertEqual(second_response.status_code, 200)
+        self.assertTrue(second_response.data["duplicate"])
+        self.assertEqual(WebhookEvent.objects.count(), 1)
 
         self.product.refresh_from_db()
         order = Order.objects.get(id=order_id)
         self.assertEqual(self.product.stock, 0)
         self.assertTrue(order.payment_processed)
 
+    @override_settings(WEBHOOK_WORKER_ENABLED=True)
+    @patch("orders.payment_services.verify_razorpay_webhook_signature", return_value=True)
+    @patch("orders.payment_services.get_razorpay_client")
+    def test_webhook_is_stored_then_drained_with_retries(self, mock_client, mock_verify_signature):
+        mock_client.return_value.order.create.return_value = {
+            "id": "order_rzp_inbox",
+            "amount": 40000,
+            "currency": "INR",
+        }
+        create_response = self.client.post(
+            reverse("create_payment_order"),
+            {"address_id": self.address.id},
+            format="json",
+        )
+        self.assertEqual(create_response.status_code, 201)
+        order_id = create_response.data["order"]["id"]
+        mock_client.reset_mock()
+
+        response = self.client.post(
+            reverse("razorpay_webhook"),
+            {
+                "event": "order.paid",
+                "payload": {"order": {"entity": {"id": "order_rzp_inbox"}}},
+            },
+            format="json",
+            HTTP_X_RAZORPAY_SIGNATURE="sig",
+            HTTP_X_RAZORPAY_EVENT_ID="evt_inbox_1",
+        )
+
+        # The acknowledgement only stores the event.
+        self.assertEqual(response.status_code, 200)
+        mock_client.assert_not_called()
+        event = WebhookEvent.objects.get(event_id="evt_inbox_1")
+        self.assertEqual(event.status, WebhookEvent.STATUS_PENDING)
+        self.assertEqual(event.event_type, "order.paid")
+
+        mock_client.return_value.order.payments.side_effect = ConnectionError("gateway timeout")
+        self.assertEqual(drain_webhook_events(), 1)
+        event.refresh_from_db()
+        self.assertEqual(event.status, WebhookEvent.STATUS_PENDING)
+        self.assertEqual(event.attempts, 1)
+        self.assertIn("gateway timeout", event.last_error)
+        self.assertGreater(event.next_attempt_at, timezone.now())
+        # Not due yet.
+        self.assertEqual(drain_webhook_events(), 0)
+
+        mock_client.return_value.order.payments.side_effect = None
+        mock_client.return_value.order.payments.return_value = {
+            "items": [{"id": "pay_inbox", "order_id": "order_rzp_inbox", "status": "captured"}]
+        }
+        WebhookEvent.objects.filter(id=event.id).update(next_attempt_at=timezone.now())
+        self.assertEqual(drain_webhook_events(), 1)
+
+        event.refresh_from_db()
+        self.assertEqual(event.status, WebhookEvent.STATUS_PROCESSED)
+        self.assertEqual(event.attempts, 2)
+        self.assertTrue(event.result["updated"])
+        self.assertTrue(Order.objects.get(id=order_id).payment_processed)
+
+    @override_settings(WEBHOOK_WORKER_ENABLED=True)
+    @patch("orders.payment_services.verify_razorpay_webhook_signature", return_value=True)
+    def test_webhook_for_unknown_order_fails_without_retrying(self, mock_verify_signature):
+        response = self.client.post(
+            reverse("razorpay_webhook"),
+            {
+                "event": "payment.captured",
+                "payload": {"payment": {"entity": {"id": "pay_x", "order_id": "order_missing"}}},
+            },
+            format="json",
+            HTTP_X_RAZORPAY_SIGNATURE="sig",
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(drain_webhook_events(), 1)
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.status, WebhookEvent.STATUS_FAILED)
+        self.assertEqual(event.last_error, "Order not found.")
+        self.assertIsNotNone(event.processed_at)
+
+    @patch("orders.payment_services.verify_razorpay_webhook_signature", return_value=True)
+    def test_webhook_is_settled_inline_without_a_worker(self, mock_verify_signature):
+        backlog = WebhookEvent.objects.create(event_id="evt_backlog", event_type="payment.captured")
+        response = self.client.post(
+            reverse("razorpay_webhook"),
+            {
+                "event": "payment.captured",
+                "payload": {"payment": {"entity": {"id": "pay_x", "order_id": "order_missing"}}},
+            },
+            format="json",
+            HTTP_X_RAZORPAY_SIGNATURE="sig",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        event = WebhookEvent.objects.exclude(pk=backlog.pk).get()
+        self.assertEqual(event.status, WebhookEvent.STATUS_FAILED)
+        self.assertEqual(event.attempts, 1)
+        # Only the event just received is settled inline; the backlog waits
+        # for the worker or maintenance run.
+        backlog.refresh_from_db()
+        self.assertEqual(backlog.status, WebhookEvent.STATUS_PENDING)
+        self.assertEqual(backlog.attempts, 0)
+
     @patch("orders.payment_services.verify_razorpay_webhook_signature", return_value=True)
     @patch("orders.payment_services.get_razorpay_client")
     def test_order_paid_webhook_uses_reconciliation_flow(self, mock_client, mock_verify_signature):
@@ -924,6 +2087,7 @@ class PaymentFlowSafetyTests(TestCase):
             format="json",
             HTTP_X_RAZORPAY_SIGNATURE="sig",
         )
+        drain_webhook_events()
 
         self.assertEqual(response.status_code, 200)
         order = Order.objects.get(id=order_id)
@@ -1137,6 +2301,7 @@ class PaymentFlowSafetyTests(TestCase):
             format="json",
             HTTP_X_RAZORPAY_SIGNATURE="sig",
         )
+        drain_webhook_events()
 
         self.assertEqual(response.status_code, 200)
         order = Order.objects.get(id=order_id)
@@ -1208,7 +2373,7 @@ class PaymentFlowSafetyTests(TestCase):
 
         self.assertEqual(response.status_code, 403)
 
-    @patch("orders.payment_views.reconcile_stale_orders", return_value=0)
+    @patch("orders.payment_views.reconcile_stale_orders", return_value=ReconciliationSummary())
     def test_reconcile_payments_allows_staff_user(self, mock_reconcile):
         self.user.is_staff = True
         self.user.save(update_fields=["is_staff"])
@@ -1222,12 +2387,12 @@ class PaymentFlowSafetyTests(TestCase):
         self.assertEqual(response.status_code, 200)
         mock_reconcile.assert_called_once_with(limit=10)
 
-    @patch("orders.payment_services.reconcile_order_payment")
+    @patch("orders.payment_services.apply_captured_payment")
     @patch("orders.payment_services.get_razorpay_client")
     def test_reconciliation_skips_payment_errors_and_continues(
         self,
         mock_client,
-        mock_reconcile_order_payment,
+        mock_apply_captured_payment,
     ):
         from orders.payment_services import PaymentError, reconcile_stale_orders
 
@@ -1243,49 +2408,79 @@ class PaymentFlowSafetyTests(TestCase):
             format="json",
         )
         self.assertEqual(first_response.status_code, 201)
-
-        second_user = User.objects.create_user(
-            username="pay-user-3",
-            email="pay3@example.com",
-            password="testpass123",
+        successful_order = Order.objects.get(id=first_response.data["order"]["id"])
+        conflicting_order = Order.objects.create(
+            user=self.user,
+            subtotal_amount=Decimal("400.00"),
+            total_amount=Decimal("400.00"),
+            shipping_address="Street 1",
+            city="Delhi",
+            postal_code="110001",
+            phone="9999999999",
+            razorpay_order_id="order_rzp_7b",
         )
-        second_cart = Cart.objects.create(user=second_user)
-        CartItem.objects.create(cart=second_cart, product=self.product, quantity=1)
-        from accounts.models import Address
-
-        second_address = Address.objects.create(
-            user=second_user,
-            full_name="Test User 3",
-            phone="7777777777",
-            address_line_1="Street 3",
-            address_line_2="",
+        unreachable_order = Order.objects.create(
+            user=self.user,
+            subtotal_amount=Decimal("400.00"),
+            total_amount=Decimal("400.00"),
+            shipping_address="Street 1",
             city="Delhi",
-            state="Delhi",
-            postal_code="110003",
-            is_default=True,
+            postal_code="110001",
+            phone="9999999999",
+            razorpay_order_id="order_rzp_7c",
         )
-        second_client = APIClient()
-        second_client.force_authenticate(user=second_user)
 
-        third_response = second_client.post(
-            reverse("create_payment_order"),
-            {"address_id": second_address.id},
-            format="json",
-        )
-        self.assertEqual(third_response.status_code, 400)
+        def payments(razorpay_order_id):
+            if razorpay_order_id == "order_rzp_7c":
+                raise ConnectionError("gateway timeout")
+            return {
+                "items": [
+                    {"id": f"pay_{razorpay_order_id}", "order_id": razorpay_order_id, "status": "captured"}
+                ]
+            }
 
-        successful_order = Order.objects.get(id=first_response.data["order"]["id"])
+        mock_client.return_value.order.payments.side_effect = payments
 
-        def side_effect(order):
+        def apply(order, payment):
             if order.id == successful_order.id:
                 order.payment_processed = True
                 return order
             raise PaymentError("stock conflict")
 
-        mock_reconcile_order_payment.side_effect = side_effect
+        mock_apply_captured_payment.side_effect = apply
+
+        summary = reconcile_stale_orders(limit=50)
+
+        self.assertEqual(summary.reconciled, 1)
+        self.assertEqual(
+            summary.outcomes,
+            {
+                successful_order.id: "reconciled",
+                conflicting_order.id: "apply_error",
+                unreachable_order.id: "fetch_error",
+            },
+        )
+        report = summary.as_dict()
+        self.assertEqual(report["checked"], 3)
+        self.assertEqual((report["fetch_errors"], report["apply_errors"]), (1, 1))
+        self.assertEqual(len(summary.fetch_seconds), 3)
+
+    def test_token_bucket_spaces_out_calls_after_the_burst(self):
+        from utils.rate_limit import TokenBucket
+
+        clock = {"now": 0.0}
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            clock["now"] += seconds
+
+        bucket = TokenBucket(rate=2, capacity=2, clock=lambda: clock["now"], sleep=sleep)
+        for _ in range(4):
+            bucket.acquire()
 
-        reconciled = reconcile_stale_orders(limit=50)
-        self.assertEqual(reconciled, 1)
+        # Two calls go straight through, the next two wait half a second each.
+        self.assertEqual(sleeps, [0.5, 0.5])
 
 
 class ProductAvailabilityHistoryTests(TestCase):
@@ -3230,6 +4425,7 @@ class OrderConfirmationEmailFlowTests(TransactionTestCase):
                 format="json",
                 HTTP_X_RAZORPAY_SIGNATURE="sig",
             )
+            drain_webhook_events()
             second_response = self.client.post(
                 reverse("razorpay_webhook"),
                 webhook_payload,
@@ -3314,6 +4510,7 @@ class OrderConfirmationEmailFlowTests(TransactionTestCase):
                 format="json",
                 HTTP_X_RAZORPAY_SIGNATURE="sig",
             )
+            drain_webhook_events()
 
         self.assertEqual(response.status_code, 200)
         order = Order.objects.get(id=order_id)
@@ -3487,36 +4684,61 @@ class FailedPendingOrderPurgeTests(TestCase):
         self.assertFalse(CouponUsage.objects.filter(order_id=order.pk).exists())
         self.assertFalse(os.path.exists(stored_path))
 
-    @patch("orders.management.commands.purge_failed_pending_orders.reconcile_order_payment")
-    def test_pending_order_confirmed_unpaid_is_deleted(self, mock_reconcile):
-        order = self.create_order("pending", payment_id="pay_pending_unpaid")
+    def reconcile_as(self, outcome):
+        def side_effect(orders):
+            summary = ReconciliationSummary(checked=len(orders))
+            for order in orders:
+                summary.record(order.id, outcome)
+            return summary
 
-        def confirm_unpaid(instance):
-            return instance
+        return side_effect
 
-        mock_reconcile.side_effect = confirm_unpaid
+    @patch("orders.management.commands.purge_failed_pending_orders.reconcile_orders")
+    def test_pending_order_confirmed_unpaid_is_deleted(self, mock_reconcile):
+        order = self.create_order("pending", payment_id="pay_pending_unpaid")
+        mock_reconcile.side_effect = self.reconcile_as("unpaid")
 
         self.run_command()
 
         mock_reconcile.assert_called_once()
         self.assertFalse(Order.objects.filter(pk=order.pk).exists())
 
-    @patch("orders.management.commands.purge_failed_pending_orders.reconcile_order_payment")
+    @patch("orders.management.commands.purge_failed_pending_orders.reconcile_orders")
     def test_pending_order_reconciled_as_paid_is_kept(self, mock_reconcile):
         order = self.create_order("pending", payment_id="pay_pending_paid")
+        mock_reconcile.side_effect = self.reconcile_as("reconciled")
 
-        def confirm_paid(instance):
-            instance.payment_processed = True
-            return instance
+        self.run_command()
+
+        mock_reconcile.assert_called_once()
+        self.assertTrue(Order.objects.filter(pk=order.pk).exists())
 
-        mock_reconcile.side_effect = confirm_paid
+    @patch("orders.management.commands.purge_failed_pending_orders.reconcile_orders")
+    def test_pending_orders_are_reconciled_in_one_batch(self, mock_reconcile):
+        paid = self.create_order("pending", payment_id="pay_batch_paid")
+        unpaid = self.create_order("pending", payment_id="pay_batch_unpaid")
+        failed = self.create_order("failed", payment_id="pay_batch_failed")
+
+        reconciled_ids = []
+
+        def side_effect(orders):
+            reconciled_ids.extend(order.id for order in orders)
+            summary = ReconciliationSummary(checked=len(orders))
+            summary.record(paid.id, "reconciled")
+            summary.record(unpaid.id, "unpaid")
+            return summary
+
+        mock_reconcile.side_effect = side_effect
 
         self.run_command()
 
         mock_reconcile.assert_called_once()
-        self.assertTrue(Order.objects.filter(pk=order.pk).exists())
+        self.assertEqual(sorted(reconciled_ids), sorted([paid.id, unpaid.id]))
+        self.assertTrue(Order.objects.filter(pk=paid.pk).exists())
+        self.assertFalse(Order.objects.filter(pk=unpaid.pk).exists())
+        self.assertFalse(Order.objects.filter(pk=failed.pk).exists())
 
-    @patch("orders.management.commands.purge_failed_pending_orders.reconcile_order_payment")
+    @patch("orders.management.commands.purge_failed_pending_orders.reconcile_orders")
     def test_no_reconcile_keeps_pending_orders_with_payment_id(self, mock_reconcile):
         order = self.create_order("pending", payment_id="pay_pending_noreconcile")
 
@@ -3525,7 +4747,7 @@ class FailedPendingOrderPurgeTests(TestCase):
         mock_reconcile.assert_not_called()
         self.assertTrue(Order.objects.filter(pk=order.pk).exists())
 
-    @patch("orders.management.commands.purge_failed_pending_orders.reconcile_order_payment")
+    @patch("orders.management.commands.purge_failed_pending_orders.reconcile_orders")
     def test_reconcile_unavailable_keeps_pending_orders_with_payment_id(self, mock_reconcile):
         from django.core.exceptions import ImproperlyConfigured
 
@@ -3536,7 +4758,7 @@ class FailedPendingOrderPurgeTests(TestCase):
 
         self.assertTrue(Order.objects.filter(pk=order.pk).exists())
 
-    @patch("orders.management.commands.purge_failed_pending_orders.reconcile_order_payment")
+    @patch("orders.management.commands.purge_failed_pending_orders.reconcile_orders")
     def test_reconcile_error_keeps_pending_orders_with_payment_id(self, mock_reconcile):
         order = self.create_order("pending", payment_id="pay_pending_error")
         mock_reconcile.side_effect = RuntimeError("boom")
@@ -3545,6 +4767,15 @@ class FailedPendingOrderPurgeTests(TestCase):
 
         self.assertTrue(Order.objects.filter(pk=order.pk).exists())
 
+    @patch("orders.management.commands.purge_failed_pending_orders.reconcile_orders")
+    def test_fetch_error_keeps_pending_orders_with_payment_id(self, mock_reconcile):
+        order = self.create_order("pending", payment_id="pay_pending_fetch_error")
+        mock_reconcile.side_effect = self.reconcile_as("fetch_error")
+
+        self.run_command()
+
+        self.assertTrue(Order.objects.filter(pk=order.pk).exists())
+
 
 @override_settings(MAINTENANCE_CRON_TOKEN="test-maintenance-token")
 class MaintenanceEndpointTests(TestCase):
@@ -3579,7 +4810,7 @@ class MaintenanceEndpointTests(TestCase):
         self.assertEqual(response.status_code, 503)
 
     @patch("orders.maintenance_views.call_command")
-    def test_runs_all_three_commands_with_correct_token(self, mock_call_command):
+    def test_runs_all_commands_with_correct_token(self, mock_call_command):
         mock_call_command.side_effect = lambda name, *args, **kwargs: None
 
         response = self.post_maintenance(token="test-maintenance-token")
@@ -3588,23 +4819,29 @@ class MaintenanceEndpointTests(TestCase):
         self.assertEqual(
             response.data["ran"],
             [
+                "process_webhook_events",
                 "reconcile_pending_payments",
+                "cleanup_expired_reservations",
                 "purge_delivered_order_media",
                 "purge_failed_pending_orders",
+                "process_customization_uploads",
             ],
         )
-        self.assertEqual(mock_call_command.call_count, 3)
+        self.assertEqual(mock_call_command.call_count, 6)
         call_names = [call.args[0] for call in mock_call_command.call_args_list]
         self.assertEqual(
             call_names,
             [
+                "process_webhook_events",
                 "reconcile_pending_payments",
+                "cleanup_expired_reservations",
                 "purge_delivered_order_media",
                 "purge_failed_pending_orders",
+                "process_customization_uploads",
             ],
         )
         for call in mock_call_command.call_args_list:
-            self.assertIn("--limit", call.args)
+            self.assertTrue({"--limit", "--max-batches"} & set(call.args))
 
     @patch("orders.maintenance_views.call_command")
     def test_reports_errors_without_aborting_batch(self, mock_call_command):
@@ -3621,7 +4858,7 @@ class MaintenanceEndpointTests(TestCase):
             response.data["errors"],
             {"purge_delivered_order_media": "boom"},
         )
-        self.assertEqual(mock_call_command.call_count, 3)
+        self.assertEqual(mock_call_command.call_count, 6)
 
 
 class DelhiveryThrottleTests(TestCase):
@@ -4193,6 +5430,7 @@ class RefundOrderServiceTests(TestCase):
             format="json",
             HTTP_X_RAZORPAY_SIGNATURE="sig",
         )
+        drain_webhook_events()
 
         self.assertEqual(response.status_code, 200)
         self.order.refresh_from_db()
@@ -4229,8 +5467,67 @@ class RefundOrderServiceTests(TestCase):
             format="json",
             HTTP_X_RAZORPAY_SIGNATURE="sig",
         )
+        drain_webhook_events()
 
         self.assertEqual(response.status_code, 200)
         self.order.refresh_from_db()
         self.assertEqual(self.order.refund_status, "failed")
         self.assertFalse(self.order.refund_processed)
+
+
+class BenchmarkEndpointsCommandTests(TestCase):
+    def setUp(self):
+        call_command(
+            "seed_perf_data",
+            categories=2,
+            subcategories_per_category=1,
+            products=30,
+            variants_per_product=2,
+            users=4,
+            orders=2,
+            reviews=2,
+            activity=20,
+            stdout=StringIO(),
+        )
+        Product.objects.filter(slug__startswith="perf-").update(stock=500)
+        ProductVariant.objects.filter(product__slug__startswith="perf-").update(stock=500)
+
+    def test_writes_results_for_every_endpoint_and_rolls_back(self):
+        order_count = Order.objects.count()
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir, True)
+        output_path = os.path.join(output_dir, "bench.json")
+
+        call_command(
+            "benchmark_endpoints",
+            iterations=2,
+            warmup=0,
+            profile_iterations=1,
+            output=output_path,
+            stdout=StringIO(),
+        )
+
+        with open(output_path, encoding="utf-8") as output_file:
+            report = json.load(output_file)
+
+        endpoints = report["endpoints"]
+        self.assertIn("catalog.product_list", endpoints)
+        self.assertEqual(endpoints["checkout.create_order"]["status_codes"], {"201": 3})
+        self.assertEqual(endpoints["checkout.verify"]["status_codes"], {"200": 3})
+        self.assertEqual(endpoints["webhook.payment_captured"]["status_codes"], {"200": 3})
+        for result in endpoints.values():
+            self.assertGreaterEqual(result["p99_ms"], result["p50_ms"])
+            self.assertIn("queries_mean", result)
+        self.assertEqual(Order.objects.count(), order_count)
+
+        comparison = StringIO()
+        call_command(
+            "benchmark_endpoints",
+            scenario=["catalog"],
+            iterations=1,
+            warmup=0,
+            profile_iterations=0,
+            compare=output_path,
+            stdout=comparison,
+        )
+        self.assertIn("catalog.search", comparison.getvalue())
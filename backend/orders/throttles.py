@@ -7,3 +7,11 @@ class DelhiveryThrottle(AnonRateThrottle):
 
 class OrderFlowThrottle(UserRateThrottle):
     scope = "checkout"
+
+
+class GuestCartThrottle(AnonRateThrottle):
+    scope = "guest_cart"
+
+
+class CustomizationUploadThrottle(UserRateThrottle):
+    scope = "customization_upload"
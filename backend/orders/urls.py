@@ -10,6 +10,14 @@ urlpatterns = [
     path("cart/remove/<int:item_id>/", views.remove_from_cart, name="remove_from_cart"),
     path("cart/update/<int:item_id>/", views.update_cart_item, name="update_cart_item"),
     path("cart/clear/", views.clear_cart, name="clear_cart"),
+    path("cart/batch/", views.cart_batch, name="cart_batch"),
+    path("cart/uploads/", views.create_customization_upload_view, name="create_customization_upload"),
+    path("cart/uploads/<int:upload_id>/", views.get_customization_upload, name="get_customization_upload"),
+    path("cart/guest/", views.get_guest_cart, name="get_guest_cart"),
+    path("cart/guest/add/", views.add_to_guest_cart, name="add_to_guest_cart"),
+    path("cart/guest/update/", views.update_guest_cart_item, name="update_guest_cart_item"),
+    path("cart/guest/clear/", views.clear_guest_cart, name="clear_guest_cart"),
+    path("cart/guest/merge/", views.merge_guest_cart, name="merge_guest_cart"),
     path("coupons/available/", views.get_available_coupons, name="available_coupons"),
     path("media/<path:file_path>/", views.serve_order_media, name="order_media"),
 
@@ -11,7 +11,7 @@ from django.core.exceptions import ImproperlyConfigured
 from django.core.files.storage import default_storage
 from django.http import FileResponse, Http404
 from django.db import transaction
-from django.db.models import F, Q
+from django.db.models import Case, F, IntegerField, Q, Value, When
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime
@@ -26,15 +26,47 @@ from .models import (
     CartItemImage,
     Coupon,
     CouponUsage,
+    CouponUserCounter,
+    CustomizationUpload,
     Order,
     OrderItem,
     OrderItemImage,
 )
-from .serializers import AddToCartSerializer
-from .throttles import DelhiveryThrottle, OrderFlowThrottle
-from products.models import Product, ProductVariant
+from .cart_quotes import get_cart_quote_versions, issue_cart_quote
+from .cart_services import merge_guest_cart_lines, upsert_plain_cart_item
+from .coupon_counters import COUPON_INACTIVE_ORDER_STATUSES
+from .customization_uploads import (
+    create_customization_upload,
+    process_customization_upload,
+    should_process_upload_inline,
+)
+from .serializers import AddToCartSerializer, CartBatchOperationSerializer
+from .cart_cache import (
+    bump_cart_version,
+    etag_matches,
+    get_cached_cart,
+    get_cart_cache_state,
+    set_cached_cart,
+)
+from .guest_cart import (
+    GUEST_CART_MAX_LINES,
+    clear_guest_cart_cookie,
+    find_guest_cart_line,
+    load_guest_cart,
+    set_guest_cart_cookie,
+)
+from .throttles import (
+    CustomizationUploadThrottle,
+    DelhiveryThrottle,
+    GuestCartThrottle,
+    OrderFlowThrottle,
+)
+from products.caching import bump_catalog_version
+from products.inventory_ledger import record_inventory_movements
+from products.models import InventoryMovement, Product, ProductVariant
 from products.media_utils import build_media_url, normalize_media_name
 from reviews.services import get_review_states_for_user
+from wishlist.models import WishlistItem
 from utils.delhivery_service import DelhiveryService, DelhiveryServiceError
 
 logger = logging.getLogger(__name__)
@@ -668,6 +700,7 @@ def create_replacement_order_for_order_id(order_id):
             replacement_of=order,
         )
 
+        replaced_by_target = {}
         for item, variant in resolved_items:
             product = item.product
             replacement_item = OrderItem.objects.create(
@@ -699,11 +732,21 @@ def create_replacement_order_for_order_id(order_id):
                 ProductVariant.objects.filter(id=variant.id).update(
                     stock=F("stock") - item.quantity
                 )
+                stock_key = ("variant", variant.id)
             else:
                 Product.objects.filter(id=product.id).update(
                     stock=F("stock") - item.quantity
                 )
+                stock_key = ("product", product.id)
+            replaced_by_target[stock_key] = replaced_by_target.get(stock_key, 0) - item.quantity
 
+        record_inventory_movements(
+            InventoryMovement.KIND_REPLACEMENT,
+            stock=replaced_by_target,
+            reference=replacement.order_number,
+        )
+
+    bump_catalog_version()
     return replacement
 
 
@@ -1072,9 +1115,77 @@ def resolve_cart_item_variant(item, persist=False):
     return variant
 
 
+def _match_snapshot_variant(item, candidates):
+    # Same rules as find_matching_variant_for_snapshot, over preloaded variants.
+    if item.variant_sku:
+        for candidate in candidates:
+            if candidate.sku == item.variant_sku:
+                return candidate
+
+    if not (item.variant_size_name or item.variant_color_name):
+        return None
+
+    matches = [
+        candidate
+        for candidate in candidates
+        if (
+            not item.variant_size_name
+            or (candidate.size and candidate.size.name == item.variant_size_name)
+        )
+        and (
+            not item.variant_color_name
+            or (candidate.color and candidate.color.name == item.variant_color_name)
+        )
+    ]
+    return matches[0] if len(matches) == 1 else None
+
+
+def resolve_cart_item_variants(items, persist=False):
+    """
+    Batch form of resolve_cart_item_variant for a whole cart. Variants of all
+    products with dangling snapshots are loaded in one query, and repaired
+    FKs are persisted with a single UPDATE.
+    """
+    pending = [
+        item
+        for item in items
+        if item.product
+        and item.product.stock_type == "variants"
+        and not item.variant
+        and (item.variant_sku or item.variant_size_name or item.variant_color_name)
+    ]
+    if not pending:
+        return
+
+    candidates_by_product = {}
+    for variant in ProductVariant.objects.filter(
+        product_id__in={item.product_id for item in pending}
+    ).select_related("size", "color").order_by("id"):
+        candidates_by_product.setdefault(variant.product_id, []).append(variant)
+
+    repairs = {}
+    for item in pending:
+        variant = _match_snapshot_variant(item, candidates_by_product.get(item.product_id, []))
+        if variant:
+            item.variant = variant
+            if item.id:
+                repairs[item.id] = variant.id
+
+    if persist and repairs:
+        CartItem.objects.filter(id__in=repairs, variant__isnull=True).update(
+            variant_id=Case(
+                *[When(id=item_id, then=Value(variant_id)) for item_id, variant_id in repairs.items()],
+                output_field=IntegerField(),
+            )
+        )
+
+
 def get_cart_item_variant_snapshot(item, persist=False):
     variant = resolve_cart_item_variant(item, persist=persist)
+    return build_cart_item_variant_snapshot(item, variant)
+
 
+def build_cart_item_variant_snapshot(item, variant):
     if variant:
         variant_status = "available"
     elif item.variant_sku or item.variant_size_name or item.variant_color_name:
@@ -1192,6 +1303,13 @@ def get_custom_image_files(request):
     return [legacy_image] if legacy_image else []
 
 
+def get_custom_upload_ids(request):
+    if hasattr(request.data, "getlist"):
+        return request.data.getlist("custom_upload_ids")
+    upload_ids = request.data.get("custom_upload_ids")
+    return upload_ids if isinstance(upload_ids, list) else []
+
+
 def get_first_error_message(errors):
     if isinstance(errors, list) and errors:
         return get_first_error_message(errors[0])
@@ -1291,20 +1409,17 @@ def get_coupon_queryset():
     )
 
 
-def get_coupon_usage_queryset():
-    return CouponUsage.objects.exclude(order__status__in=["cancelled", "failed"])
-
-
 def get_coupon_description_lines(description):
     return [line.strip("•- \t") for line in (description or "").splitlines() if line.strip()]
 
 
 def get_cart_line_items(cart_items):
     line_items = []
+    resolve_cart_item_variants(cart_items)
 
     for item in cart_items:
         product = item.product
-        variant = resolve_cart_item_variant(item)
+        variant = item.variant
 
         if product.stock_type == "variants":
             price = variant.slashed_price or variant.mrp or Decimal("0.00")
@@ -1326,8 +1441,9 @@ def get_cart_line_items(cart_items):
 
 
 def get_coupon_eligible_subtotal(coupon, cart_items):
-    category_ids = set(coupon.categories.values_list("id", flat=True))
-    subcategory_ids = set(coupon.subcategories.values_list("id", flat=True))
+    # .all() reuses prefetch_related("categories", "subcategories") when present.
+    category_ids = {category.id for category in coupon.categories.all()}
+    subcategory_ids = {subcategory.id for subcategory in coupon.subcategories.all()}
 
     if not category_ids and not subcategory_ids:
         return sum((item["line_total"] for item in cart_items), Decimal("0.00"))
@@ -1344,49 +1460,87 @@ def get_coupon_eligible_subtotal(coupon, cart_items):
     return eligible_total
 
 
-def evaluate_coupon_for_cart(coupon, user, cart_items):
-    subtotal = sum((item["line_total"] for item in cart_items), Decimal("0.00"))
-    eligible_subtotal = get_coupon_eligible_subtotal(coupon, cart_items)
+def load_coupon_usage_context(coupons, user):
+    """
+    Load everything the usage rules need for ``coupons``: redemption counts
+    come from the maintained ``Coupon.used_count`` and ``CouponUserCounter``
+    counters (see ``coupon_counters``) and prior orders are checked once.
+    """
+    coupons = list(coupons)
+    per_user_ids = [coupon.id for coupon in coupons if coupon.usage_limit_per_user is not None]
+
+    user_usage_counts = {}
+    if per_user_ids:
+        user_usage_counts = dict(
+            CouponUserCounter.objects.filter(coupon_id__in=per_user_ids, user=user)
+            .values_list("coupon_id", "used_count")
+        )
 
-    if not cart_items:
-        return {
-            "eligible": False,
-            "reason": "Your cart is empty.",
-            "eligible_subtotal": eligible_subtotal,
-            "discount_amount": Decimal("0.00"),
-            "subtotal": subtotal,
-            "display_in_list": True,
-        }
+    has_previous_order = False
+    if any(coupon.first_order_only for coupon in coupons):
+        has_previous_order = user.orders.exclude(
+            status__in=COUPON_INACTIVE_ORDER_STATUSES
+        ).exists()
 
-    usage_qs = get_coupon_usage_queryset().filter(coupon=coupon)
+    return {
+        "usage_counts": {coupon.id: coupon.used_count for coupon in coupons},
+        "user_usage_counts": user_usage_counts,
+        "has_previous_order": has_previous_order,
+    }
 
-    if coupon.usage_limit is not None and usage_qs.count() >= coupon.usage_limit:
-        return {
-            "eligible": False,
-            "reason": "This coupon has reached its usage limit.",
-            "eligible_subtotal": eligible_subtotal,
-            "discount_amount": Decimal("0.00"),
-            "subtotal": subtotal,
-            "display_in_list": False,
-        }
+
+def evaluate_coupons_for_cart(coupons, user, cart_items):
+    """Evaluate many coupons against one cart; returns ``[(coupon, evaluation)]``."""
+    coupons = list(coupons)
+    usage_context = load_coupon_usage_context(coupons, user) if cart_items else None
+    return [
+        (coupon, evaluate_coupon_for_cart(coupon, user, cart_items, usage_context=usage_context))
+        for coupon in coupons
+    ]
+
+
+def get_coupon_usage_block_reason(coupon, usage_context):
+    """Return why usage limits rule ``coupon`` out for this user, or ``""``."""
+    if (
+        coupon.usage_limit is not None
+        and usage_context["usage_counts"].get(coupon.id, 0) >= coupon.usage_limit
+    ):
+        return "This coupon has reached its usage limit."
 
     if (
         coupon.usage_limit_per_user is not None
-        and usage_qs.filter(user=user).count() >= coupon.usage_limit_per_user
+        and usage_context["user_usage_counts"].get(coupon.id, 0) >= coupon.usage_limit_per_user
     ):
+        return "You have already used this coupon the maximum number of times."
+
+    if coupon.first_order_only and usage_context["has_previous_order"]:
+        return "This coupon is only available on your first order."
+
+    return ""
+
+
+def evaluate_coupon_for_cart(coupon, user, cart_items, usage_context=None):
+    subtotal = sum((item["line_total"] for item in cart_items), Decimal("0.00"))
+    eligible_subtotal = get_coupon_eligible_subtotal(coupon, cart_items)
+
+    if not cart_items:
         return {
             "eligible": False,
-            "reason": "You have already used this coupon the maximum number of times.",
+            "reason": "Your cart is empty.",
             "eligible_subtotal": eligible_subtotal,
             "discount_amount": Decimal("0.00"),
             "subtotal": subtotal,
-            "display_in_list": False,
+            "display_in_list": True,
         }
 
-    if coupon.first_order_only and user.orders.exclude(status__in=["cancelled", "failed"]).exists():
+    if usage_context is None:
+        usage_context = load_coupon_usage_context([coupon], user)
+
+    usage_block_reason = get_coupon_usage_block_reason(coupon, usage_context)
+    if usage_block_reason:
         return {
             "eligible": False,
-            "reason": "This coupon is only available on your first order.",
+            "reason": usage_block_reason,
             "eligible_subtotal": eligible_subtotal,
             "discount_amount": Decimal("0.00"),
             "subtotal": subtotal,
@@ -1478,7 +1632,9 @@ def add_to_cart(request):
                 "variant_id": request.data.get("variant_id"),
                 "custom_text": request.data.get("custom_text"),
                 "custom_images": get_custom_image_files(request),
-            }
+                "custom_upload_ids": get_custom_upload_ids(request),
+            },
+            context={"user": request.user},
         )
         if not serializer.is_valid():
             return Response(
@@ -1493,59 +1649,18 @@ def add_to_cart(request):
         variant = serializer.validated_data["variant"]
         custom_text = serializer.validated_data["custom_text"]
         custom_images = serializer.validated_data["custom_images"]
+        custom_uploads = serializer.validated_data["custom_uploads"]
 
         available_stock = variant.stock if variant else product.stock
 
-        if custom_text is None and not custom_images:
-            cart_item = (
-                CartItem.objects.filter(
-                    cart=cart,
-                    product=product,
-                    variant=variant,
-                    custom_images__isnull=True,
-                )
-                .filter(Q(custom_text__isnull=True) | Q(custom_text=""))
-                .filter(Q(custom_image__isnull=True) | Q(custom_image=""))
-                .first()
+        if custom_text is None and not custom_images and not custom_uploads:
+            cart_item = upsert_plain_cart_item(
+                cart=cart,
+                product=product,
+                variant=variant,
+                quantity=quantity,
+                available_stock=available_stock,
             )
-
-            if cart_item:
-                CartItem.objects.filter(id=cart_item.id).update(
-                    quantity=F("quantity") + quantity
-                )
-                cart_item.refresh_from_db()
-                if variant and (
-                    cart_item.variant_size_name != (variant.size.name if variant.size else "")
-                    or cart_item.variant_color_name != (variant.color.name if variant.color else "")
-                    or cart_item.variant_sku != (variant.sku or "")
-                ):
-                    cart_item.capture_variant_snapshot(variant)
-                    cart_item.save(
-                        update_fields=[
-                            "variant_size_name",
-                            "variant_color_name",
-                            "variant_sku",
-                        ]
-                    )
-
-                if cart_item.quantity > available_stock:
-                    cart_item.quantity = available_stock
-                    cart_item.save()
-            else:
-                if quantity > available_stock:
-                    quantity = available_stock
-
-                cart_item = CartItem.objects.create(
-                    cart=cart,
-                    product=product,
-                    variant=variant,
-                    variant_size_name=variant.size.name if variant and variant.size else "",
-                    variant_color_name=variant.color.name if variant and variant.color else "",
-                    variant_sku=variant.sku if variant else "",
-                    quantity=quantity,
-                    custom_text=None,
-                    custom_image=None,
-                )
         else:
             if quantity > available_stock:
                 quantity = available_stock
@@ -1565,6 +1680,20 @@ def add_to_cart(request):
             for image_file in custom_images:
                 CartItemImage.objects.create(cart_item=cart_item, image=image_file)
 
+            if custom_uploads:
+                # Processed uploads are already in storage; reuse the files.
+                CartItemImage.objects.bulk_create(
+                    [
+                        CartItemImage(cart_item=cart_item, image=upload.image.name)
+                        for upload in custom_uploads
+                    ]
+                )
+                CustomizationUpload.objects.filter(
+                    id__in=[upload.id for upload in custom_uploads]
+                ).delete()
+
+        bump_cart_version(request.user.id)
+
         price = (
             variant.slashed_price or variant.mrp or get_product_price(product)
             if variant
@@ -1593,88 +1722,114 @@ def add_to_cart(request):
         return Response({"error": str(e)}, status=400)
 
 
-@api_view(["GET"])
-@permission_classes([IsAuthenticated])
-def get_cart(request):
-    try:
-        cart = Cart.objects.filter(user=request.user).first()
+def build_cart_payload(request):
+    cart = Cart.objects.filter(user=request.user).first()
 
-        if not cart:
-            return Response({"items": [], "total": "0.00", "count": 0})
+    if not cart:
+        return {"items": [], "total": "0.00", "count": 0}
 
-        cart_items = (
-            CartItem.objects.filter(cart=cart)
-            .select_related("product", "variant", "variant__size", "variant__color")
-            .prefetch_related("custom_images")
+    cart_items = list(
+        CartItem.objects.filter(cart=cart)
+        .select_related(
+            "product",
+            "product__category",
+            "product__sub_category",
+            "variant",
+            "variant__size",
+            "variant__color",
         )
+        .prefetch_related("custom_images")
+    )
+    resolve_cart_item_variants(cart_items, persist=True)
 
-        items = []
-        total = 0
+    items = []
+    total = 0
 
-        for item in cart_items:
-            variant_snapshot = get_cart_item_variant_snapshot(item, persist=True)
-            resolved_variant = item.variant
+    for item in cart_items:
+        resolved_variant = item.variant
+        variant_snapshot = build_cart_item_variant_snapshot(item, resolved_variant)
+        custom_images = list(item.custom_images.all())
 
-            if resolved_variant:
-                price = resolved_variant.slashed_price or resolved_variant.mrp or 0
-            else:
-                price = get_product_price(item.product) or 0
+        if resolved_variant:
+            price = resolved_variant.slashed_price or resolved_variant.mrp or 0
+        else:
+            price = get_product_price(item.product) or 0
 
-            price = float(price)
-            item_total = price * item.quantity
-            total += item_total
+        price = float(price)
+        item_total = price * item.quantity
+        total += item_total
 
-            is_variant_missing = (
-                item.product.stock_type == "variants"
-                and variant_snapshot
-                and variant_snapshot["status"] == "missing"
-            )
-            product_available = item.product.is_active and not is_variant_missing
-            product_status = (
-                "available" if product_available
-                else "variant_missing" if is_variant_missing
-                else "unavailable"
-            )
+        is_variant_missing = (
+            item.product.stock_type == "variants"
+            and variant_snapshot
+            and variant_snapshot["status"] == "missing"
+        )
+        product_available = item.product.is_active and not is_variant_missing
+        product_status = (
+            "available" if product_available
+            else "variant_missing" if is_variant_missing
+            else "unavailable"
+        )
 
-            items.append(
-                {
-                    "id": item.id,
-                    "product": {
-                        "id": item.product.id,
-                        "title": item.product.title,
-                        "slug": item.product.slug,
-                        "image": (
-                            request.build_absolute_uri(build_media_url(item.product.image))
-                            if item.product.image
-                            else None
-                        ),
-                        "stock": item.product.stock,
-                        "stock_type": item.product.stock_type,
-                        "allow_custom_text": item.product.allow_custom_text,
-                        "allow_custom_image": item.product.allow_custom_image,
-                        "status": product_status,
-                        "can_view": True,
-                        "is_available_for_purchase": product_available,
-                        **serialize_category_trail(item.product),
-                        **serialize_pricing(item.product, resolved_variant, Decimal(str(price))),
-                    },
-                    "variant": variant_snapshot,
-                    "quantity": item.quantity,
-                    "custom_text": item.custom_text,
-                    "custom_images": build_secure_order_image_urls(request, item.custom_images.all()),
-                    "custom_image": (
-                        build_secure_order_media_url(request, item.custom_image)
-                        if item.custom_image
-                        else (
-                            build_secure_order_media_url(request, item.custom_images.first().image)
-                            if item.custom_images.exists()
-                            else None
-                        )
+        items.append(
+            {
+                "id": item.id,
+                "product": {
+                    "id": item.product.id,
+                    "title": item.product.title,
+                    "slug": item.product.slug,
+                    "image": (
+                        request.build_absolute_uri(build_media_url(item.product.image))
+                        if item.product.image
+                        else None
                     ),
-                }
-            )
+                    "stock": item.product.stock,
+                    "stock_type": item.product.stock_type,
+                    "allow_custom_text": item.product.allow_custom_text,
+                    "allow_custom_image": item.product.allow_custom_image,
+                    "status": product_status,
+                    "can_view": True,
+                    "is_available_for_purchase": product_available,
+                    **serialize_category_trail(item.product),
+                    **serialize_pricing(item.product, resolved_variant, Decimal(str(price))),
+                },
+                "variant": variant_snapshot,
+                "quantity": item.quantity,
+                "custom_text": item.custom_text,
+                "custom_images": build_secure_order_image_urls(request, custom_images),
+                "custom_image": (
+                    build_secure_order_media_url(request, item.custom_image)
+                    if item.custom_image
+                    else (
+                        build_secure_order_media_url(request, custom_images[0].image)
+                        if custom_images
+                        else None
+                    )
+                ),
+            }
+        )
+
+    return {"items": items, "total": str(total), "count": len(items)}
 
-        return Response({"items": items, "total": str(total), "count": len(items)})
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_cart(request):
+    try:
+        cache_key, etag = get_cart_cache_state(request)
+        if etag_matches(request, etag):
+            response = Response(status=304)
+        else:
+            payload = get_cached_cart(cache_key)
+            if payload is None:
+                payload = build_cart_payload(request)
+                set_cached_cart(cache_key, payload)
+            response = Response(payload)
+
+        if etag:
+            response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        return response
 
     except Exception as e:
         logger.exception(
@@ -1694,6 +1849,7 @@ def remove_from_cart(request, item_id):
 
     cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
     cart_item.delete()
+    bump_cart_version(request.user.id)
 
     return Response({"message": "Item removed"})
 
@@ -1723,6 +1879,7 @@ def update_cart_item(request, item_id):
 
     cart_item.quantity = quantity
     cart_item.save()
+    bump_cart_version(request.user.id)
 
     if variant:
         price = variant.slashed_price or variant.mrp
@@ -1741,6 +1898,142 @@ def update_cart_item(request, item_id):
     )
 
 
+CART_BATCH_MAX_OPERATIONS = 50
+
+
+class CartBatchError(Exception):
+    def __init__(self, message, index):
+        super().__init__(message)
+        self.index = index
+
+
+def apply_cart_batch_operations(user, operations):
+    """
+    Apply validated batch operations to the user's cart in order. Cart lines,
+    products and variants are loaded once up front; consecutive quantity
+    changes and removals are written with one bulk statement each, flushed
+    before every add so the add merges into the cart as it stands at that
+    point. Raises ``CartBatchError`` on the first invalid operation, so
+    callers should run this inside a transaction.
+    """
+    cart, _ = Cart.objects.get_or_create(user=user)
+    items_by_id = {
+        item.id: item
+        for item in CartItem.objects.select_for_update()
+        .filter(cart=cart)
+        .select_related("product", "variant")
+    }
+    resolve_cart_item_variants(list(items_by_id.values()), persist=True)
+
+    add_operations = [op for op in operations if op["op"] == CartBatchOperationSerializer.OP_ADD]
+    products_by_id = Product.objects.in_bulk({op["product_id"] for op in add_operations})
+    variants_by_id = ProductVariant.objects.select_related("size", "color").in_bulk(
+        {op["variant_id"] for op in add_operations if op.get("variant_id")}
+    )
+
+    updated = {}
+    removed = set()
+    pending_removals = set()
+    wishlist_product_ids = set()
+
+    def flush_pending_writes():
+        if pending_removals:
+            CartItem.objects.filter(cart=cart, id__in=pending_removals).delete()
+            pending_removals.clear()
+        if updated:
+            CartItem.objects.bulk_update(list(updated.values()), ["quantity"])
+            updated.clear()
+
+    for index, operation in enumerate(operations):
+        if operation["op"] == CartBatchOperationSerializer.OP_ADD:
+            product = products_by_id.get(operation["product_id"])
+            if not product:
+                raise CartBatchError("Invalid product.", index)
+            if not is_product_available_for_purchase(product):
+                raise CartBatchError("This product is no longer available.", index)
+
+            variant = None
+            if operation.get("variant_id"):
+                variant = variants_by_id.get(operation["variant_id"])
+                if not variant:
+                    raise CartBatchError("Invalid variant.", index)
+                if product.stock_type != "variants":
+                    raise CartBatchError("Variants are not supported for this product.", index)
+                if variant.product_id != product.id:
+                    raise CartBatchError("Selected variant does not belong to this product.", index)
+
+            flush_pending_writes()
+            upsert_plain_cart_item(
+                cart=cart,
+                product=product,
+                variant=variant,
+                quantity=operation["quantity"],
+                available_stock=variant.stock if variant else product.stock,
+            )
+            if operation["remove_from_wishlist"]:
+                wishlist_product_ids.add(product.id)
+            continue
+
+        item = items_by_id.get(operation["item_id"])
+        if item is None or item.id in removed:
+            raise CartBatchError("Cart item not found.", index)
+
+        if operation["op"] == CartBatchOperationSerializer.OP_REMOVE:
+            removed.add(item.id)
+            pending_removals.add(item.id)
+            updated.pop(item.id, None)
+            continue
+
+        available_stock = item.variant.stock if item.variant else item.product.stock
+        if operation["quantity"] > available_stock:
+            raise CartBatchError(f"Only {available_stock} items available in stock.", index)
+        item.quantity = operation["quantity"]
+        updated[item.id] = item
+
+    flush_pending_writes()
+    if wishlist_product_ids:
+        WishlistItem.objects.filter(user=user, product_id__in=wishlist_product_ids).delete()
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def cart_batch(request):
+    """
+    Apply several cart changes atomically and return the updated cart:
+    ``{"operations": [{"op": "add" | "update" | "remove", ...}, ...]}``.
+    """
+    operations = request.data.get("operations") if isinstance(request.data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return Response({"error": "operations must be a non-empty list."}, status=400)
+    if len(operations) > CART_BATCH_MAX_OPERATIONS:
+        return Response(
+            {"error": f"At most {CART_BATCH_MAX_OPERATIONS} operations are allowed per request."},
+            status=400,
+        )
+
+    serializer = CartBatchOperationSerializer(data=operations, many=True)
+    if not serializer.is_valid():
+        index, errors = next(
+            (index, errors) for index, errors in enumerate(serializer.errors) if errors
+        )
+        return Response({"error": get_first_error_message(errors), "index": index}, status=400)
+
+    try:
+        with transaction.atomic():
+            apply_cart_batch_operations(request.user, serializer.validated_data)
+    except CartBatchError as exc:
+        return Response({"error": str(exc), "index": exc.index}, status=400)
+
+    bump_cart_version(request.user.id)
+    cache_key, etag = get_cart_cache_state(request)
+    payload = build_cart_payload(request)
+    set_cached_cart(cache_key, payload)
+    response = Response(payload)
+    if etag:
+        response["ETag"] = etag
+    return response
+
+
 @api_view(["DELETE"])
 @permission_classes([IsAuthenticated])
 def clear_cart(request):
@@ -1748,13 +2041,240 @@ def clear_cart(request):
 
     if cart:
         CartItem.objects.filter(cart=cart).delete()
+        bump_cart_version(request.user.id)
 
     return Response({"message": "Cart cleared"})
 
 
+# ================= CUSTOMIZATION UPLOADS =================
+
+def serialize_customization_upload(request, upload):
+    return {
+        "id": upload.id,
+        "status": upload.status,
+        "error": upload.error or None,
+        "image": (
+            build_secure_order_media_url(request, upload.image)
+            if upload.status == CustomizationUpload.STATUS_READY and upload.image
+            else None
+        ),
+    }
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+@throttle_classes([CustomizationUploadThrottle])
+def create_customization_upload_view(request):
+    """
+    Accept one customization image and stream it to storage. Sanitizing runs
+    out of band; poll the upload until it is ``ready`` and pass its id to
+    ``add_to_cart`` as ``custom_upload_ids``.
+    """
+    try:
+        upload = create_customization_upload(request.user, request.FILES.get("image"))
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    return Response(serialize_customization_upload(request, upload), status=201)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_customization_upload(request, upload_id):
+    upload = get_object_or_404(CustomizationUpload, id=upload_id, user=request.user)
+    if should_process_upload_inline(upload):
+        # No worker is deployed, or it has not picked this up in time.
+        with transaction.atomic():
+            upload = CustomizationUpload.objects.select_for_update().get(id=upload.id)
+            process_customization_upload(upload)
+
+    return Response(serialize_customization_upload(request, upload))
+
+
+# ================= GUEST CART =================
+
+def build_guest_cart_payload(request, lines):
+    products_by_id = Product.objects.select_related("category", "sub_category").in_bulk(
+        {line["product_id"] for line in lines}
+    )
+    variants_by_id = ProductVariant.objects.select_related("size", "color").in_bulk(
+        {line["variant_id"] for line in lines if line.get("variant_id")}
+    )
+
+    items = []
+    total = Decimal("0.00")
+    for line in lines:
+        product = products_by_id.get(line["product_id"])
+        if not product:
+            continue
+        variant = variants_by_id.get(line["variant_id"]) if line.get("variant_id") else None
+        is_variant_missing = product.stock_type == "variants" and variant is None
+        product_available = is_product_available_for_purchase(product) and not is_variant_missing
+
+        if variant:
+            price = variant.slashed_price or variant.mrp or Decimal("0.00")
+        else:
+            price = get_product_price(product) or Decimal("0.00")
+        total += Decimal(price) * line["quantity"]
+
+        items.append(
+            {
+                "key": CartItem.build_merge_key(product.id, line.get("variant_id")),
+                "product": {
+                    "id": product.id,
+                    "title": product.title,
+                    "slug": product.slug,
+                    "image": (
+                        request.build_absolute_uri(build_media_url(product.image))
+                        if product.image
+                        else None
+                    ),
+                    "stock": product.stock,
+                    "stock_type": product.stock_type,
+                    "status": (
+                        "available" if product_available
+                        else "variant_missing" if is_variant_missing
+                        else "unavailable"
+                    ),
+                    "can_view": True,
+                    "is_available_for_purchase": product_available,
+                    **serialize_category_trail(product),
+                    **serialize_pricing(product, variant, Decimal(price)),
+                },
+                "variant": build_cart_item_variant_snapshot(CartItem(product=product), variant),
+                "quantity": line["quantity"],
+            }
+        )
+
+    return {"items": items, "total": str(total), "count": len(items)}
+
+
+def _guest_cart_response(request, lines, *, status=200):
+    response = Response(build_guest_cart_payload(request, lines), status=status)
+    set_guest_cart_cookie(response, lines)
+    return response
+
+
+def _parse_guest_cart_line(request, *, allow_zero=False):
+    try:
+        quantity = int(request.data.get("quantity", 1))
+    except (TypeError, ValueError):
+        raise ValueError("Quantity must be a valid integer.")
+    if quantity < (0 if allow_zero else 1):
+        raise ValueError("Quantity must be at least 1.")
+
+    serializer = AddToCartSerializer(
+        data={
+            "product_id": request.data.get("product_id"),
+            "quantity": max(quantity, 1),
+            "variant_id": request.data.get("variant_id"),
+        }
+    )
+    if not serializer.is_valid():
+        raise ValueError(get_first_error_message(serializer.errors))
+
+    product = serializer.validated_data["product"]
+    variant = serializer.validated_data["variant"]
+    if product.stock_type == "variants" and not variant:
+        raise ValueError("Please select a variant.")
+    return product, variant, quantity
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def get_guest_cart(request):
+    return Response(build_guest_cart_payload(request, load_guest_cart(request)))
+
+
+@api_view(["POST"])
+@permission_classes([AllowAny])
+@throttle_classes([GuestCartThrottle])
+def add_to_guest_cart(request):
+    try:
+        product, variant, quantity = _parse_guest_cart_line(request)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+    if not is_product_available_for_purchase(product):
+        return Response({"error": "This product is no longer available."}, status=400)
+
+    lines = load_guest_cart(request)
+    available_stock = variant.stock if variant else product.stock
+
+    line = find_guest_cart_line(lines, product.id, variant.id if variant else None)
+    if line is None:
+        if len(lines) >= GUEST_CART_MAX_LINES:
+            return Response({"error": "Your cart is full."}, status=400)
+        line = {"product_id": product.id, "variant_id": variant.id if variant else None, "quantity": 0}
+        lines.append(line)
+    line["quantity"] = min(line["quantity"] + quantity, available_stock)
+    if line["quantity"] < 1:
+        return Response({"error": "This product is out of stock."}, status=400)
+
+    return _guest_cart_response(request, lines, status=201)
+
+
+@api_view(["POST"])
+@permission_classes([AllowAny])
+@throttle_classes([GuestCartThrottle])
+def update_guest_cart_item(request):
+    """Set a guest line's quantity; a quantity of 0 removes the line."""
+    try:
+        product, variant, quantity = _parse_guest_cart_line(request, allow_zero=True)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    lines = load_guest_cart(request)
+    line = find_guest_cart_line(lines, product.id, variant.id if variant else None)
+    if line is None:
+        return Response({"error": "Cart item not found"}, status=404)
+
+    if quantity == 0:
+        lines.remove(line)
+    else:
+        available_stock = variant.stock if variant else product.stock
+        if quantity > available_stock:
+            return Response(
+                {"error": f"Only {available_stock} items available in stock."},
+                status=400,
+            )
+        line["quantity"] = quantity
+
+    return _guest_cart_response(request, lines)
+
+
+@api_view(["DELETE"])
+@permission_classes([AllowAny])
+def clear_guest_cart(request):
+    response = Response({"message": "Cart cleared"})
+    clear_guest_cart_cookie(response)
+    return response
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def merge_guest_cart(request):
+    """
+    Called once after login: folds the guest cart into the user's cart in
+    bulk, drops the guest cart and returns the merged cart.
+    """
+    merged = merge_guest_cart_lines(request.user, load_guest_cart(request))
+    if merged:
+        bump_cart_version(request.user.id)
+
+    cache_key, etag = get_cart_cache_state(request)
+    payload = build_cart_payload(request)
+    set_cached_cart(cache_key, payload)
+    response = Response({**payload, "merged": merged})
+    if etag:
+        response["ETag"] = etag
+    clear_guest_cart_cookie(response)
+    return response
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def get_available_coupons(request):
+    quote_versions = get_cart_quote_versions(request.user.id)
     cart = Cart.objects.filter(user=request.user).first()
     cart_items = []
 
@@ -1770,13 +2290,33 @@ def get_available_coupons(request):
 
     line_items = get_cart_line_items(cart_items)
     coupons = []
-    for coupon in get_coupon_queryset():
-        evaluation = evaluate_coupon_for_cart(coupon, request.user, line_items)
+    for coupon, evaluation in evaluate_coupons_for_cart(
+        get_coupon_queryset(),
+        request.user,
+        line_items,
+    ):
         if not evaluation["display_in_list"]:
             continue
-        coupons.append(serialize_coupon(coupon, evaluation))
+        serialized = serialize_coupon(coupon, evaluation)
+        if evaluation["eligible"]:
+            serialized["quote"] = issue_cart_quote(
+                user=request.user,
+                versions=quote_versions,
+                subtotal_amount=evaluation["subtotal"],
+                discount_amount=evaluation["discount_amount"],
+                coupon=coupon,
+            )
+        coupons.append(serialized)
 
-    return Response({"coupons": coupons})
+    quote = None
+    if line_items:
+        quote = issue_cart_quote(
+            user=request.user,
+            versions=quote_versions,
+            subtotal_amount=sum((item["line_total"] for item in line_items), Decimal("0.00")),
+        )
+
+    return Response({"coupons": coupons, "quote": quote})
 
 
 @api_view(["POST"])
@@ -1785,7 +2325,7 @@ def get_available_coupons(request):
 @transaction.atomic
 def create_order(request):
     try:
-        from .payment_services import release_expired_reservations, validate_checkout_address
+        from .payment_services import validate_checkout_address
 
         if not getattr(settings, "ALLOW_LEGACY_DIRECT_ORDER", False):
             return Response(
@@ -1795,7 +2335,6 @@ def create_order(request):
                 status=400,
             )
 
-        release_expired_reservations()
         cart = Cart.objects.filter(user=request.user).first()
 
         if not cart or not CartItem.objects.filter(cart=cart).exists():
@@ -1888,6 +2427,7 @@ def create_order(request):
             status="pending",
         )
 
+        sold_by_target = {}
         for item in cart_items:
             product = item.product
             variant = resolve_cart_item_variant(item, persist=True)
@@ -1927,10 +2467,19 @@ def create_order(request):
                 ProductVariant.objects.filter(id=variant.id).update(
                     stock=F("stock") - item.quantity
                 )
+                stock_key = ("variant", variant.id)
             else:
                 Product.objects.filter(id=product.id).update(
                     stock=F("stock") - item.quantity
                 )
+                stock_key = ("product", product.id)
+            sold_by_target[stock_key] = sold_by_target.get(stock_key, 0) - item.quantity
+
+        record_inventory_movements(
+            InventoryMovement.KIND_SALE,
+            stock=sold_by_target,
+            reference=order.order_number,
+        )
 
         if applied_coupon and discount_amount > 0:
             CouponUsage.objects.create(
@@ -1941,6 +2490,8 @@ def create_order(request):
             )
 
         cart_items.delete()
+        bump_cart_version(request.user.id)
+        bump_catalog_version()
 
         return Response(
             {
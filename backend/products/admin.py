@@ -1,3 +1,4 @@
+import io
 import json
 import os
 import uuid
@@ -6,19 +7,21 @@ from django.contrib import admin
 from django.contrib import messages
 from django import forms
 from django.conf import settings
-from django.core.exceptions import ValidationError
-from django.core.files.base import ContentFile
+from django.core.exceptions import PermissionDenied, ValidationError
 from django.core.files.uploadedfile import UploadedFile
-from django.db.models import IntegerField, Sum, Value
+from django.db.models import Exists, IntegerField, OuterRef, Subquery, Sum, Value
 from django.db.models.functions import Coalesce
 from django.http import HttpResponseNotAllowed
 from django.shortcuts import redirect, render
 from django.urls import path, reverse
-from django.utils.html import format_html
+from django.utils.html import format_html, format_html_join
 from urllib.parse import quote
 from orders.models import CartItem, OrderItem, StockReservation
+from reviews.models import ProductReview
+from .catalog_import import CatalogImportError, detect_catalog_format, import_catalog
+from .inventory_ledger import get_ledger_levels
 from .media_utils import build_media_url
-from .models import Banner, Category, SubCategory, Product, ProductVariant, ProductImage, Size, Color
+from .models import Banner, Category, InventoryMovement, SubCategory, Product, ProductVariant, ProductImage, Size, Color
 from utils.validation import optimize_catalog_image
 
 
@@ -300,12 +303,28 @@ class ProductAdmin(admin.ModelAdmin):
     ]
 
     def get_queryset(self, request):
+        # Correlated subqueries are evaluated per returned row, so on the
+        # changelist the cost is bounded by list_per_page rather than by the
+        # size of the catalog (and count() strips them entirely).
         queryset = super().get_queryset(request).annotate(
             variant_stock_total=Coalesce(
-                Sum("variants__stock"),
+                Subquery(
+                    ProductVariant.objects.filter(product=OuterRef("pk"))
+                    .order_by()
+                    .values("product")
+                    .annotate(total=Sum("stock"))
+                    .values("total")[:1],
+                    output_field=IntegerField(),
+                ),
                 Value(0),
                 output_field=IntegerField(),
-            )
+            ),
+            has_order_items=Exists(OrderItem.objects.filter(product=OuterRef("pk"))),
+            has_cart_items=Exists(CartItem.objects.filter(product=OuterRef("pk"))),
+            has_stock_reservations=Exists(
+                StockReservation.objects.filter(product=OuterRef("pk"))
+            ),
+            has_reviews=Exists(ProductReview.objects.filter(product=OuterRef("pk"))),
         )
         kind = getattr(request, "product_changelist_kind", None)
         if kind == "archived":
@@ -314,22 +333,21 @@ class ProductAdmin(admin.ModelAdmin):
             return queryset.filter(is_active=True)
         return queryset
 
-    def _deletable_product_ids(self, queryset):
-        """Product pks that can be permanently deleted (no order/cart/reservation refs)."""
-        ids = list(queryset.values_list("pk", flat=True))
-        if not ids:
-            return []
-        blocked = set()
-        blocked.update(
-            OrderItem.objects.filter(product_id__in=ids).values_list("product_id", flat=True)
-        )
-        blocked.update(
-            CartItem.objects.filter(product_id__in=ids).values_list("product_id", flat=True)
-        )
-        blocked.update(
-            StockReservation.objects.filter(product_id__in=ids).values_list("product_id", flat=True)
-        )
-        return [pk for pk in ids if pk not in blocked]
+    def _get_delete_blockers(self, obj):
+        """Blockers from the queryset annotations, falling back to the model check."""
+        if not hasattr(obj, "has_order_items"):
+            return obj.get_delete_blockers()
+
+        blockers = []
+        if obj.has_order_items:
+            blockers.append("order history")
+        if obj.has_cart_items:
+            blockers.append("shopping carts")
+        if obj.has_stock_reservations:
+            blockers.append("stock reservations")
+        if obj.has_reviews:
+            blockers.append("reviews")
+        return blockers
 
     def changelist_view(self, request, extra_context=None):
         is_archived = request.path.rstrip("/").endswith("/archived")
@@ -341,12 +359,17 @@ class ProductAdmin(admin.ModelAdmin):
         else:
             request.product_changelist_kind = "active"
 
-        extra_context = dict(extra_context or {})
-        if not is_archived:
-            extra_context["deletable_product_ids"] = self._deletable_product_ids(
-                self.get_queryset(request)
-            )
-        return super().changelist_view(request, extra_context=extra_context)
+        response = super().changelist_view(request, extra_context=extra_context)
+        changelist = getattr(response, "context_data", {}).get("cl")
+        if not is_archived and changelist is not None:
+            # Only rows on the current page can be selected, so deletability
+            # is derived from the already-evaluated page results.
+            response.context_data["deletable_product_ids"] = [
+                obj.pk
+                for obj in changelist.result_list
+                if not self._get_delete_blockers(obj)
+            ]
+        return response
 
     def get_list_display(self, request):
         if getattr(request, "product_changelist_kind", None) == "archived":
@@ -363,7 +386,7 @@ class ProductAdmin(admin.ModelAdmin):
         return super().get_list_display(request)
 
     def archived_reason(self, obj):
-        blockers = obj.get_delete_blockers()
+        blockers = self._get_delete_blockers(obj)
         return ", ".join(blockers) if blockers else "Archived manually"
     archived_reason.short_description = "Archive reason"
 
@@ -423,11 +446,15 @@ class ProductAdmin(admin.ModelAdmin):
                 'description': 'Allow customers to customize this product'
             }),
             ('Stock Management', {
-                'fields': ('stock_type', 'stock', 'mrp', 'slashed_price', 'discount_percent')
+                'fields': ('stock_type', 'stock', 'hot_inventory', 'mrp', 'slashed_price', 'discount_percent')
             }),
         )
         if obj:
             fieldsets += (
+                ("Inventory Ledger", {
+                    "fields": ("ledger_levels",),
+                    "description": "Stock as recorded by the inventory ledger: the latest snapshot plus the movements booked since.",
+                }),
                 ("Deletion", {
                     "fields": ("deletion_status",),
                     "description": "Products can be permanently deleted only when they are not referenced in carts, orders, or stock reservations.",
@@ -438,7 +465,7 @@ class ProductAdmin(admin.ModelAdmin):
     def get_readonly_fields(self, request, obj=None):
         readonly_fields = list(super().get_readonly_fields(request, obj))
         if obj:
-            readonly_fields.append("deletion_status")
+            readonly_fields.extend(["ledger_levels", "deletion_status"])
         return readonly_fields
     
     class Media:
@@ -545,13 +572,6 @@ class ProductAdmin(admin.ModelAdmin):
                 )
                 return
 
-        def read_bytes(file_field):
-            try:
-                with file_field.open("rb") as src:
-                    return src.read()
-            except (OSError, ValueError, IOError):
-                return b""
-
         # Resolve every listed key to the file source it represents, keeping
         # the flat list order (new files are consumed in slot order):
         #   ("main", None)             → the current main image (Product.image)
@@ -572,84 +592,76 @@ class ProductAdmin(admin.ModelAdmin):
                     new_counter += 1
             # Unknown or already-deleted keys are simply ignored.
 
-        # If the current main image is demoted to a plain gallery row, snapshot
-        # it into a ProductImage BEFORE Product.image is overwritten below.
-        if product.image and main_key != "main":
-            for key, position, source in slots:
-                if key != "main":
-                    continue
-                content = read_bytes(product.image)
-                if content:
-                    ext = os.path.splitext(product.image.name or "")[1]
-                    ProductImage.objects.create(
-                        product=product,
-                        image=ContentFile(content, name=f"{uuid.uuid4().hex}{ext}"),
-                        order=position,
-                    )
-                break
-
-        # Resolve the selected main image.
+        # Resolve the selected main image. Existing files are referenced by
+        # name only; nothing is downloaded from or re-uploaded to storage.
         main_resolved = False
+        promoted_row = None
         for key, position, source in slots:
             if key != main_key:
                 continue
             kind, value = source
             if kind == "existing":
-                content = read_bytes(value.image)
-                if content:
-                    ext = os.path.splitext(value.image.name or "")[1]
-                    product.image.save(f"{uuid.uuid4().hex}{ext}", ContentFile(content))
+                if value.image:
+                    product.image = value.image.name
                     main_resolved = True
-                value.delete()
+                promoted_row = value
             elif kind == "new":
                 ext = os.path.splitext(value.name or "")[1]
-                product.image.save(f"{uuid.uuid4().hex}{ext}", value)
+                product.image.save(f"{uuid.uuid4().hex}{ext}", value, save=False)
                 main_resolved = True
             elif kind == "main":
                 # Product.image already holds the main image — keep it.
                 main_resolved = bool(product.image)
             break
 
-        # Assign the remaining rows to the gallery in list order.
+        # Assign the remaining rows to the gallery in list order. A demoted
+        # main image takes over the promoted row, so the two simply swap names.
+        updated_rows = []
+        created_rows = []
         for key, position, source in slots:
             if key == main_key:
                 continue
             kind, value = source
             if kind == "existing":
                 value.order = position
-                value.save(update_fields=["order"])
+                updated_rows.append(value)
             elif kind == "new":
-                ProductImage.objects.create(
-                    product=product,
-                    image=value,
-                    order=position,
+                created_rows.append(
+                    ProductImage(product=product, image=value, order=position)
                 )
-            # kind == "main" was already snapshotted into a gallery row above.
-
-        # The previous main image was replaced and is no longer referenced by
-        # any ProductImage row (demoted rows are fresh copies), so remove its
-        # file from storage to avoid leaving an orphaned asset behind.
-        if (
-            main_resolved
-            and old_main_name
-            and main_key != "main"
-            and not ProductImage.objects.filter(product=product, image=old_main_name).exists()
-        ):
-            try:
-                product.image.storage.delete(old_main_name)
-            except (OSError, ValueError, IOError):
-                pass
+            elif kind == "main" and old_main_name:
+                if promoted_row is not None:
+                    promoted_row.image = old_main_name
+                    promoted_row.order = position
+                    updated_rows.append(promoted_row)
+                    promoted_row = None
+                else:
+                    created_rows.append(
+                        ProductImage(product=product, image=old_main_name, order=position)
+                    )
+
+        if updated_rows:
+            ProductImage.objects.bulk_update(updated_rows, ["image", "order"])
+        if created_rows:
+            ProductImage.objects.bulk_create(created_rows)
+
+        # The promoted row's file now lives on Product.image; blank the row
+        # before deleting it so no cleanup is queued for a file still in use.
+        if promoted_row is not None:
+            ProductImage.objects.filter(pk=promoted_row.pk).update(image="")
+            promoted_row.image = None
+            promoted_row.delete()
 
         # No valid main selection → clear the main image.
         if not main_resolved:
-            if product.image:
-                product.image.delete(save=False)
-                product.image = None
+            product.image = None
 
         # Rows that were not listed in the widget are treated as removed.
         for row in existing.values():
             row.delete()
 
+        # Saving runs the media signal, which deletes the previous main file
+        # only if no gallery row references it any more.
         product.save(update_fields=["image"])
 
     def get_total_stock(self, obj):
@@ -658,8 +670,37 @@ class ProductAdmin(admin.ModelAdmin):
         return getattr(obj, "variant_stock_total", 0)
     get_total_stock.short_description = 'Total Stock'
 
+    def ledger_levels(self, obj):
+        if obj.stock_type == "main":
+            targets = [("Stock", ("product", obj.id))]
+        else:
+            targets = [
+                (variant.sku or f"Variant {variant.id}", ("variant", variant.id))
+                for variant in obj.variants.order_by("id")
+            ]
+        if not targets:
+            return "-"
+
+        rows = []
+        for label, key in targets:
+            levels = get_ledger_levels(key)
+            rows.append((label, levels["stock"], levels["reserved_quantity"], levels["available"]))
+        return format_html_join(
+            format_html("<br>"),
+            "{}: {} in stock, {} reserved, {} available",
+            rows,
+        )
+    ledger_levels.short_description = "Ledger levels"
+
+    def get_deleted_objects(self, objs, request):
+        deleted_objects, model_count, perms_needed, protected = super().get_deleted_objects(objs, request)
+        # Deleting a product is the ledger's only purge path: its movements and
+        # snapshots cascade with it even though the ledger admin is read-only.
+        perms_needed.discard(InventoryMovement._meta.verbose_name)
+        return deleted_objects, model_count, perms_needed, protected
+
     def deletion_status(self, obj):
-        blockers = obj.get_delete_blockers()
+        blockers = self._get_delete_blockers(obj)
         if not blockers:
             return "Eligible for permanent delete."
 
@@ -746,6 +787,11 @@ class ProductAdmin(admin.ModelAdmin):
                 self.admin_site.admin_view(self.delete_confirm_view),
                 name="products_product_delete_confirm",
             ),
+            path(
+                "import/",
+                self.admin_site.admin_view(self.import_catalog_view),
+                name="products_product_import",
+            ),
             path(
                 "<path:object_id>/restore/",
                 self.admin_site.admin_view(self.restore_product_view),
@@ -861,6 +907,53 @@ class ProductAdmin(admin.ModelAdmin):
             },
         )
 
+    def import_catalog_view(self, request):
+        if not (self.has_add_permission(request) and self.has_change_permission(request)):
+            raise PermissionDenied
+
+        result = None
+        if request.method == "POST":
+            upload = request.FILES.get("catalog_file")
+            if not upload:
+                self.message_user(request, "Choose a CSV or JSONL file to import.", level=messages.ERROR)
+            else:
+                dry_run = request.POST.get("dry_run") in {"1", "on", "true", "yes"}
+                stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+                try:
+                    result = import_catalog(
+                        stream,
+                        file_format=detect_catalog_format(upload.name),
+                        dry_run=dry_run,
+                    )
+                except CatalogImportError as exc:
+                    self.message_user(request, str(exc), level=messages.ERROR)
+                else:
+                    summary = (
+                        f"products created {result.products_created}, updated "
+                        f"{result.products_updated}; variants created "
+                        f"{result.variants_created}, updated {result.variants_updated}"
+                    )
+                    if dry_run:
+                        self.message_user(request, f"Dry run: {summary}. Nothing was saved.", level=messages.INFO)
+                    else:
+                        self.message_user(request, f"Imported catalog: {summary}.", level=messages.SUCCESS)
+                    if result.errors:
+                        self.message_user(
+                            request,
+                            f"{len(result.errors)} row(s) were skipped because of errors.",
+                            level=messages.WARNING,
+                        )
+
+        return render(
+            request,
+            "admin/products/product/import_catalog.html",
+            {
+                "result": result,
+                "opts": self.model._meta,
+                "title": "Import catalog",
+            },
+        )
+
     def restore_product_view(self, request, object_id):
         product = self.get_object(request, object_id)
         if not product:
@@ -959,3 +1052,23 @@ class SubCategoryAdmin(admin.ModelAdmin):
     list_filter = ("category",)
     search_fields = ("name",)
     prepopulated_fields = {"slug": ("name",)}
+
+
+@admin.register(InventoryMovement)
+class InventoryMovementAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "kind", "product", "variant", "stock_delta", "reserved_delta", "reference")
+    list_select_related = ("product", "variant__product", "variant__size", "variant__color")
+    list_filter = ("kind",)
+    search_fields = ("reference", "product__title", "variant__sku")
+    list_per_page = 100
+
+    # The ledger is append-only; rows only go away with their product or
+    # variant (see ProductAdmin.get_deleted_objects).
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,53 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+CATALOG_VERSION_CACHE_KEY = "products:catalog-version:v1"
+
+
+def cache_is_shared():
+    """Whether every worker sees the same cache (e.g. Redis, not LocMemCache)."""
+    return settings.CACHE_IS_SHARED
+
+
+def initial_cache_version():
+    # Seed counters from the clock so a counter lost to eviction never
+    # restarts at a value that older cached entries were keyed by.
+    return int(time.time() * 1000)
+
+
+def get_versioned_counter(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, initial_cache_version(), timeout=None)
+        version = cache.get(key) or initial_cache_version()
+    return version
+
+
+def bump_versioned_counter(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, initial_cache_version(), timeout=None)
+        return cache.incr(key)
+
+
+def bump_versioned_counter_on_commit(key):
+    """
+    Bump now and again once the surrounding transaction commits, so a reader
+    that cached pre-commit rows under the intermediate version is discarded.
+    """
+    bump_versioned_counter(key)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: bump_versioned_counter(key))
+
+
+def get_catalog_version():
+    """Current catalog version; bumped whenever prices, stock or listings change."""
+    return get_versioned_counter(CATALOG_VERSION_CACHE_KEY)
+
+
+def bump_catalog_version():
+    bump_versioned_counter_on_commit(CATALOG_VERSION_CACHE_KEY)
@@ -0,0 +1,583 @@
+"""
+Streaming catalog import shared by the ``import_catalog`` command and the
+product admin upload.
+
+Files are read row by row and processed in chunks. Each chunk is validated
+against in-memory lookups for categories, subcategories, sizes and colors,
+then written with ``bulk_create`` / ``bulk_update`` while deriving the same
+fields ``Product.save`` and ``ProductVariant.save`` would (slug, rounded
+prices, discount %, SKU). Bulk writes skip the per-instance media signals,
+which is fine because imports never touch image fields.
+"""
+
+import csv
+import json
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, transaction
+from django.utils.text import slugify
+
+from .caching import bump_catalog_version
+from .models import (
+    Category,
+    Color,
+    Product,
+    ProductVariant,
+    Size,
+    SubCategory,
+    build_variant_sku,
+    calculate_discount_percent,
+    round_price,
+)
+
+CATALOG_IMPORT_FORMATS = ("csv", "jsonl")
+CATALOG_IMPORT_CHUNK_SIZE = 500
+CATALOG_IMPORT_MAX_REPORTED_CHANGES = 200
+
+PRODUCT_DIFF_FIELDS = (
+    "title",
+    "description",
+    "mrp",
+    "slashed_price",
+    "discount_percent",
+    "stock",
+    "stock_type",
+    "category_id",
+    "sub_category_id",
+    "allow_custom_image",
+    "custom_image_limit",
+    "allow_custom_text",
+    "is_active",
+)
+VARIANT_DIFF_FIELDS = (
+    "mrp",
+    "slashed_price",
+    "discount_percent",
+    "stock",
+    "sku",
+    "size_id",
+    "color_id",
+)
+VARIANT_CSV_COLUMNS = {
+    "size": "size",
+    "color": "color",
+    "sku": "sku",
+    "variant_mrp": "mrp",
+    "variant_slashed_price": "slashed_price",
+    "variant_stock": "stock",
+}
+TRUE_VALUES = {"1", "true", "yes", "y", "on"}
+FALSE_VALUES = {"0", "false", "no", "n", "off"}
+
+
+class CatalogImportError(Exception):
+    pass
+
+
+class CatalogRowError(Exception):
+    pass
+
+
+@dataclass
+class CatalogImportResult:
+    dry_run: bool = False
+    products_created: int = 0
+    products_updated: int = 0
+    products_unchanged: int = 0
+    variants_created: int = 0
+    variants_updated: int = 0
+    variants_unchanged: int = 0
+    changes: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+
+    def record_change(self, action, kind, key, changes):
+        if len(self.changes) < CATALOG_IMPORT_MAX_REPORTED_CHANGES:
+            self.changes.append(
+                {"action": action, "type": kind, "key": key, "changes": changes}
+            )
+
+    def record_error(self, line, message):
+        self.errors.append({"line": line, "error": message})
+
+    def merge(self, other):
+        for name in (
+            "products_created",
+            "products_updated",
+            "products_unchanged",
+            "variants_created",
+            "variants_updated",
+            "variants_unchanged",
+        ):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for change in other.changes:
+            if len(self.changes) >= CATALOG_IMPORT_MAX_REPORTED_CHANGES:
+                break
+            self.changes.append(change)
+        self.errors.extend(other.errors)
+
+    def as_dict(self):
+        return {
+            "dry_run": self.dry_run,
+            "products": {
+                "created": self.products_created,
+                "updated": self.products_updated,
+                "unchanged": self.products_unchanged,
+            },
+            "variants": {
+                "created": self.variants_created,
+                "updated": self.variants_updated,
+                "unchanged": self.variants_unchanged,
+            },
+            "changes": self.changes,
+            "errors": self.errors,
+        }
+
+
+def _clean(value):
+    if value is None:
+        return ""
+    return str(value).strip()
+
+
+def iter_csv_records(stream):
+    """
+    Yield ``(line, record)`` per product. Consecutive rows that share a
+    product (same slug, or same title when no slug is given) are merged and
+    their size/color/sku columns become the product's variants.
+    """
+    reader = csv.DictReader(stream)
+    current_key = None
+    current = None
+    current_line = None
+
+    for row in reader:
+        line = reader.line_num
+        row = {_clean(key).lower(): value for key, value in row.items() if key}
+        key = _clean(row.get("slug")) or slugify(_clean(row.get("title")))
+
+        if current is None or key != current_key:
+            if current is not None:
+                yield current_line, current
+            current_key = key
+            current_line = line
+            current = {
+                name: value
+                for name, value in row.items()
+                if name not in VARIANT_CSV_COLUMNS and _clean(value) != ""
+            }
+            current["variants"] = []
+
+        variant = {
+            target: row.get(column)
+            for column, target in VARIANT_CSV_COLUMNS.items()
+            if _clean(row.get(column)) != ""
+        }
+        if variant:
+            variant["line"] = line
+            current["variants"].append(variant)
+
+    if current is not None:
+        yield current_line, current
+
+
+def iter_jsonl_records(stream):
+    for line, raw in enumerate(stream, start=1):
+        raw = raw.strip()
+        if not raw:
+            continue
+        try:
+            record = json.loads(raw)
+        except json.JSONDecodeError as exc:
+            yield line, exc
+            continue
+        if not isinstance(record, dict):
+            yield line, CatalogRowError("Each line must be a JSON object.")
+            continue
+        yield line, record
+
+
+def iter_catalog_records(stream, *, file_format):
+    if file_format == "csv":
+        return iter_csv_records(stream)
+    if file_format == "jsonl":
+        return iter_jsonl_records(stream)
+    raise CatalogImportError(
+        f"Unsupported catalog format '{file_format}'. Use one of: "
+        + ", ".join(CATALOG_IMPORT_FORMATS)
+        + "."
+    )
+
+
+def parse_decimal_value(value, name):
+    try:
+        parsed = Decimal(_clean(value))
+    except (InvalidOperation, ValueError):
+        raise CatalogRowError(f"{name} must be a number.")
+    if not parsed.is_finite():
+        raise CatalogRowError(f"{name} must be a number.")
+    if parsed < 0:
+        raise CatalogRowError(f"{name} cannot be negative.")
+    return round_price(parsed)
+
+
+def parse_int_value(value, name, *, minimum=0):
+    try:
+        parsed = int(_clean(value))
+    except (TypeError, ValueError):
+        raise CatalogRowError(f"{name} must be a whole number.")
+    if parsed < minimum:
+        raise CatalogRowError(f"{name} must be at least {minimum}.")
+    return parsed
+
+
+def _parse_bool(value, name):
+    if isinstance(value, bool):
+        return value
+    normalized = _clean(value).lower()
+    if normalized in TRUE_VALUES:
+        return True
+    if normalized in FALSE_VALUES:
+        return False
+    raise CatalogRowError(f"{name} must be true or false.")
+
+
+def _has_value(record, name):
+    value = record.get(name)
+    return value is not None and _clean(value) != ""
+
+
+class CatalogLookups:
+    """In-memory maps used to resolve names and slugs without per-row queries."""
+
+    def __init__(self):
+        self.categories = {}
+        for category in Category.objects.all():
+            self.categories[category.slug.lower()] = category
+            self.categories.setdefault(category.name.strip().lower(), category)
+
+        self.subcategories = {}
+        for subcategory in SubCategory.objects.all():
+            self.subcategories[(subcategory.category_id, subcategory.slug.lower())] = subcategory
+            self.subcategories.setdefault(
+                (subcategory.category_id, subcategory.name.strip().lower()),
+                subcategory,
+            )
+
+        self.sizes = {size.name.strip().lower(): size for size in Size.objects.all()}
+        self.colors = {color.name.strip().lower(): color for color in Color.objects.all()}
+
+    def category(self, value):
+        category = self.categories.get(_clean(value).lower())
+        if category is None:
+            raise CatalogRowError(f"Unknown category '{_clean(value)}'.")
+        return category
+
+    def subcategory(self, category, value):
+        subcategory = self.subcategories.get((category.id, _clean(value).lower()))
+        if subcategory is None:
+            raise CatalogRowError(
+                f"Unknown subcategory '{_clean(value)}' for category '{category.name}'."
+            )
+        return subcategory
+
+    def size(self, value):
+        if not _clean(value):
+            return None
+        size = self.sizes.get(_clean(value).lower())
+        if size is None:
+            raise CatalogRowError(f"Unknown size '{_clean(value)}'.")
+        return size
+
+    def color(self, value):
+        if not _clean(value):
+            return None
+        color = self.colors.get(_clean(value).lower())
+        if color is None:
+            raise CatalogRowError(f"Unknown color '{_clean(value)}'.")
+        return color
+
+
+def _snapshot(instance, fields):
+    return {name: getattr(instance, name) for name in fields}
+
+
+def _diff(before, instance, fields):
+    changes = {}
+    for name in fields:
+        old_value = before.get(name) if before is not None else None
+        new_value = getattr(instance, name)
+        if before is None or old_value != new_value:
+            changes[name] = [
+                None if old_value is None else str(old_value),
+                None if new_value is None else str(new_value),
+            ]
+    return changes
+
+
+def _apply_product_record(product, record, lookups):
+    title = _clean(record.get("title"))
+    if title:
+        product.title = title
+    elif not product.pk:
+        raise CatalogRowError("title is required.")
+
+    if _has_value(record, "description"):
+        product.description = _clean(record["description"])
+    if _has_value(record, "mrp"):
+        product.mrp = parse_decimal_value(record["mrp"], "mrp")
+    if _has_value(record, "slashed_price"):
+        product.slashed_price = parse_decimal_value(record["slashed_price"], "slashed_price")
+    if _has_value(record, "stock"):
+        product.stock = parse_int_value(record["stock"], "stock")
+    if _has_value(record, "stock_type"):
+        stock_type = _clean(record["stock_type"]).lower()
+        if stock_type not in {"main", "variants"}:
+            raise CatalogRowError("stock_type must be 'main' or 'variants'.")
+        product.stock_type = stock_type
+    elif record.get("variants") and not product.pk:
+        product.stock_type = "variants"
+
+    if _has_value(record, "category"):
+        product.category = lookups.category(record["category"])
+    if _has_value(record, "sub_category"):
+        if product.category is None:
+            raise CatalogRowError("sub_category requires a category.")
+        product.sub_category = lookups.subcategory(product.category, record["sub_category"])
+
+    for name in ("allow_custom_image", "allow_custom_text", "is_active"):
+        if _has_value(record, name):
+            setattr(product, name, _parse_bool(record[name], name))
+    if _has_value(record, "custom_image_limit"):
+        product.custom_image_limit = parse_int_value(
+            record["custom_image_limit"], "custom_image_limit", minimum=1
+        )
+
+    # Same derived fields as Product.save and the admin form.
+    product.mrp = round_price(product.mrp)
+    product.slashed_price = round_price(product.slashed_price)
+    product.discount_percent = calculate_discount_percent(product.mrp, product.slashed_price)
+    if not product.allow_custom_image:
+        product.custom_image_limit = 1
+    if product.stock_type == "variants":
+        product.stock = 0
+
+
+def _apply_variant_record(variant, record):
+    if _has_value(record, "mrp"):
+        variant.mrp = parse_decimal_value(record["mrp"], "variant mrp")
+    if _has_value(record, "slashed_price"):
+        variant.slashed_price = parse_decimal_value(record["slashed_price"], "variant slashed_price")
+    if _has_value(record, "stock"):
+        variant.stock = parse_int_value(record["stock"], "variant stock")
+    if _has_value(record, "sku"):
+        variant.sku = _clean(record["sku"])
+
+    variant.mrp = round_price(variant.mrp)
+    variant.slashed_price = round_price(variant.slashed_price)
+    variant.discount_percent = calculate_discount_percent(variant.mrp, variant.slashed_price)
+
+
+def _import_chunk(records, lookups, result, *, dry_run):
+    chunk_result = CatalogImportResult(dry_run=dry_run)
+    try:
+        _plan_and_write_chunk(records, lookups, chunk_result, dry_run=dry_run)
+    except IntegrityError as exc:
+        # The chunk was rolled back as a whole; report it against its first row.
+        result.errors.extend(chunk_result.errors)
+        result.record_error(records[0][0], f"Chunk rejected by the database: {exc}")
+        return
+    result.merge(chunk_result)
+
+
+def _plan_and_write_chunk(records, lookups, result, *, dry_run):
+    slugs = {}
+    for line, record in records:
+        if isinstance(record, Exception):
+            result.record_error(line, str(record))
+            continue
+        slug = _clean(record.get("slug")) or slugify(_clean(record.get("title")))
+        if not slug:
+            result.record_error(line, "A title or slug is required.")
+            continue
+        if slug in slugs:
+            result.record_error(line, f"Duplicate product '{slug}' in the same chunk.")
+            continue
+        slugs[slug] = (line, record)
+
+    existing_products = Product.objects.in_bulk(list(slugs), field_name="slug")
+    existing_variants = {}
+    for variant in ProductVariant.objects.filter(
+        product__in=list(existing_products.values())
+    ).select_related("size", "color"):
+        existing_variants.setdefault(variant.product_id, []).append(variant)
+
+    requested_skus = {
+        _clean(variant.get("sku"))
+        for _, record in slugs.values()
+        for variant in record.get("variants") or []
+        if isinstance(variant, dict) and _has_value(variant, "sku")
+    }
+    sku_owners = dict(
+        ProductVariant.objects.filter(sku__in=requested_skus).values_list("sku", "product_id")
+    )
+
+    planned = []
+    for slug, (line, record) in slugs.items():
+        product = existing_products.get(slug) or Product(slug=slug)
+        before = _snapshot(product, PRODUCT_DIFF_FIELDS) if product.pk else None
+        try:
+            _apply_product_record(product, record, lookups)
+            variants = _plan_variants(
+                product, record, lookups, existing_variants.get(product.pk, []), sku_owners
+            )
+        except CatalogRowError as exc:
+            result.record_error(line, f"{slug}: {exc}")
+            continue
+
+        changes = _diff(before, product, PRODUCT_DIFF_FIELDS)
+        planned.append((product, before, changes, variants))
+
+    products_to_create = [product for product, before, _, _ in planned if before is None]
+    products_to_update = [
+        product for product, before, changes, _ in planned if before is not None and changes
+    ]
+    update_fields = sorted(
+        {
+            name.removesuffix("_id")
+            for product, before, changes, _ in planned
+            if before is not None
+            for name in changes
+        }
+    )
+
+    with transaction.atomic():
+        if not dry_run:
+            if products_to_create:
+                Product.objects.bulk_create(products_to_create)
+            if products_to_update:
+                Product.objects.bulk_update(products_to_update, update_fields)
+
+        variants_to_create = []
+        variants_to_update = []
+        variant_update_fields = set()
+        for product, before, changes, variants in planned:
+            if before is None:
+                result.products_created += 1
+                result.record_change("create", "product", product.slug, changes)
+            elif changes:
+                result.products_updated += 1
+                result.record_change("update", "product", product.slug, changes)
+            else:
+                result.products_unchanged += 1
+
+            for variant, variant_before in variants:
+                variant.product = product
+                if not variant.sku:
+                    variant.sku = build_variant_sku(
+                        product.pk,
+                        variant.size.name if variant.size else "",
+                        variant.color.name if variant.color else "",
+                    )
+                variant_changes = _diff(variant_before, variant, VARIANT_DIFF_FIELDS)
+                label = f"{product.slug}:{variant.sku}"
+                if variant_before is None:
+                    result.variants_created += 1
+                    result.record_change("create", "variant", label, variant_changes)
+                    variants_to_create.append(variant)
+                elif variant_changes:
+                    result.variants_updated += 1
+                    result.record_change("update", "variant", label, variant_changes)
+                    variants_to_update.append(variant)
+                    variant_update_fields.update(variant_changes)
+                else:
+                    result.variants_unchanged += 1
+
+        if not dry_run:
+            if variants_to_create:
+                ProductVariant.objects.bulk_create(variants_to_create)
+            if variants_to_update:
+                ProductVariant.objects.bulk_update(
+                    variants_to_update, sorted(variant_update_fields)
+                )
+
+
+def _plan_variants(product, record, lookups, existing, sku_owners):
+    variant_records = record.get("variants") or []
+    if not isinstance(variant_records, list):
+        raise CatalogRowError("variants must be a list.")
+    if variant_records and product.stock_type != "variants":
+        raise CatalogRowError("variants require stock_type 'variants'.")
+
+    by_sku = {variant.sku: variant for variant in existing}
+    by_options = {(variant.size_id, variant.color_id): variant for variant in existing}
+    seen = set()
+    planned = []
+    for variant_record in variant_records:
+        if not isinstance(variant_record, dict):
+            raise CatalogRowError("Each variant must be an object.")
+
+        size = lookups.size(variant_record.get("size"))
+        color = lookups.color(variant_record.get("color"))
+        options = (size.id if size else None, color.id if color else None)
+        if options in seen:
+            raise CatalogRowError("Duplicate size/color combination in variants.")
+        seen.add(options)
+
+        sku = _clean(variant_record.get("sku"))
+        variant = by_sku.get(sku) if sku else None
+        variant = variant or by_options.get(options)
+        if sku and sku in sku_owners and sku_owners[sku] != product.pk:
+            raise CatalogRowError(f"SKU '{sku}' already belongs to another product.")
+
+        before = None
+        if variant is None:
+            variant = ProductVariant(size=size, color=color)
+        else:
+            before = _snapshot(variant, VARIANT_DIFF_FIELDS)
+            variant.size = size
+            variant.color = color
+        _apply_variant_record(variant, variant_record)
+        planned.append((variant, before))
+    return planned
+
+
+def _chunked(records, size):
+    chunk = []
+    for item in records:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def detect_catalog_format(file_name):
+    extension = str(file_name or "").rsplit(".", 1)[-1].lower()
+    if extension in {"jsonl", "ndjson"}:
+        return "jsonl"
+    return "csv"
+
+
+def import_catalog(stream, *, file_format, dry_run=False, chunk_size=CATALOG_IMPORT_CHUNK_SIZE):
+    """Import a CSV/JSONL catalog stream. Returns a ``CatalogImportResult``."""
+    records = iter_catalog_records(stream, file_format=file_format)
+    lookups = CatalogLookups()
+    result = CatalogImportResult(dry_run=dry_run)
+
+    try:
+        for chunk in _chunked(records, max(int(chunk_size), 1)):
+            _import_chunk(chunk, lookups, result, dry_run=dry_run)
+    except (csv.Error, UnicodeDecodeError) as exc:
+        raise CatalogImportError(f"Unable to read catalog file: {exc}") from exc
+
+    if not dry_run and (
+        result.products_created
+        or result.products_updated
+        or result.variants_created
+        or result.variants_updated
+    ):
+        # Bulk writes skip the model signals that normally invalidate caches.
+        bump_catalog_version()
+    return result
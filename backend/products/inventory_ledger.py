@@ -0,0 +1,215 @@
+"""
+Append-only inventory ledger.
+
+Every change to ``stock`` or ``reserved_quantity`` is also written as an
+``InventoryMovement`` keyed like ``StockReservation``
+(``("product" | "variant", id)``): sales, reservations, releases,
+replacements and adjustments (product saves and the warehouse sync).
+Movements are only ever inserted, so recording one takes no lock on the
+product row and the ledger doubles as an audit trail.
+
+``take_inventory_snapshots`` periodically rolls settled movements into one
+``InventorySnapshot`` per target, and ``get_ledger_levels`` reads a target as
+its snapshot plus the movements recorded since, through the ``(target, id)``
+indexes. The ``stock`` / ``reserved_quantity`` columns stay what checkout
+guards on; ``find_inventory_drift`` compares them with the ledger and
+``record_drift_adjustments`` books the difference for writers that bypass it
+(e.g. the bulk catalog import).
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import InventoryMovement, InventorySnapshot, Product, ProductVariant
+
+TARGET_FIELDS = {"product": "product_id", "variant": "variant_id"}
+
+
+def get_target_key(instance):
+    if instance.variant_id:
+        return ("variant", instance.variant_id)
+    return ("product", instance.product_id)
+
+
+def build_inventory_movements(kind, *, stock=None, reserved=None, reference=""):
+    """
+    One unsaved ``kind`` movement per target in the ``stock`` and ``reserved``
+    ``{("product" | "variant", id): delta}`` maps, skipping zero deltas.
+    """
+    stock = stock or {}
+    reserved = reserved or {}
+    movements = []
+    for key in sorted(set(stock) | set(reserved)):
+        target_kind, target_id = key
+        stock_delta = stock.get(key, 0)
+        reserved_delta = reserved.get(key, 0)
+        if not target_id or not (stock_delta or reserved_delta):
+            continue
+        movements.append(
+            InventoryMovement(
+                kind=kind,
+                stock_delta=stock_delta,
+                reserved_delta=reserved_delta,
+                reference=str(reference or "")[:64],
+                **{TARGET_FIELDS[target_kind]: target_id},
+            )
+        )
+    return movements
+
+
+def record_inventory_movements(kind, *, stock=None, reserved=None, reference=""):
+    """Insert the movements of ``build_inventory_movements``. Returns the rows written."""
+    movements = build_inventory_movements(kind, stock=stock, reserved=reserved, reference=reference)
+    if movements:
+        InventoryMovement.objects.bulk_create(movements)
+    return len(movements)
+
+
+def get_ledger_levels(target_key):
+    """
+    Return ``{"stock", "reserved_quantity", "available"}`` for one target from
+    its snapshot and the movements recorded after it.
+    """
+    target_kind, target_id = target_key
+    target_filter = {TARGET_FIELDS[target_kind]: target_id}
+
+    snapshot = InventorySnapshot.objects.filter(**target_filter).first()
+    stock = snapshot.stock if snapshot else 0
+    reserved = snapshot.reserved_quantity if snapshot else 0
+    since = snapshot.last_movement_id if snapshot else 0
+
+    totals = InventoryMovement.objects.filter(id__gt=since, **target_filter).aggregate(
+        stock=Coalesce(Sum("stock_delta"), 0),
+        reserved=Coalesce(Sum("reserved_delta"), 0),
+    )
+    stock += totals["stock"]
+    reserved += totals["reserved"]
+    return {
+        "stock": stock,
+        "reserved_quantity": reserved,
+        "available": max(0, stock - reserved),
+    }
+
+
+def _sum_movements(movements):
+    totals = {}
+    for product_id, variant_id, stock_delta, reserved_delta in (
+        movements.order_by()
+        .values("product_id", "variant_id")
+        .annotate(stock=Sum("stock_delta"), reserved=Sum("reserved_delta"))
+        .values_list("product_id", "variant_id", "stock", "reserved")
+    ):
+        key = ("variant", variant_id) if variant_id else ("product", product_id)
+        totals[key] = (stock_delta or 0, reserved_delta or 0)
+    return totals
+
+
+def _load_ledger_levels():
+    snapshots = {get_target_key(snapshot): snapshot for snapshot in InventorySnapshot.objects.all()}
+    mark = max((snapshot.last_movement_id for snapshot in snapshots.values()), default=0)
+    levels = {
+        key: [snapshot.stock, snapshot.reserved_quantity]
+        for key, snapshot in snapshots.items()
+    }
+    for key, (stock_delta, reserved_delta) in _sum_movements(
+        InventoryMovement.objects.filter(id__gt=mark)
+    ).items():
+        level = levels.setdefault(key, [0, 0])
+        level[0] += stock_delta
+        level[1] += reserved_delta
+    return levels
+
+
+def take_inventory_snapshots(*, settle_seconds=None):
+    """
+    Roll movements older than ``settle_seconds`` into the snapshots.
+
+    Movement ids are handed out before their transaction commits, so only
+    movements that have had time to settle are rolled up; newer ones are read
+    on top of the snapshot until the next run. Every snapshot shares the same
+    ``last_movement_id``. Returns ``{"snapshots": n, "movements": n}``.
+    """
+    settle_seconds = (
+        settings.INVENTORY_SNAPSHOT_SETTLE_SECONDS if settle_seconds is None else settle_seconds
+    )
+    now = timezone.now()
+
+    with transaction.atomic():
+        snapshots = {
+            get_target_key(snapshot): snapshot
+            for snapshot in InventorySnapshot.objects.select_for_update().order_by("id")
+        }
+        previous_mark = max((snapshot.last_movement_id for snapshot in snapshots.values()), default=0)
+        mark = InventoryMovement.objects.filter(
+            id__gt=previous_mark,
+            created_at__lt=now - timedelta(seconds=settle_seconds),
+        ).aggregate(mark=Max("id"))["mark"]
+        if mark is None:
+            return {"snapshots": len(snapshots), "movements": 0}
+
+        settled = InventoryMovement.objects.filter(id__gt=previous_mark, id__lte=mark)
+        rolled = settled.count()
+        created = []
+        changed = []
+        for key, (stock_delta, reserved_delta) in _sum_movements(settled).items():
+            snapshot = snapshots.get(key)
+            if snapshot is None:
+                target_kind, target_id = key
+                created.append(
+                    InventorySnapshot(
+                        stock=stock_delta,
+                        reserved_quantity=reserved_delta,
+                        last_movement_id=mark,
+                        taken_at=now,
+                        **{TARGET_FIELDS[target_kind]: target_id},
+                    )
+                )
+                continue
+            snapshot.stock += stock_delta
+            snapshot.reserved_quantity += reserved_delta
+            changed.append(snapshot)
+
+        if changed:
+            InventorySnapshot.objects.bulk_update(changed, ["stock", "reserved_quantity"])
+        InventorySnapshot.objects.update(last_movement_id=mark, taken_at=now)
+        if created:
+            InventorySnapshot.objects.bulk_create(created)
+
+    return {"snapshots": len(snapshots) + len(created), "movements": rolled}
+
+
+def find_inventory_drift():
+    """
+    Compare the ledger with the ``stock`` / ``reserved_quantity`` columns.
+
+    Returns ``{target: {"stock": column - ledger, "reserved_quantity": ...}}``
+    for every target that disagrees. Checkouts running concurrently can show
+    up as transient drift, so act on it when the store is quiet.
+    """
+    levels = _load_ledger_levels()
+    drift = {}
+    for target_kind, model in (("product", Product), ("variant", ProductVariant)):
+        for target_id, stock, reserved in model.objects.values_list("id", "stock", "reserved_quantity"):
+            key = (target_kind, target_id)
+            ledger_stock, ledger_reserved = levels.get(key, (0, 0))
+            if (stock, reserved) != (ledger_stock, ledger_reserved):
+                drift[key] = {
+                    "stock": stock - ledger_stock,
+                    "reserved_quantity": reserved - ledger_reserved,
+                }
+    return drift
+
+
+def record_drift_adjustments(drift):
+    """Book ``find_inventory_drift`` results as adjustment movements."""
+    return record_inventory_movements(
+        InventoryMovement.KIND_ADJUSTMENT,
+        stock={key: values["stock"] for key, values in drift.items()},
+        reserved={key: values["reserved_quantity"] for key, values in drift.items()},
+        reference="drift",
+    )
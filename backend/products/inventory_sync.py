@@ -0,0 +1,191 @@
+"""
+Bulk stock and price updates keyed by SKU (variants) or slug (main-stock
+products), used by the warehouse sync endpoint and the ``sync_inventory``
+command. Each chunk locks its rows in id order (products, then variants, like
+checkout) and writes them with ``bulk_update`` (a single ``CASE`` UPDATE per
+batch) instead of one save and transaction per row. Rows whose stock did not
+change are written without the ``stock`` column, so a price-only update never
+overwrites stock deducted by a concurrent checkout.
+"""
+
+from django.db import transaction
+
+from .caching import bump_catalog_version
+from .catalog_import import CatalogRowError, parse_decimal_value, parse_int_value
+from .inventory_ledger import record_inventory_movements
+from .models import (
+    InventoryMovement,
+    Product,
+    ProductVariant,
+    calculate_discount_percent,
+    round_price,
+)
+
+INVENTORY_SYNC_CHUNK_SIZE = 500
+INVENTORY_SYNC_MAX_UPDATES = 5000
+INVENTORY_SYNC_FIELDS = ("stock", "mrp", "slashed_price")
+
+
+def _identify(update):
+    if not isinstance(update, dict):
+        raise CatalogRowError("Each update must be an object.")
+
+    sku = str(update.get("sku") or "").strip()
+    slug = str(update.get("slug") or "").strip()
+    if sku and slug:
+        raise CatalogRowError("Provide either sku or slug, not both.")
+    if sku:
+        return "sku", sku
+    if slug:
+        return "slug", slug
+    raise CatalogRowError("sku or slug is required.")
+
+
+def _parse_changes(update):
+    changes = {}
+    if update.get("stock") not in (None, ""):
+        changes["stock"] = parse_int_value(update["stock"], "stock")
+    if update.get("mrp") not in (None, ""):
+        changes["mrp"] = parse_decimal_value(update["mrp"], "mrp")
+    if "slashed_price" in update:
+        # An explicit null/blank clears the slashed price.
+        changes["slashed_price"] = (
+            None
+            if update["slashed_price"] in (None, "")
+            else parse_decimal_value(update["slashed_price"], "slashed_price")
+        )
+    if not changes:
+        raise CatalogRowError("Nothing to update; send stock, mrp or slashed_price.")
+    return changes
+
+
+def _apply_changes(target, changes):
+    before = {name: getattr(target, name) for name in INVENTORY_SYNC_FIELDS}
+    for name, value in changes.items():
+        setattr(target, name, value)
+
+    target.mrp = round_price(target.mrp)
+    target.slashed_price = round_price(target.slashed_price)
+    target.discount_percent = calculate_discount_percent(target.mrp, target.slashed_price)
+    return any(before[name] != getattr(target, name) for name in INVENTORY_SYNC_FIELDS)
+
+
+def _bulk_update_changed(model, kind, targets, stock_deltas):
+    price_fields = [name for name in INVENTORY_SYNC_FIELDS if name != "stock"] + ["discount_percent"]
+    with_stock = [target for target in targets if (kind, target.id) in stock_deltas]
+    price_only = [target for target in targets if (kind, target.id) not in stock_deltas]
+    if with_stock:
+        model.objects.bulk_update(with_stock, ["stock", *price_fields])
+    if price_only:
+        model.objects.bulk_update(price_only, price_fields)
+
+
+def _apply_chunk(entries):
+    skus = [key for _, kind, key, _ in entries if kind == "sku"]
+    slugs = [key for _, kind, key, _ in entries if kind == "slug"]
+
+    results = {}
+    changed_variants = []
+    changed_products = []
+    stock_deltas = {}
+    with transaction.atomic():
+        products = {
+            product.slug: product
+            for product in Product.objects.select_for_update().filter(slug__in=slugs).order_by("id")
+        }
+        variants = {
+            variant.sku: variant
+            for variant in ProductVariant.objects.select_for_update().filter(sku__in=skus).order_by("id")
+        }
+
+        for index, kind, key, changes in entries:
+            target = variants.get(key) if kind == "sku" else products.get(key)
+            if target is None:
+                results[index] = {kind: key, "status": "error", "error": f"Unknown {kind}."}
+                continue
+            if kind == "slug" and "stock" in changes and target.stock_type == "variants":
+                results[index] = {
+                    kind: key,
+                    "status": "error",
+                    "error": "Product uses variant stock; update its variants by SKU.",
+                }
+                continue
+
+            stock_before = target.stock
+            if _apply_changes(target, changes):
+                (changed_variants if kind == "sku" else changed_products).append(target)
+                if target.stock != stock_before:
+                    stock_key = ("variant" if kind == "sku" else "product", target.id)
+                    stock_deltas[stock_key] = target.stock - stock_before
+                status = "updated"
+            else:
+                status = "unchanged"
+            results[index] = {
+                kind: key,
+                "status": status,
+                "stock": target.stock,
+                "mrp": None if target.mrp is None else str(target.mrp),
+                "slashed_price": None if target.slashed_price is None else str(target.slashed_price),
+                "discount_percent": target.discount_percent,
+            }
+
+        _bulk_update_changed(Product, "product", changed_products, stock_deltas)
+        _bulk_update_changed(ProductVariant, "variant", changed_variants, stock_deltas)
+        record_inventory_movements(
+            InventoryMovement.KIND_ADJUSTMENT,
+            stock=stock_deltas,
+            reference="inventory_sync",
+        )
+
+    if changed_variants or changed_products:
+        bump_catalog_version()
+    return results
+
+
+def apply_inventory_updates(updates, *, chunk_size=INVENTORY_SYNC_CHUNK_SIZE):
+    """
+    Apply ``[{"sku" | "slug": ..., "stock"?, "mrp"?, "slashed_price"?}, ...]``.
+
+    Returns one result per update, in input order, with ``status`` set to
+    ``updated``, ``unchanged`` or ``error``.
+    """
+    results = {}
+    seen = set()
+    chunk = []
+    chunk_size = max(int(chunk_size), 1)
+    total = 0
+
+    for index, update in enumerate(updates):
+        total = index + 1
+        try:
+            kind, key = _identify(update)
+            if (kind, key) in seen:
+                raise CatalogRowError(f"Duplicate {kind} in this batch.")
+            changes = _parse_changes(update)
+        except CatalogRowError as exc:
+            identifier = update if not isinstance(update, dict) else (
+                update.get("sku") or update.get("slug") or ""
+            )
+            results[index] = {"key": str(identifier), "status": "error", "error": str(exc)}
+            continue
+
+        seen.add((kind, key))
+        chunk.append((index, kind, key, changes))
+        if len(chunk) >= chunk_size:
+            results.update(_apply_chunk(chunk))
+            chunk = []
+
+    if chunk:
+        results.update(_apply_chunk(chunk))
+
+    return [results[index] for index in range(total)]
+
+
+def summarize_inventory_results(results):
+    summary = {"updated": 0, "unchanged": 0, "errors": 0}
+    for result in results:
+        if result["status"] == "error":
+            summary["errors"] += 1
+        else:
+            summary[result["status"]] += 1
+    return summary
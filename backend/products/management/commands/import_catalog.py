@@ -0,0 +1,82 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.catalog_import import (
+    CATALOG_IMPORT_CHUNK_SIZE,
+    CATALOG_IMPORT_FORMATS,
+    CatalogImportError,
+    detect_catalog_format,
+    import_catalog,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Import products and variants from a CSV or JSONL file. Rows are "
+        "streamed, validated in chunks and written with bulk operations. "
+        "Use --dry-run to print what would change without writing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or JSONL catalog file.")
+        parser.add_argument(
+            "--format",
+            choices=CATALOG_IMPORT_FORMATS,
+            default=None,
+            help="File format. Defaults to the file extension (.jsonl/.ndjson or CSV).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CATALOG_IMPORT_CHUNK_SIZE,
+            help="Number of products validated and written per batch.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report the diff without writing anything.",
+        )
+        parser.add_argument(
+            "--json",
+            action="store_true",
+            help="Print the full result as JSON.",
+        )
+
+    def handle(self, *args, **options):
+        file_format = options["format"] or detect_catalog_format(options["path"])
+        try:
+            with open(options["path"], encoding="utf-8-sig", newline="") as stream:
+                result = import_catalog(
+                    stream,
+                    file_format=file_format,
+                    dry_run=options["dry_run"],
+                    chunk_size=options["chunk_size"],
+                )
+        except OSError as exc:
+            raise CommandError(f"Unable to open {options['path']}: {exc}")
+        except CatalogImportError as exc:
+            raise CommandError(str(exc))
+
+        if options["json"]:
+            self.stdout.write(json.dumps(result.as_dict(), indent=2))
+            return
+
+        for change in result.changes:
+            fields = ", ".join(
+                f"{name}: {old} -> {new}" for name, (old, new) in change["changes"].items()
+            )
+            self.stdout.write(f"{change['action']} {change['type']} {change['key']} {fields}")
+        for error in result.errors:
+            self.stderr.write(self.style.ERROR(f"line {error['line']}: {error['error']}"))
+
+        prefix = "Dry run: would import" if result.dry_run else "Imported"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{prefix} products created={result.products_created} "
+                f"updated={result.products_updated} unchanged={result.products_unchanged}; "
+                f"variants created={result.variants_created} "
+                f"updated={result.variants_updated} unchanged={result.variants_unchanged}; "
+                f"errors={len(result.errors)}."
+            )
+        )
@@ -0,0 +1,597 @@
+import itertools
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from accounts.models import Address, UserProfile
+from orders.models import Cart, CartItem, Order, OrderItem
+from products.models import (
+    Category,
+    Color,
+    Product,
+    ProductActivity,
+    ProductImage,
+    ProductVariant,
+    Size,
+    SubCategory,
+    calculate_discount_percent,
+    round_price,
+)
+from reviews.models import ProductReview
+
+SEED_PREFIX = "perf"
+SEED_ORDER_PREFIX = "PERF-"
+SEED_IMAGE_NAME = "products/perf-placeholder.jpg"
+SEED_GALLERY_IMAGE_NAME = "products/gallery/perf-placeholder.jpg"
+
+SIZE_NAMES = ["XS", "S", "M", "L", "XL", "XXL", "A5", "A4", "A3", "A2"]
+COLOR_NAMES = [
+    ("Black", "#000000"),
+    ("White", "#FFFFFF"),
+    ("Red", "#DC2626"),
+    ("Blue", "#2563EB"),
+    ("Green", "#16A34A"),
+    ("Beige", "#D6C7A1"),
+    ("Gold", "#CA8A04"),
+    ("Walnut", "#5C4033"),
+]
+TITLE_ADJECTIVES = [
+    "Rustic", "Modern", "Vintage", "Handcrafted", "Minimal", "Boho",
+    "Classic", "Floral", "Geometric", "Personalised", "Wooden", "Ceramic",
+]
+TITLE_NOUNS = [
+    "Wall Clock", "Photo Frame", "Table Lamp", "Cushion Cover", "Planter",
+    "Wall Art", "Candle Holder", "Mirror", "Vase", "Name Plate", "Coaster Set",
+    "Key Holder",
+]
+ORDER_STATUSES = [
+    ("delivered", 40),
+    ("paid", 20),
+    ("shipped", 10),
+    ("processing", 10),
+    ("pending", 10),
+    ("failed", 5),
+    ("cancelled", 5),
+]
+CITIES = [
+    ("Mumbai", "Maharashtra", "400001"),
+    ("Bengaluru", "Karnataka", "560001"),
+    ("Delhi", "Delhi", "110001"),
+    ("Kolkata", "West Bengal", "700001"),
+    ("Chennai", "Tamil Nadu", "600001"),
+    ("Pune", "Maharashtra", "411001"),
+]
+
+
+@contextmanager
+def _explicit_timestamps(*fields):
+    # bulk_create runs pre_save, so auto_now_add would overwrite the
+    # back-dated timestamps the dataset relies on (e.g. trending windows).
+    originals = [(field, field.auto_now_add) for field in fields]
+    try:
+        for field, _ in originals:
+            field.auto_now_add = False
+        yield
+    finally:
+        for field, value in originals:
+            field.auto_now_add = value
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-generate a deterministic synthetic dataset (catalog, users, "
+        "carts, orders, reviews and product activity) for performance "
+        "testing. Rows are tagged with a 'perf' prefix so they can be "
+        "removed again with --reset."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--categories", type=int, default=10)
+        parser.add_argument("--subcategories-per-category", type=int, default=5)
+        parser.add_argument("--products", type=int, default=1000)
+        parser.add_argument("--variants-per-product", type=int, default=4)
+        parser.add_argument("--images-per-product", type=int, default=2)
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument(
+            "--carts",
+            type=int,
+            default=None,
+            help="Number of seeded users that get a populated cart. "
+            "Defaults to half of --users.",
+        )
+        parser.add_argument("--cart-items", type=int, default=3)
+        parser.add_argument("--orders", type=int, default=500)
+        parser.add_argument("--items-per-order", type=int, default=3)
+        parser.add_argument("--reviews", type=int, default=1000)
+        parser.add_argument("--activity", type=int, default=20000)
+        parser.add_argument(
+            "--activity-days",
+            type=int,
+            default=60,
+            help="Spread activity, orders and reviews over this many days.",
+        )
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database alias to seed (SQLite or Postgres).",
+        )
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Delete previously seeded rows before generating new ones.",
+        )
+
+    def handle(self, *args, **options):
+        self.db = options["database"]
+        self.batch_size = max(options["batch_size"], 1)
+        self.rng = random.Random(options["seed"])
+        self.now = timezone.now().replace(microsecond=0)
+        self.days = max(options["activity_days"], 1)
+
+        if options["reset"]:
+            self._reset()
+        elif Product.objects.using(self.db).filter(
+            slug__startswith=f"{SEED_PREFIX}-"
+        ).exists():
+            raise CommandError(
+                "Seeded data already exists. Re-run with --reset to replace it."
+            )
+
+        with transaction.atomic(using=self.db):
+            sizes, colors = self._seed_attributes()
+            subcategories = self._seed_categories(
+                max(options["categories"], 0),
+                max(options["subcategories_per_category"], 0),
+            )
+            catalog = self._seed_products(
+                max(options["products"], 0),
+                max(options["variants_per_product"], 0),
+                max(options["images_per_product"], 0),
+                subcategories,
+                sizes,
+                colors,
+            )
+            user_ids = self._seed_users(max(options["users"], 0))
+            carts = options["carts"]
+            if carts is None:
+                carts = len(user_ids) // 2
+            self._seed_carts(user_ids[: max(carts, 0)], catalog, options["cart_items"])
+            self._seed_orders(
+                max(options["orders"], 0),
+                max(options["items_per_order"], 1),
+                user_ids,
+                catalog,
+            )
+            self._seed_reviews(max(options["reviews"], 0), user_ids, catalog)
+            self._seed_activity(max(options["activity"], 0), catalog)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded {len(catalog)} product(s), {len(user_ids)} user(s) "
+                f"into database '{self.db}' (seed={options['seed']})."
+            )
+        )
+
+    def _bulk_create(self, model, objects):
+        if not objects:
+            return objects
+        return model.objects.using(self.db).bulk_create(
+            objects, batch_size=self.batch_size
+        )
+
+    def _random_past(self):
+        return self.now - timedelta(seconds=self.rng.randrange(self.days * 86400))
+
+    def _reset(self):
+        with transaction.atomic(using=self.db):
+            products = Product.objects.using(self.db).filter(
+                slug__startswith=f"{SEED_PREFIX}-"
+            )
+            users = User.objects.using(self.db).filter(
+                username__startswith=f"{SEED_PREFIX}-user-"
+            )
+            ProductActivity.objects.using(self.db).filter(product__in=products).delete()
+            ProductReview.objects.using(self.db).filter(product__in=products).delete()
+            Order.objects.using(self.db).filter(
+                order_number__startswith=SEED_ORDER_PREFIX
+            ).delete()
+            CartItem.objects.using(self.db).filter(cart__user__in=users).delete()
+            # Blank the shared placeholder names first so deleting the rows does
+            # not queue media cleanup tasks for every seeded product.
+            ProductImage.objects.using(self.db).filter(product__in=products).update(image="")
+            ProductImage.objects.using(self.db).filter(product__in=products).delete()
+            products.update(image="")
+            products.delete()
+            users.delete()
+            SubCategory.objects.using(self.db).filter(
+                slug__startswith=f"{SEED_PREFIX}-"
+            ).delete()
+            Category.objects.using(self.db).filter(
+                slug__startswith=f"{SEED_PREFIX}-"
+            ).delete()
+        self.stdout.write("Removed previously seeded data.")
+
+    def _seed_attributes(self):
+        sizes = []
+        for name in SIZE_NAMES:
+            size, _ = Size.objects.using(self.db).get_or_create(name=name)
+            sizes.append(size)
+
+        colors = []
+        for name, hex_code in COLOR_NAMES:
+            color, _ = Color.objects.using(self.db).get_or_create(
+                name=name, defaults={"hex_code": hex_code}
+            )
+            colors.append(color)
+        return sizes, colors
+
+    def _seed_categories(self, category_count, subcategory_count):
+        categories = self._bulk_create(
+            Category,
+            [
+                Category(
+                    name=f"Perf Category {index}",
+                    slug=f"{SEED_PREFIX}-category-{index}",
+                )
+                for index in range(1, category_count + 1)
+            ],
+        )
+        subcategories = self._bulk_create(
+            SubCategory,
+            [
+                SubCategory(
+                    category=category,
+                    name=f"Perf Sub {index}",
+                    slug=f"{category.slug}-sub-{index}",
+                )
+                for category in categories
+                for index in range(1, subcategory_count + 1)
+            ],
+        )
+        if not subcategories:
+            return [(category, None) for category in categories]
+        return [(subcategory.category, subcategory) for subcategory in subcategories]
+
+    def _build_price(self):
+        mrp = round_price(Decimal(self.rng.randrange(199, 9999)))
+        slashed_price = None
+        if self.rng.random() < 0.6:
+            slashed_price = round_price(mrp * Decimal(self.rng.randrange(50, 95)) / 100)
+        return mrp, slashed_price
+
+    def _seed_products(
+        self, product_count, variants_per_product, images_per_product,
+        subcategories, sizes, colors,
+    ):
+        combinations = [(size, color) for size in sizes for color in colors]
+        variants_per_product = min(variants_per_product, len(combinations))
+        created_at_field = Product._meta.get_field("created_at")
+        variant_created_at_field = ProductVariant._meta.get_field("created_at")
+
+        # Lightweight in-memory view of the catalog used to build carts,
+        # orders and reviews without re-reading the tables.
+        catalog = []
+        for start in range(0, product_count, self.batch_size):
+            stop = min(start + self.batch_size, product_count)
+            products = []
+            for index in range(start + 1, stop + 1):
+                category, subcategory = (
+                    self.rng.choice(subcategories) if subcategories else (None, None)
+                )
+                title = (
+                    f"{self.rng.choice(TITLE_ADJECTIVES)} "
+                    f"{self.rng.choice(TITLE_NOUNS)} {index}"
+                )
+                mrp, slashed_price = self._build_price()
+                has_variants = variants_per_product > 0 and self.rng.random() < 0.7
+                allow_custom_image = self.rng.random() < 0.2
+                products.append(
+                    Product(
+                        title=title,
+                        slug=f"{SEED_PREFIX}-{index}-{slugify(title)}",
+                        description=f"{title} for performance testing.",
+                        created_at=self._random_past(),
+                        mrp=mrp,
+                        slashed_price=slashed_price,
+                        discount_percent=calculate_discount_percent(mrp, slashed_price),
+                        stock=self.rng.randrange(0, 200),
+                        stock_type="variants" if has_variants else "main",
+                        category=category,
+                        sub_category=subcategory,
+                        image=SEED_IMAGE_NAME,
+                        allow_custom_image=allow_custom_image,
+                        custom_image_limit=(
+                            self.rng.randrange(1, 4) if allow_custom_image else 1
+                        ),
+                        allow_custom_text=self.rng.random() < 0.2,
+                        is_active=self.rng.random() < 0.97,
+                    )
+                )
+
+            with _explicit_timestamps(created_at_field):
+                products = self._bulk_create(Product, products)
+
+            variants = []
+            images = []
+            for product in products:
+                entry = {
+                    "id": product.id,
+                    "title": product.title,
+                    "slug": product.slug,
+                    "price": product.slashed_price or product.mrp,
+                    "category": product.category,
+                    "sub_category": product.sub_category,
+                    "variants": [],
+                }
+                catalog.append(entry)
+
+                for position in range(images_per_product):
+                    images.append(
+                        ProductImage(
+                            product=product,
+                            image=SEED_GALLERY_IMAGE_NAME,
+                            order=position,
+                        )
+                    )
+
+                if product.stock_type != "variants":
+                    continue
+
+                for size, color in self.rng.sample(combinations, variants_per_product):
+                    mrp, slashed_price = self._build_price()
+                    variants.append(
+                        ProductVariant(
+                            product=product,
+                            size=size,
+                            color=color,
+                            mrp=mrp,
+                            slashed_price=slashed_price,
+                            discount_percent=calculate_discount_percent(mrp, slashed_price),
+                            stock=self.rng.randrange(0, 100),
+                            sku=(
+                                f"{SEED_PREFIX.upper()}-{product.id}-"
+                                f"{size.name[:2].upper()}-{color.name[:3].upper()}"
+                            ),
+                            created_at=product.created_at,
+                        )
+                    )
+
+            with _explicit_timestamps(variant_created_at_field):
+                variants = self._bulk_create(ProductVariant, variants)
+            self._bulk_create(ProductImage, images)
+
+            entries = {entry["id"]: entry for entry in catalog[-len(products):]}
+            for variant in variants:
+                entries[variant.product_id]["variants"].append(variant)
+
+            self.stdout.write(f"Seeded products {start + 1}-{stop}.")
+
+        return catalog
+
+    def _seed_users(self, user_count):
+        password = make_password(f"{SEED_PREFIX}-password")
+        users = []
+        for index in range(1, user_count + 1):
+            users.append(
+                User(
+                    username=f"{SEED_PREFIX}-user-{index}",
+                    email=f"{SEED_PREFIX}-user-{index}@example.com",
+                    first_name="Perf",
+                    last_name=f"User {index}",
+                    password=password,
+                )
+            )
+        users = self._bulk_create(User, users)
+
+        # bulk_create skips the post_save signal that normally creates these.
+        self._bulk_create(
+            UserProfile,
+            [UserProfile(user=user, phone=f"9{user.id:09d}"[-10:]) for user in users],
+        )
+        addresses = []
+        for user in users:
+            city, state, postal_code = self.rng.choice(CITIES)
+            addresses.append(
+                Address(
+                    user=user,
+                    full_name=f"{user.first_name} {user.last_name}",
+                    phone=f"9{user.id:09d}"[-10:],
+                    address_line_1=f"{self.rng.randrange(1, 999)} Perf Street",
+                    city=city,
+                    state=state,
+                    postal_code=postal_code,
+                    is_default=True,
+                )
+            )
+        self._bulk_create(Address, addresses)
+        return [user.id for user in users]
+
+    def _pick_line(self, catalog):
+        product = self.rng.choice(catalog)
+        variant = self.rng.choice(product["variants"]) if product["variants"] else None
+        price = (variant.slashed_price or variant.mrp) if variant else product["price"]
+        return product, variant, price
+
+    def _seed_carts(self, user_ids, catalog, items_per_cart):
+        if not user_ids or not catalog or items_per_cart <= 0:
+            return
+
+        carts = self._bulk_create(Cart, [Cart(user_id=user_id) for user_id in user_ids])
+        items = []
+        for cart in carts:
+            seen = set()
+            for _ in range(items_per_cart):
+                product, variant, _ = self._pick_line(catalog)
+                key = (product["id"], variant.id if variant else None)
+                if key in seen:
+                    continue
+                seen.add(key)
+                items.append(
+                    CartItem(
+                        cart=cart,
+                        product_id=product["id"],
+                        variant=variant,
+                        variant_size_name=variant.size.name if variant else "",
+                        variant_color_name=variant.color.name if variant else "",
+                        variant_sku=variant.sku if variant else "",
+                        quantity=self.rng.randrange(1, 4),
+                        merge_key=CartItem.build_merge_key(*key),
+                    )
+                )
+        self._bulk_create(CartItem, items)
+
+    def _seed_orders(self, order_count, items_per_order, user_ids, catalog):
+        if not order_count or not user_ids or not catalog:
+            return
+
+        statuses = [status for status, _ in ORDER_STATUSES]
+        weights = [weight for _, weight in ORDER_STATUSES]
+        created_at_field = Order._meta.get_field("created_at")
+
+        for start in range(0, order_count, self.batch_size):
+            stop = min(start + self.batch_size, order_count)
+            orders = []
+            order_lines = []
+            for index in range(start + 1, stop + 1):
+                status = self.rng.choices(statuses, weights)[0]
+                lines = [
+                    self._pick_line(catalog)
+                    for _ in range(self.rng.randrange(1, items_per_order + 1))
+                ]
+                lines = [
+                    (product, variant, price, self.rng.randrange(1, 4))
+                    for product, variant, price in lines
+                ]
+                subtotal = sum(price * quantity for _, _, price, quantity in lines)
+                city, state, postal_code = self.rng.choice(CITIES)
+                paid = status in {"paid", "processing", "shipped", "delivered"}
+                created_at = self._random_past()
+                orders.append(
+                    Order(
+                        user_id=self.rng.choice(user_ids),
+                        order_number=f"{SEED_ORDER_PREFIX}{index:08d}",
+                        subtotal_amount=subtotal,
+                        total_amount=subtotal,
+                        status=status,
+                        razorpay_order_id=f"order_{SEED_PREFIX}{index:010d}",
+                        razorpay_payment_id=f"pay_{SEED_PREFIX}{index:010d}" if paid else "",
+                        payment_verified_at=created_at if paid else None,
+                        payment_processed=paid,
+                        shipping_full_name="Perf Customer",
+                        shipping_address=f"{self.rng.randrange(1, 999)} Perf Street",
+                        city=city,
+                        shipping_state=state,
+                        postal_code=postal_code,
+                        phone="9000000000",
+                        created_at=created_at,
+                    )
+                )
+                order_lines.append(lines)
+
+            with _explicit_timestamps(created_at_field):
+                orders = self._bulk_create(Order, orders)
+
+            items = []
+            for order, lines in zip(orders, order_lines):
+                for product, variant, price, quantity in lines:
+                    category = product["category"]
+                    sub_category = product["sub_category"]
+                    items.append(
+                        OrderItem(
+                            order=order,
+                            product_id=product["id"],
+                            variant=variant,
+                            quantity=quantity,
+                            price=price,
+                            product_title=product["title"],
+                            product_slug=product["slug"],
+                            product_image=SEED_IMAGE_NAME,
+                            product_category_name=category.name if category else "",
+                            product_category_slug=category.slug if category else "",
+                            product_sub_category_name=(
+                                sub_category.name if sub_category else ""
+                            ),
+                            product_sub_category_slug=(
+                                sub_category.slug if sub_category else ""
+                            ),
+                            variant_size_name=variant.size.name if variant else "",
+                            variant_color_name=variant.color.name if variant else "",
+                            variant_sku=variant.sku if variant else "",
+                        )
+                    )
+            self._bulk_create(OrderItem, items)
+
+    def _seed_reviews(self, review_count, user_ids, catalog):
+        if not review_count or not user_ids or not catalog:
+            return
+
+        review_count = min(review_count, len(user_ids) * len(catalog))
+        created_at_field = ProductReview._meta.get_field("created_at")
+        seen = set()
+        reviews = []
+        while len(seen) < review_count:
+            user_id = self.rng.choice(user_ids)
+            product = self.rng.choice(catalog)
+            key = (user_id, product["id"])
+            if key in seen:
+                continue
+            seen.add(key)
+            rating = self.rng.choices([1, 2, 3, 4, 5], [5, 5, 15, 35, 40])[0]
+            reviews.append(
+                ProductReview(
+                    user_id=user_id,
+                    product_id=product["id"],
+                    rating=rating,
+                    title=f"{rating} star review",
+                    comment=f"Synthetic review for {product['title']}.",
+                    created_at=self._random_past(),
+                )
+            )
+            if len(reviews) >= self.batch_size:
+                with _explicit_timestamps(created_at_field):
+                    self._bulk_create(ProductReview, reviews)
+                reviews = []
+
+        with _explicit_timestamps(created_at_field):
+            self._bulk_create(ProductReview, reviews)
+
+    def _seed_activity(self, activity_count, catalog):
+        if not activity_count or not catalog:
+            return
+
+        created_at_field = ProductActivity._meta.get_field("created_at")
+        # Skew events towards a small head of products so trending queries see
+        # a realistic long-tail distribution.
+        cum_weights = list(
+            itertools.accumulate(1.0 / (rank + 1) for rank in range(len(catalog)))
+        )
+        product_ids = [product["id"] for product in catalog]
+        self.rng.shuffle(product_ids)
+
+        for start in range(0, activity_count, self.batch_size):
+            size = min(self.batch_size, activity_count - start)
+            picked = self.rng.choices(product_ids, cum_weights=cum_weights, k=size)
+            events = [
+                ProductActivity(
+                    product_id=product_id,
+                    event_type=(
+                        ProductActivity.EVENT_CART_ADD
+                        if self.rng.random() < 0.15
+                        else ProductActivity.EVENT_VIEW
+                    ),
+                    created_at=self._random_past(),
+                )
+                for product_id in picked
+            ]
+            with _explicit_timestamps(created_at_field):
+                self._bulk_create(ProductActivity, events)
@@ -0,0 +1,72 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.inventory_ledger import (
+    find_inventory_drift,
+    record_drift_adjustments,
+    take_inventory_snapshots,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Roll settled inventory ledger movements into per-target snapshots. "
+        "With --check-drift, also compare the ledger with the stock columns."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--settle-seconds",
+            type=int,
+            default=None,
+            help="Only roll up movements older than this (default: INVENTORY_SNAPSHOT_SETTLE_SECONDS).",
+        )
+        parser.add_argument(
+            "--check-drift",
+            action="store_true",
+            help="Report targets whose stock columns disagree with the ledger.",
+        )
+        parser.add_argument(
+            "--fix-drift",
+            action="store_true",
+            help="Book reported drift as adjustment movements (implies --check-drift).",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep snapshotting instead of exiting after one pass.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=300.0,
+            help="Seconds to sleep between passes when --loop is set.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            result = take_inventory_snapshots(settle_seconds=options["settle_seconds"])
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Rolled {result['movements']} movement(s) into "
+                    f"{result['snapshots']} snapshot(s)."
+                )
+            )
+
+            if options["check_drift"] or options["fix_drift"]:
+                drift = find_inventory_drift()
+                for (kind, target_id), values in sorted(drift.items()):
+                    self.stdout.write(
+                        f"{kind} {target_id}: stock {values['stock']:+d}, "
+                        f"reserved {values['reserved_quantity']:+d}"
+                    )
+                if options["fix_drift"]:
+                    booked = record_drift_adjustments(drift)
+                    self.stdout.write(self.style.SUCCESS(f"Booked {booked} drift adjustment(s)."))
+                else:
+                    self.stdout.write(f"{len(drift)} target(s) drifted from the ledger.")
+
+            if not options["loop"]:
+                return
+            time.sleep(max(options["interval"], 0.1))
@@ -0,0 +1,89 @@
+import csv
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.catalog_import import CATALOG_IMPORT_FORMATS, detect_catalog_format
+from products.inventory_sync import (
+    INVENTORY_SYNC_CHUNK_SIZE,
+    apply_inventory_updates,
+    summarize_inventory_results,
+)
+
+
+def _iter_csv_updates(stream):
+    # Blank cells mean "leave unchanged" in a warehouse export.
+    for row in csv.DictReader(stream):
+        yield {
+            (key or "").strip(): value.strip()
+            for key, value in row.items()
+            if key and value is not None and value.strip() != ""
+        }
+
+
+def _iter_jsonl_updates(stream):
+    for raw in stream:
+        raw = raw.strip()
+        if not raw:
+            continue
+        try:
+            yield json.loads(raw)
+        except json.JSONDecodeError:
+            yield raw
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply stock and price updates from a warehouse CSV or JSONL file. "
+        "Rows are keyed by variant sku or main-stock product slug with "
+        "optional stock, mrp and slashed_price columns."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or JSONL inventory file.")
+        parser.add_argument(
+            "--format",
+            choices=CATALOG_IMPORT_FORMATS,
+            default=None,
+            help="File format. Defaults to the file extension (.jsonl/.ndjson or CSV).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=INVENTORY_SYNC_CHUNK_SIZE,
+            help="Number of rows looked up and written per batch.",
+        )
+        parser.add_argument(
+            "--json",
+            action="store_true",
+            help="Print per-row results as JSON.",
+        )
+
+    def handle(self, *args, **options):
+        file_format = options["format"] or detect_catalog_format(options["path"])
+        reader = _iter_jsonl_updates if file_format == "jsonl" else _iter_csv_updates
+        try:
+            with open(options["path"], encoding="utf-8-sig", newline="") as stream:
+                results = apply_inventory_updates(
+                    reader(stream),
+                    chunk_size=options["chunk_size"],
+                )
+        except OSError as exc:
+            raise CommandError(f"Unable to open {options['path']}: {exc}")
+
+        summary = summarize_inventory_results(results)
+        if options["json"]:
+            self.stdout.write(json.dumps({"results": results, "summary": summary}, indent=2))
+            return
+
+        for line, result in enumerate(results, start=1):
+            if result["status"] == "error":
+                key = result.get("sku") or result.get("slug") or result.get("key", "")
+                self.stderr.write(self.style.ERROR(f"row {line} {key}: {result['error']}"))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Inventory sync updated={summary['updated']} "
+                f"unchanged={summary['unchanged']} errors={summary['errors']}."
+            )
+        )
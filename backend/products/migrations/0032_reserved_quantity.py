@@ -0,0 +1,23 @@
+# Generated by Django 5.2.10 on 2026-10-19 15:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0031_alter_productimage_options_productimage_order'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='reserved_quantity',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Units held by unpaid checkout reservations'),
+        ),
+        migrations.AddField(
+            model_name='productvariant',
+            name='reserved_quantity',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Units held by unpaid checkout reservations'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0032_reserved_quantity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='hot_inventory',
+            field=models.BooleanField(default=False, help_text='Gate checkout through the cached stock counter (for high-demand drops)'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0033_product_hot_inventory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('sale', 'Sale'), ('reservation', 'Reservation'), ('release', 'Release'), ('adjustment', 'Adjustment'), ('replacement', 'Replacement')], max_length=20)),
+                ('stock_delta', models.IntegerField(default=0)),
+                ('reserved_delta', models.IntegerField(default=0)),
+                ('reference', models.CharField(blank=True, help_text='Order number or source of the movement', max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='inventory_movements', to='products.product')),
+                ('variant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='inventory_movements', to='products.productvariant')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['product', 'id'], name='products_invmove_product_idx'), models.Index(fields=['variant', 'id'], name='products_invmove_variant_idx'), models.Index(fields=['created_at'], name='products_invmove_created_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stock', models.IntegerField(default=0)),
+                ('reserved_quantity', models.IntegerField(default=0)),
+                ('last_movement_id', models.BigIntegerField(default=0)),
+                ('taken_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='inventory_snapshots', to='products.product')),
+                ('variant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='inventory_snapshots', to='products.productvariant')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('product__isnull', False)), fields=('product',), name='products_invsnap_unique_product'), models.UniqueConstraint(condition=models.Q(('variant__isnull', False)), fields=('variant',), name='products_invsnap_unique_variant')],
+            },
+        ),
+    ]
@@ -14,6 +14,35 @@ def round_price(value):
         rounding=ROUND_HALF_UP
     )
 
+
+def build_variant_sku(product_id, size_name="", color_name=""):
+    size_code = size_name[:2].upper() if size_name else "NA"
+    color_code = color_name[:3].upper() if color_name else "CLR"
+    return f"DT-{product_id or 'PRD'}-{size_code}-{color_code}"
+
+
+def exclude_reserved_quantity_from_save(instance, kwargs):
+    """
+    ``reserved_quantity`` is only written through F() updates by checkout, so
+    a full save of an instance loaded earlier must not overwrite it.
+    """
+    if instance._state.adding or kwargs.get("force_insert") or kwargs.get("update_fields") is not None:
+        return
+    deferred = instance.get_deferred_fields()
+    kwargs["update_fields"] = [
+        field.name
+        for field in instance._meta.concrete_fields
+        if not field.primary_key
+        and field.name != "reserved_quantity"
+        and field.attname not in deferred
+    ]
+
+
+def calculate_discount_percent(mrp, slashed_price):
+    if mrp and slashed_price and slashed_price < mrp:
+        return round(((mrp - slashed_price) / mrp) * 100)
+    return None
+
 class Category(models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True, blank=True)
@@ -175,7 +204,16 @@ class Product(models.Model):
     )
 
     stock = models.PositiveIntegerField(default=10, help_text="Only used if stock_type is 'main'")
+    reserved_quantity = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Units held by unpaid checkout reservations",
+    )
     stock_type = models.CharField(max_length=10, choices=STOCK_TYPE_CHOICES, default='main')
+    hot_inventory = models.BooleanField(
+        default=False,
+        help_text="Gate checkout through the cached stock counter (for high-demand drops)",
+    )
     category = models.ForeignKey(
         Category,
         related_name="products",
@@ -222,15 +260,15 @@ class Product(models.Model):
         self.slashed_price = round_price(self.slashed_price)
 
         # ✅ Auto discount calculation
-        if self.mrp and self.slashed_price and self.slashed_price < self.mrp:
-            self.discount_percent = round(
-                ((self.mrp - self.slashed_price) / self.mrp) * 100
-            )
-        else:
-            self.discount_percent = None
+        self.discount_percent = calculate_discount_percent(self.mrp, self.slashed_price)
 
+        exclude_reserved_quantity_from_save(self, kwargs)
         super().save(*args, **kwargs)
 
+    @property
+    def available_stock(self):
+        """Main stock not held by checkout reservations."""
+        return max(0, self.stock - self.reserved_quantity)
     
     def get_total_stock(self):
         """Get total stock based on stock_type"""
@@ -324,6 +362,11 @@ class ProductVariant(models.Model):
     )
 
     stock = models.PositiveIntegerField(default=10)
+    reserved_quantity = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Units held by unpaid checkout reservations",
+    )
     sku = models.CharField(max_length=100, unique=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -339,28 +382,27 @@ class ProductVariant(models.Model):
 
         # Auto generate SKU if empty
         if not self.sku:
-            size_code = self.size.name[:2].upper() if self.size else "NA"
-            color_code = self.color.name[:3].upper() if self.color else "CLR"
-
             # If product already saved use its id
-            product_id = self.product.id if self.product else "PRD"
-
-            self.sku = f"DT-{product_id}-{size_code}-{color_code}"
+            self.sku = build_variant_sku(
+                self.product.id if self.product else None,
+                self.size.name if self.size else "",
+                self.color.name if self.color else "",
+            )
 
         # Round prices
         self.mrp = round_price(self.mrp)
         self.slashed_price = round_price(self.slashed_price)
 
         # Auto discount %
-        if self.mrp and self.slashed_price and self.slashed_price < self.mrp:
-            self.discount_percent = round(
-                ((self.mrp - self.slashed_price) / self.mrp) * 100
-            )
-        else:
-            self.discount_percent = None
+        self.discount_percent = calculate_discount_percent(self.mrp, self.slashed_price)
 
+        exclude_reserved_quantity_from_save(self, kwargs)
         super().save(*args, **kwargs)
 
+    @property
+    def available_stock(self):
+        return max(0, self.stock - self.reserved_quantity)
+
 
 class ProductImage(models.Model):
     product = models.ForeignKey(
@@ -399,3 +441,94 @@ class ProductActivity(models.Model):
 
     def __str__(self):
         return f"{self.product.title} — {self.event_type} @ {self.created_at:%Y-%m-%d %H:%M}"
+
+
+class InventoryMovement(models.Model):
+    """
+    Append-only stock ledger row. Like ``StockReservation``, exactly one of
+    ``product`` (main stock) or ``variant`` is set. Rows are never edited or
+    deleted on their own; they are purged only with their product or variant.
+    """
+
+    KIND_SALE        = "sale"
+    KIND_RESERVATION = "reservation"
+    KIND_RELEASE     = "release"
+    KIND_ADJUSTMENT  = "adjustment"
+    KIND_REPLACEMENT = "replacement"
+    KIND_CHOICES     = [
+        (KIND_SALE,        "Sale"),
+        (KIND_RESERVATION, "Reservation"),
+        (KIND_RELEASE,     "Release"),
+        (KIND_ADJUSTMENT,  "Adjustment"),
+        (KIND_REPLACEMENT, "Replacement"),
+    ]
+
+    product = models.ForeignKey(
+        Product,
+        related_name="inventory_movements",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+    variant = models.ForeignKey(
+        ProductVariant,
+        related_name="inventory_movements",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    stock_delta = models.IntegerField(default=0)
+    reserved_delta = models.IntegerField(default=0)
+    reference = models.CharField(max_length=64, blank=True, help_text="Order number or source of the movement")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            # Ledger reads sum a target's movements after its snapshot.
+            models.Index(fields=["product", "id"], name="products_invmove_product_idx"),
+            models.Index(fields=["variant", "id"], name="products_invmove_variant_idx"),
+            models.Index(fields=["created_at"], name="products_invmove_created_idx"),
+        ]
+
+    def __str__(self):
+        target = f"variant {self.variant_id}" if self.variant_id else f"product {self.product_id}"
+        return f"{self.kind} {target}: stock {self.stock_delta:+d}, reserved {self.reserved_delta:+d}"
+
+
+class InventorySnapshot(models.Model):
+    """Stock and reserved levels of one target rolled up to ``last_movement_id``."""
+
+    product = models.ForeignKey(
+        Product,
+        related_name="inventory_snapshots",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+    variant = models.ForeignKey(
+        ProductVariant,
+        related_name="inventory_snapshots",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+    stock = models.IntegerField(default=0)
+    reserved_quantity = models.IntegerField(default=0)
+    last_movement_id = models.BigIntegerField(default=0)
+    taken_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product"],
+                condition=models.Q(product__isnull=False),
+                name="products_invsnap_unique_product",
+            ),
+            models.UniqueConstraint(
+                fields=["variant"],
+                condition=models.Q(variant__isnull=False),
+                name="products_invsnap_unique_variant",
+            ),
+        ]
@@ -0,0 +1,49 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .caching import bump_catalog_version
+from .inventory_ledger import record_inventory_movements
+from .models import Category, InventoryMovement, Product, ProductVariant, SubCategory
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=SubCategory)
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=SubCategory)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=ProductVariant)
+def invalidate_catalog_version(sender, instance, **kwargs):
+    # Cart summaries embed prices, stock and category trails.
+    bump_catalog_version()
+
+
+@receiver(pre_save, sender=Product)
+@receiver(pre_save, sender=ProductVariant)
+def capture_stored_stock(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._stored_stock = None
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and "stock" not in update_fields:
+        return
+    instance._stored_stock = (
+        sender.objects.filter(pk=instance.pk).values_list("stock", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductVariant)
+def record_stock_adjustment(sender, instance, created, raw=False, **kwargs):
+    # Saves (admin edits, catalog tools) are booked as adjustments in the
+    # inventory ledger; checkout writes its own movements.
+    if raw:
+        return
+    stored_stock = 0 if created else getattr(instance, "_stored_stock", None)
+    if stored_stock is None:
+        return
+    target_kind = "variant" if sender is ProductVariant else "product"
+    record_inventory_movements(
+        InventoryMovement.KIND_ADJUSTMENT,
+        stock={(target_kind, instance.pk): instance.stock - stored_stock},
+    )
@@ -5,14 +5,19 @@ import re
 import shutil
 import tempfile
 from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
 
 from django.contrib import admin
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.cache import cache
 from django.core.management import call_command
+from django.core.files.storage import FileSystemStorage
 from django.core.files.uploadedfile import SimpleUploadedFile, UploadedFile
+from django.db import connection
 from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from PIL import Image
@@ -20,7 +25,9 @@ from rest_framework.test import APIClient
 
 from orders.models import Cart, CartItem, MediaCleanupTask, Order, OrderItem, StockReservation
 from products.admin import ProductAdmin, ProductAdminForm
-from products.models import Category, Product, ProductActivity, ProductImage, SubCategory
+from products.caching import get_catalog_version
+from products.models import Category, Color, InventoryMovement, Product, ProductActivity, ProductImage, ProductVariant, Size, SubCategory
+from reviews.models import ProductReview
 
 
 def build_test_image(name, size=(100, 100), image_format="PNG", content_type="image/png", color=(120, 160, 220)):
@@ -161,6 +168,7 @@ class ProductAdminDeletionControlsTests(TestCase):
         self.assertContains(response, "Archive Product")
         self.assertContains(response, "Permanently Delete")
         self.assertContains(response, "Eligible for permanent delete.")
+        self.assertContains(response, "Stock: 3 in stock, 0 reserved, 3 available")
         self.assertNotContains(response, 'name="_delete"')
 
     def test_change_page_hides_permanent_delete_for_referenced_product(self):
@@ -205,6 +213,19 @@ class ProductAdminDeletionControlsTests(TestCase):
 
         self.assertFalse(Product.objects.filter(pk=product.pk).exists())
         self.assertContains(response, "was deleted successfully")
+        self.assertFalse(InventoryMovement.objects.filter(product_id=product.pk).exists())
+
+    def test_inventory_movements_cannot_be_deleted_in_admin(self):
+        product = self.create_product("Ledger Product")
+        movement = InventoryMovement.objects.get(product=product)
+
+        response = self.client.post(
+            reverse("admin:products_inventorymovement_delete", args=[movement.pk]),
+            {"post": "yes"},
+        )
+
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(InventoryMovement.objects.filter(pk=movement.pk).exists())
 
     def test_referenced_product_change_page_hides_delete_link(self):
         user = User.objects.create_user("ordered-admin-user", "orderedadmin@example.com", "pass12345")
@@ -586,6 +607,38 @@ class ProductImageManagerSyncTests(TestCase):
         # The old main file survives — it is now the gallery row.
         self.assertEqual(self.image_color(product.images.get().image), (255, 0, 0))
 
+    def test_promoting_gallery_row_swaps_names_without_copying_files(self):
+        product = self.create_product(image=build_test_image("main.png", color=(255, 0, 0)))
+        row_a = ProductImage.objects.create(
+            product=product, image=build_test_image("a.png", color=(0, 255, 0))
+        )
+        row_b = ProductImage.objects.create(
+            product=product, image=build_test_image("b.png", color=(0, 0, 255))
+        )
+        old_main_name = product.image.name
+        row_a_name = row_a.image.name
+
+        meta = {
+            "order": [f"e{row_b.pk}", f"e{row_a.pk}", "main"],
+            "main": f"e{row_a.pk}",
+            "deleted": [],
+        }
+
+        with patch.object(FileSystemStorage, "_save") as storage_save, patch.object(
+            FileSystemStorage, "_open"
+        ) as storage_open:
+            self.admin.sync_product_images(self.build_request(meta, []), product)
+
+        storage_save.assert_not_called()
+        storage_open.assert_not_called()
+        product.refresh_from_db()
+        self.assertEqual(product.image.name, row_a_name)
+        rows = list(product.images.order_by("order", "id"))
+        self.assertEqual(
+            [(row.pk, row.image.name, row.order) for row in rows],
+            [(row_b.pk, row_b.image.name, 0), (row_a.pk, old_main_name, 2)],
+        )
+
     def test_removes_selected_rows(self):
         product = self.create_product(image=build_test_image("main.png"))
         row_a = ProductImage.objects.create(product=product, image=build_test_image("a.png"))
@@ -872,6 +925,32 @@ class ProductArchiveAdminTests(TestCase):
         self.assertIn(eligible.pk, response.context["deletable_product_ids"])
         self.assertNotIn(referenced.pk, response.context["deletable_product_ids"])
 
+    def test_active_changelist_query_count_does_not_grow_with_catalog(self):
+        for index in range(3):
+            self.create_product(f"Small Catalog {index}")
+        with CaptureQueriesContext(connection) as small_catalog:
+            self.client.get(reverse("admin:products_product_changelist"))
+
+        for index in range(ProductAdmin.list_per_page + 5):
+            self.create_product(f"Large Catalog {index}")
+        with CaptureQueriesContext(connection) as large_catalog:
+            response = self.client.get(reverse("admin:products_product_changelist"))
+
+        self.assertEqual(len(small_catalog), len(large_catalog))
+        self.assertEqual(
+            len(response.context["deletable_product_ids"]),
+            ProductAdmin.list_per_page,
+        )
+
+    def test_active_changelist_excludes_reviewed_products_from_deletable(self):
+        reviewed = self.create_product("List Reviewed Product")
+        reviewer = User.objects.create_user("list-reviewer", "reviewer@example.com", "pass12345")
+        ProductReview.objects.create(user=reviewer, product=reviewed, rating=5)
+
+        response = self.client.get(reverse("admin:products_product_changelist"))
+
+        self.assertNotIn(reviewed.pk, response.context["deletable_product_ids"])
+
     def test_bulk_delete_flow_deletes_only_eligible(self):
         eligible = self.create_product("Bulk Delete Eligible")
         referenced = self.create_product("Bulk Delete Referenced")
@@ -1117,3 +1196,341 @@ class TrendingCacheTests(TestCase):
         self.assertEqual(first_ids, second_ids)
         self.assertEqual(first_ids.index(other_product.id), 0)
         self.assertEqual(first_ids.index(self.product.id), 1)
+
+
+class SeedPerfDataCommandTests(TestCase):
+    def seed(self, **options):
+        call_command(
+            "seed_perf_data",
+            categories=2,
+            subcategories_per_category=2,
+            products=12,
+            variants_per_product=3,
+            images_per_product=2,
+            users=4,
+            orders=6,
+            reviews=5,
+            activity=40,
+            batch_size=5,
+            stdout=StringIO(),
+            **options,
+        )
+
+    def test_generates_requested_rows_in_batches(self):
+        self.seed()
+
+        products = Product.objects.filter(slug__startswith="perf-")
+        self.assertEqual(products.count(), 12)
+        self.assertEqual(ProductImage.objects.filter(product__in=products).count(), 24)
+        self.assertEqual(User.objects.filter(username__startswith="perf-user-").count(), 4)
+        self.assertEqual(Order.objects.filter(order_number__startswith="PERF-").count(), 6)
+        self.assertEqual(ProductActivity.objects.filter(product__in=products).count(), 40)
+        self.assertTrue(OrderItem.objects.filter(order__order_number__startswith="PERF-").exists())
+        for product in products.filter(stock_type="variants"):
+            self.assertEqual(product.variants.count(), 3)
+        oldest = ProductActivity.objects.order_by("created_at").first()
+        self.assertLess(oldest.created_at, timezone.now() - timedelta(hours=1))
+
+    def test_same_seed_produces_same_catalog_after_reset(self):
+        self.seed()
+        first = list(Product.objects.order_by("id").values_list("title", "mrp", "stock_type"))
+
+        self.seed(reset=True)
+        second = list(Product.objects.order_by("id").values_list("title", "mrp", "stock_type"))
+
+        self.assertEqual(first, second)
+        self.assertFalse(MediaCleanupTask.objects.exists())
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class CatalogImportTests(TestCase):
+    CSV_HEADER = "title,slug,category,sub_category,mrp,slashed_price,stock,size,color,sku,variant_mrp,variant_slashed_price,variant_stock\n"
+
+    def setUp(self):
+        self.category = Category.objects.create(name="Frames")
+        self.subcategory = SubCategory.objects.create(category=self.category, name="Modern")
+        self.size = Size.objects.create(name="Large")
+        self.color = Color.objects.create(name="Black")
+        self.other_color = Color.objects.create(name="White")
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, True)
+
+    def write_file(self, name, content):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(content)
+        return path
+
+    def run_import(self, name, content, **options):
+        stdout = StringIO()
+        call_command(
+            "import_catalog",
+            self.write_file(name, content),
+            stdout=stdout,
+            stderr=StringIO(),
+            **options,
+        )
+        return stdout.getvalue()
+
+    def test_csv_import_creates_products_and_variants_with_derived_fields(self):
+        self.run_import(
+            "catalog.csv",
+            self.CSV_HEADER
+            + "Oak Frame,,frames,Modern,999.4,799.6,,Large,Black,,1200,900,4\n"
+            + "Oak Frame,,frames,Modern,999.4,799.6,,Large,White,OAK-LW,1200,,6\n"
+            + "Plain Frame,,Frames,,500,,7,,,,,,\n",
+        )
+
+        oak = Product.objects.get(slug="oak-frame")
+        self.assertEqual(oak.mrp, Decimal("999"))
+        self.assertEqual(oak.slashed_price, Decimal("800"))
+        self.assertEqual(oak.discount_percent, 20)
+        self.assertEqual(oak.stock_type, "variants")
+        self.assertEqual(oak.stock, 0)
+        self.assertEqual(oak.sub_category, self.subcategory)
+        variants = {variant.color.name: variant for variant in oak.variants.select_related("color")}
+        self.assertEqual(variants["Black"].sku, f"DT-{oak.pk}-LA-BLA")
+        self.assertEqual(variants["Black"].discount_percent, 25)
+        self.assertEqual(variants["White"].sku, "OAK-LW")
+        self.assertIsNone(variants["White"].discount_percent)
+
+        plain = Product.objects.get(slug="plain-frame")
+        self.assertEqual(plain.stock_type, "main")
+        self.assertEqual(plain.stock, 7)
+        self.assertIsNone(plain.discount_percent)
+
+    def test_variant_matched_by_sku_updates_its_size_and_color(self):
+        self.run_import(
+            "catalog.csv",
+            self.CSV_HEADER + "Oak Frame,,frames,Modern,999,,,Large,Black,OAK-L,1200,900,4\n",
+        )
+
+        output = self.run_import(
+            "catalog.csv",
+            self.CSV_HEADER + "Oak Frame,,frames,Modern,999,,,Large,White,OAK-L,1200,900,4\n",
+        )
+
+        variant = ProductVariant.objects.get(sku="OAK-L")
+        self.assertEqual(variant.color, self.other_color)
+        self.assertIn(f"color_id: {self.color.id} -> {self.other_color.id}", output)
+
+    def test_dry_run_reports_diff_without_writing(self):
+        product = Product.objects.create(title="Oak Frame", mrp=Decimal("999"), stock=3, category=self.category)
+
+        output = self.run_import(
+            "catalog.jsonl",
+            json.dumps({"slug": "oak-frame", "mrp": "1099", "stock": 3}) + "\n"
+            + json.dumps({"title": "New Frame", "mrp": 400, "category": "frames"}) + "\n",
+            dry_run=True,
+        )
+
+        self.assertIn("update product oak-frame mrp: 999.00 -> 1099", output)
+        self.assertIn("create product new-frame", output)
+        self.assertIn("created=1 updated=1", output)
+        product.refresh_from_db()
+        self.assertEqual(product.mrp, Decimal("999.00"))
+        self.assertFalse(Product.objects.filter(slug="new-frame").exists())
+
+    def test_invalid_rows_are_skipped_and_existing_rows_updated(self):
+        product = Product.objects.create(
+            title="Oak Frame", mrp=Decimal("999"), stock=3, category=self.category
+        )
+
+        stderr = StringIO()
+        call_command(
+            "import_catalog",
+            self.write_file(
+                "catalog.jsonl",
+                json.dumps({"slug": "oak-frame", "slashed_price": "499"}) + "\n"
+                + json.dumps({"title": "Ghost", "mrp": 10, "category": "missing"}) + "\n"
+                + "{not json}\n",
+            ),
+            stdout=StringIO(),
+            stderr=stderr,
+        )
+
+        product.refresh_from_db()
+        self.assertEqual(product.slashed_price, Decimal("499"))
+        self.assertEqual(product.discount_percent, 50)
+        self.assertFalse(Product.objects.filter(slug="ghost").exists())
+        self.assertIn("Unknown category 'missing'", stderr.getvalue())
+        self.assertIn("line 3", stderr.getvalue())
+
+    def test_admin_upload_runs_import(self):
+        admin_user = User.objects.create_superuser("import-admin", "import@example.com", "pass12345")
+        self.client.force_login(admin_user)
+        upload = SimpleUploadedFile(
+            "catalog.csv",
+            (self.CSV_HEADER + "Admin Frame,,frames,,650,,5,,,,,,\n").encode("utf-8"),
+            content_type="text/csv",
+        )
+
+        response = self.client.post(
+            reverse("admin:products_product_import"),
+            {"catalog_file": upload},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Import result")
+        self.assertTrue(Product.objects.filter(slug="admin-frame", stock=5).exists())
+
+
+@override_settings(INVENTORY_SYNC_TOKEN="sync-token")
+class InventorySyncTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse("product-inventory-bulk-update")
+        self.category = Category.objects.create(name="Frames")
+        self.size = Size.objects.create(name="Large")
+        self.color = Color.objects.create(name="Black")
+        self.other_color = Color.objects.create(name="White")
+        self.variant_product = Product.objects.create(
+            title="Oak Frame",
+            mrp=Decimal("1000"),
+            category=self.category,
+            stock_type="variants",
+        )
+        self.black = ProductVariant.objects.create(
+            product=self.variant_product, size=self.size, color=self.color, sku="OAK-LB", stock=2
+        )
+        self.white = ProductVariant.objects.create(
+            product=self.variant_product, size=self.size, color=self.other_color, sku="OAK-LW", stock=5
+        )
+        self.main_product = Product.objects.create(
+            title="Plain Frame", mrp=Decimal("500"), category=self.category, stock=4
+        )
+
+    def post(self, updates, token="sync-token"):
+        headers = {"HTTP_X_INVENTORY_SYNC_TOKEN": token} if token else {}
+        return self.client.post(self.url, {"updates": updates}, format="json", **headers)
+
+    def test_rejects_requests_without_staff_or_sync_token(self):
+        self.assertEqual(self.post([{"sku": "OAK-LB", "stock": 1}], token=None).status_code, 403)
+        self.assertEqual(self.post([{"sku": "OAK-LB", "stock": 1}], token="wrong").status_code, 403)
+
+        staff = User.objects.create_user(username="staff", password="pass", is_staff=True)
+        self.client.force_authenticate(staff)
+        response = self.post([{"sku": "OAK-LB", "stock": 1}], token=None)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_updates_variants_and_main_products_in_bulk_with_derived_discount(self):
+        version = get_catalog_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post([
+                    {"sku": "OAK-LB", "stock": 9, "mrp": "1200", "slashed_price": "900.4"},
+                    {"sku": "OAK-LW", "stock": 0},
+                    {"slug": self.main_product.slug, "stock": 11},
+                ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["summary"], {"updated": 3, "unchanged": 0, "errors": 0})
+        # Two lookups plus one UPDATE per model, independent of the batch size.
+        writes = [q for q in queries.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(writes), 2)
+        self.black.refresh_from_db()
+        self.assertEqual(self.black.stock, 9)
+        self.assertEqual(self.black.slashed_price, Decimal("900"))
+        self.assertEqual(self.black.discount_percent, 25)
+        self.white.refresh_from_db()
+        self.assertEqual(self.white.stock, 0)
+        self.main_product.refresh_from_db()
+        self.assertEqual(self.main_product.stock, 11)
+        self.assertGreater(get_catalog_version(), version)
+
+    def test_price_only_updates_leave_stock_alone(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post([{"sku": "OAK-LB", "mrp": "1500"}])
+
+        self.assertEqual(response.data["summary"], {"updated": 1, "unchanged": 0, "errors": 0})
+        writes = [q["sql"] for q in queries.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(writes), 1)
+        self.assertNotIn('"stock"', writes[0])
+        self.black.refresh_from_db()
+        self.assertEqual((self.black.stock, self.black.mrp), (2, Decimal("1500")))
+        self.assertFalse(
+            InventoryMovement.objects.filter(variant=self.black, reference="inventory_sync").exists()
+        )
+
+    def test_stock_changes_are_booked_in_the_inventory_ledger(self):
+        from products.inventory_ledger import (
+            find_inventory_drift,
+            get_ledger_levels,
+            record_drift_adjustments,
+            take_inventory_snapshots,
+        )
+
+        self.post([
+            {"sku": "OAK-LB", "stock": 9},
+            {"slug": self.main_product.slug, "stock": 11},
+        ])
+        self.white.stock = 3
+        self.white.save()
+
+        self.assertEqual(
+            list(
+                InventoryMovement.objects.filter(variant=self.black).values_list("kind", "stock_delta")
+            ),
+            [("adjustment", 2), ("adjustment", 7)],
+        )
+        self.assertEqual(get_ledger_levels(("variant", self.white.id))["stock"], 3)
+        self.assertEqual(find_inventory_drift(), {})
+
+        result = take_inventory_snapshots(settle_seconds=0)
+        self.assertEqual(result["movements"], InventoryMovement.objects.count())
+        self.assertEqual(
+            get_ledger_levels(("product", self.main_product.id)),
+            {"stock": 11, "reserved_quantity": 0, "available": 11},
+        )
+
+        # Writers that bypass the ledger show up as drift until booked.
+        ProductVariant.objects.filter(id=self.black.id).update(stock=4)
+        self.assertEqual(
+            find_inventory_drift(),
+            {("variant", self.black.id): {"stock": -5, "reserved_quantity": 0}},
+        )
+        record_drift_adjustments(find_inventory_drift())
+        self.assertEqual(find_inventory_drift(), {})
+
+    def test_reports_per_row_errors_without_blocking_valid_rows(self):
+        response = self.post([
+            {"sku": "MISSING", "stock": 1},
+            {"sku": "OAK-LB", "stock": -3},
+            {"slug": self.variant_product.slug, "stock": 3},
+            {"sku": "OAK-LW", "stock": 5},
+            {"sku": "OAK-LW", "stock": 6},
+            {"slug": self.main_product.slug, "stock": 2},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        statuses = [result["status"] for result in response.data["results"]]
+        self.assertEqual(statuses, ["error", "error", "error", "unchanged", "error", "updated"])
+        self.assertEqual(response.data["summary"], {"updated": 1, "unchanged": 1, "errors": 4})
+        self.white.refresh_from_db()
+        self.assertEqual(self.white.stock, 5)
+
+    def test_rejects_empty_and_oversized_payloads(self):
+        self.assertEqual(self.post([]).status_code, 400)
+        with patch("products.views.INVENTORY_SYNC_MAX_UPDATES", 1):
+            response = self.post([{"sku": "OAK-LB", "stock": 1}, {"sku": "OAK-LW", "stock": 1}])
+        self.assertEqual(response.status_code, 400)
+
+    def test_sync_inventory_command_reads_csv(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, True)
+        path = os.path.join(temp_dir, "stock.csv")
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write("sku,slug,stock,mrp\nOAK-LB,,7,\n,plain-frame,,650\nNOPE,,1,\n")
+
+        stdout = StringIO()
+        call_command("sync_inventory", path, "--chunk-size", "1", stdout=stdout, stderr=StringIO())
+
+        self.assertIn("updated=2 unchanged=0 errors=1", stdout.getvalue())
+        self.black.refresh_from_db()
+        self.assertEqual(self.black.stock, 7)
+        self.main_product.refresh_from_db()
+        self.assertEqual(self.main_product.mrp, Decimal("650"))
+        self.assertEqual(self.main_product.stock, 4)
@@ -7,6 +7,11 @@ urlpatterns = [
     path("products/", views.ProductListView.as_view(), name="product-list"),
     # ✅ Static paths MUST come before <int:id> patterns
     path("products/trending/", TrendingProductListView.as_view(), name="product-trending"),
+    path(
+        "products/inventory/bulk-update/",
+        views.bulk_inventory_update,
+        name="product-inventory-bulk-update",
+    ),
     path("products/<int:id>/", views.ProductDetailView.as_view(), name="product-detail"),
     path("products/<int:id>/cart-add/", record_cart_add, name="product-cart-add"),
     path("categories/", views.CategoryListView.as_view(), name="category-list"),
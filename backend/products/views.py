@@ -5,12 +5,18 @@ from rest_framework.views import APIView
 from .models import Banner, Product, Category, SubCategory, ProductActivity
 from .serializers import BannerSerializer, ProductSerializer, CategorySerializer, SubCategorySerializer, CategoryProductSerializer
 from .throttles import CartAddActivityThrottle, ProductViewThrottle, SearchThrottle
+from .inventory_sync import (
+    INVENTORY_SYNC_MAX_UPDATES,
+    apply_inventory_updates,
+    summarize_inventory_results,
+)
 from django.conf import settings
 from django.core.cache import cache
 from django.db.models import Count, Q, Sum, Case, When, IntegerField, Value, BooleanField
 from django.db.models.functions import Coalesce
 from django.utils import timezone
 from datetime import timedelta
+import hmac
 import logging
 
 
@@ -329,6 +335,50 @@ def record_cart_add(request, id):
     return Response({"ok": True})
 
 
+# ================= WAREHOUSE INVENTORY SYNC =================
+
+def _inventory_sync_authorized(request):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated and user.is_staff:
+        return True
+
+    expected = settings.INVENTORY_SYNC_TOKEN
+    provided = request.META.get("HTTP_X_INVENTORY_SYNC_TOKEN", "").strip()
+    if not expected or not provided:
+        return False
+    return hmac.compare_digest(provided, expected)
+
+
+@api_view(["POST"])
+def bulk_inventory_update(request):
+    """
+    Apply stock/price changes for many SKUs (or main-stock product slugs)
+    in one request. Accepts ``{"updates": [{"sku": ..., "stock": ...}, ...]}``
+    from staff users or the warehouse sync token.
+    """
+    if not _inventory_sync_authorized(request):
+        return Response({"error": "Forbidden."}, status=403)
+
+    updates = request.data.get("updates") if isinstance(request.data, dict) else None
+    if not isinstance(updates, list) or not updates:
+        return Response({"error": "updates must be a non-empty list."}, status=400)
+    if len(updates) > INVENTORY_SYNC_MAX_UPDATES:
+        return Response(
+            {"error": f"At most {INVENTORY_SYNC_MAX_UPDATES} updates are allowed per request."},
+            status=400,
+        )
+
+    results = apply_inventory_updates(updates)
+    summary = summarize_inventory_results(results)
+    logger.info(
+        "Inventory sync applied updated=%s unchanged=%s errors=%s",
+        summary["updated"],
+        summary["unchanged"],
+        summary["errors"],
+    )
+    return Response({"results": results, "summary": summary}, status=200)
+
+
 class SearchView(APIView):
     """
     Search across products, categories, and subcategories
@@ -21,6 +21,7 @@ ALL_MEDIA_REFERENCE_SPECS = (
     ("orders", "CartItemImage", "image"),
     ("orders", "OrderItem", "custom_image"),
     ("orders", "OrderItemImage", "image"),
+    ("orders", "CustomizationUpload", "image"),
 )
 
 ORDER_CUSTOMIZATION_REFERENCE_SPECS = (
@@ -28,6 +29,7 @@ ORDER_CUSTOMIZATION_REFERENCE_SPECS = (
     ("orders", "CartItemImage", "image"),
     ("orders", "OrderItem", "custom_image"),
     ("orders", "OrderItemImage", "image"),
+    ("orders", "CustomizationUpload", "image"),
 )
 
 
@@ -0,0 +1,34 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: ``acquire`` blocks until a token is available.
+    Tokens refill at ``rate`` per second up to ``capacity`` (the burst size).
+    """
+
+    def __init__(self, rate, capacity=1, *, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError("rate must be positive.")
+        self.rate = float(rate)
+        self.capacity = max(float(capacity), 1.0)
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                self._refill(self._clock())
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
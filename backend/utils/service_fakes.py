@@ -0,0 +1,184 @@
+"""
+In-process stand-ins for the external services the backend talks to.
+
+These are used by the endpoint benchmarks so latency numbers measure our own
+code paths (ORM, serialization, locking) rather than Razorpay, Delhivery,
+Resend or Cloudinary round trips. They are never wired in at runtime.
+"""
+
+import hashlib
+import hmac
+import itertools
+from contextlib import ExitStack, contextmanager
+from unittest.mock import patch
+
+from django.test.utils import override_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from utils.delhivery_service import DelhiveryService
+
+FAKE_RAZORPAY_KEY_ID = "rzp_test_fake"
+FAKE_RAZORPAY_KEY_SECRET = "fake-razorpay-secret"
+FAKE_RAZORPAY_WEBHOOK_SECRET = "fake-razorpay-webhook-secret"
+
+
+class _FakeRazorpayOrders:
+    def __init__(self, client):
+        self.client = client
+
+    def create(self, data):
+        razorpay_order_id = f"order_fake{next(self.client.sequence):010d}"
+        entity = {
+            "id": razorpay_order_id,
+            "entity": "order",
+            "amount": data["amount"],
+            "currency": data.get("currency", "INR"),
+            "receipt": data.get("receipt", ""),
+            "notes": data.get("notes", {}),
+            "status": "created",
+        }
+        self.client.orders[razorpay_order_id] = entity
+        return entity
+
+    def payments(self, razorpay_order_id):
+        return {
+            "items": [
+                payment
+                for payment in self.client.payments.values()
+                if payment["order_id"] == razorpay_order_id
+            ]
+        }
+
+
+class _FakeRazorpayPayments:
+    def __init__(self, client):
+        self.client = client
+
+    def fetch(self, razorpay_payment_id):
+        return self.client.payments.get(razorpay_payment_id, {})
+
+    def refund(self, razorpay_payment_id, data=None):
+        payment = self.client.payments.get(razorpay_payment_id, {})
+        return {
+            "id": f"rfnd_fake{next(self.client.sequence):010d}",
+            "payment_id": razorpay_payment_id,
+            "amount": (data or {}).get("amount", payment.get("amount")),
+            "status": "processed",
+        }
+
+
+class FakeRazorpayClient:
+    """Minimal subset of ``razorpay.Client`` used by ``payment_services``."""
+
+    def __init__(self):
+        self.sequence = itertools.count(1)
+        self.orders = {}
+        self.payments = {}
+        self.order = _FakeRazorpayOrders(self)
+        self.payment = _FakeRazorpayPayments(self)
+
+    def capture(self, razorpay_order_id):
+        """Simulate the customer paying a created order; returns the payment."""
+        order = self.orders[razorpay_order_id]
+        razorpay_payment_id = f"pay_fake{next(self.sequence):010d}"
+        payment = {
+            "id": razorpay_payment_id,
+            "entity": "payment",
+            "order_id": razorpay_order_id,
+            "amount": order["amount"],
+            "currency": order["currency"],
+            "status": "captured",
+            "notes": order["notes"],
+        }
+        self.payments[razorpay_payment_id] = payment
+        return payment
+
+
+def sign_checkout_payment(razorpay_order_id, razorpay_payment_id):
+    return hmac.new(
+        FAKE_RAZORPAY_KEY_SECRET.encode("utf-8"),
+        f"{razorpay_order_id}|{razorpay_payment_id}".encode("utf-8"),
+        hashlib.sha256,
+    ).hexdigest()
+
+
+def sign_webhook_body(body):
+    return hmac.new(
+        FAKE_RAZORPAY_WEBHOOK_SECRET.encode("utf-8"),
+        body,
+        hashlib.sha256,
+    ).hexdigest()
+
+
+def _fake_pincode_serviceability(self, *, pincode, timeout=15):
+    return {"delivery_codes": [{"postal_code": {"pin": pincode, "pre_paid": "Y"}}]}
+
+
+def _fake_expected_tat(self, *args, **kwargs):
+    return {"data": {"tat": 3}}
+
+
+def _fake_create_shipment(self, *, data, timeout=30):
+    return {"success": True, "packages": [{"waybill": "FAKEWAYBILL", "status": "Success"}]}
+
+
+def _fake_track_shipment(self, *, waybill, ref_ids="", timeout=20):
+    return {"ShipmentData": []}
+
+
+def _fake_shipping_label(self, *, waybill, pdf=True, pdf_size="4R", timeout=20):
+    return {"packages": [{"waybill": waybill, "pdf_download_link": ""}]}
+
+
+def _fake_send_email(*, to_email, subject, html):
+    return {"id": "fake-email"}
+
+
+@contextmanager
+def fake_external_services():
+    """
+    Replace Razorpay, Delhivery, Resend and Cloudinary with in-process fakes
+    and disable throttling for the duration of the block. Yields the fake
+    Razorpay client so callers can simulate captured payments.
+    """
+    client = FakeRazorpayClient()
+    with ExitStack() as stack:
+        stack.enter_context(
+            override_settings(
+                USE_CLOUDINARY=False,
+                RAZORPAY_WEBHOOK_SECRET=FAKE_RAZORPAY_WEBHOOK_SECRET,
+                RESEND_API_KEY="fake",
+                STORAGES={
+                    "default": {
+                        "BACKEND": "django.core.files.storage.InMemoryStorage",
+                    },
+                    "staticfiles": {
+                        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+                    },
+                },
+            )
+        )
+        stack.enter_context(
+            patch("orders.payment_services.get_razorpay_client", return_value=client)
+        )
+        stack.enter_context(
+            patch(
+                "orders.payment_services.get_razorpay_credentials",
+                return_value=(FAKE_RAZORPAY_KEY_ID, FAKE_RAZORPAY_KEY_SECRET),
+            )
+        )
+        for name, fake in (
+            ("get_pincode_serviceability", _fake_pincode_serviceability),
+            ("get_expected_tat", _fake_expected_tat),
+            ("create_shipment", _fake_create_shipment),
+            ("track_shipment", _fake_track_shipment),
+            ("generate_shipping_label", _fake_shipping_label),
+            ("require_configuration", lambda self: None),
+        ):
+            stack.enter_context(patch.object(DelhiveryService, name, fake))
+        stack.enter_context(patch("orders.email_services.send_email", _fake_send_email))
+        stack.enter_context(patch("accounts.services.send_email", _fake_send_email))
+        stack.enter_context(
+            patch.object(SimpleRateThrottle, "allow_request", lambda self, request, view: True)
+        )
+        yield client
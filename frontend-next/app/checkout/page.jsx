@@ -1,6 +1,6 @@
 "use client";
 
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import { useRouter } from "next/navigation";
 import { motion } from "framer-motion";
 import { useAuth } from "@/context/AuthContext";
@@ -119,6 +119,11 @@ export default function CheckoutPage() {
   const [paymentInitializing, setPaymentInitializing] = useState(false);
   const [initialLoading, setInitialLoading] = useState(true);
   const [paymentError, setPaymentError] = useState("");
+  // Idempotency key (and the cart quote sent with it) shared by every
+  // create-order request of one checkout attempt (same address, coupon and
+  // cart), so double clicks and retries replay the first order instead of
+  // creating another.
+  const checkoutAttemptRef = useRef(null);
   const [deliveryValidation, setDeliveryValidation] = useState({
     status: "idle",
     message: "",
@@ -254,6 +259,22 @@ export default function CheckoutPage() {
     selectedAddressRecord,
   ]);
 
+  function getCheckoutAttempt(items, couponCode, quote) {
+    const signature = JSON.stringify([
+      selectedAddress,
+      couponCode,
+      items.map((item) => [item.id, item.quantity]),
+    ]);
+    if (checkoutAttemptRef.current?.signature !== signature) {
+      checkoutAttemptRef.current = { signature, key: crypto.randomUUID(), quote };
+    }
+    return checkoutAttemptRef.current;
+  }
+
+  function resetCheckoutAttempt() {
+    checkoutAttemptRef.current = null;
+  }
+
   async function handlePlaceOrder() {
     if (hasUnavailableItems) {
       error("Remove unavailable items from your cart before starting payment.");
@@ -334,10 +355,16 @@ export default function CheckoutPage() {
         throw new Error("Unable to load Razorpay checkout. Please try again.");
       }
 
-      const response = await createRazorpayOrder(
-        selectedAddress,
-        refreshedSelectedCoupon?.code || selectedCoupon?.code || "",
+      const couponCode = refreshedSelectedCoupon?.code || selectedCoupon?.code || "";
+      const attempt = getCheckoutAttempt(
+        nextItems,
+        couponCode,
+        (couponCode ? refreshedSelectedCoupon?.quote : couponData.quote) || "",
       );
+      const response = await createRazorpayOrder(selectedAddress, couponCode, {
+        quote: attempt.quote,
+        idempotencyKey: attempt.key,
+      });
 
       const razorpayKey = RAZORPAY_KEY || response.payment?.key_id;
       if (!razorpayKey) {
@@ -358,8 +385,9 @@ export default function CheckoutPage() {
               razorpay_order_id: paymentResult.razorpay_order_id,
               razorpay_payment_id: paymentResult.razorpay_payment_id,
               razorpay_signature: paymentResult.razorpay_signature,
-            });
+            }, `verify-${paymentResult.razorpay_payment_id}`);
 
+            resetCheckoutAttempt();
             replaceCart([]);
             setCartLock(false);
             success("Payment successful");
@@ -367,6 +395,7 @@ export default function CheckoutPage() {
               `/success?orderId=${verification.order.id}&orderNumber=${encodeURIComponent(verification.order.order_number)}`,
             );
           } catch (verificationError) {
+            resetCheckoutAttempt();
             setPaymentError(verificationError.message || "Payment verification failed.");
             error(verificationError.message || "Payment verification failed.");
             setCartLock(false);
@@ -387,6 +416,7 @@ export default function CheckoutPage() {
               );
             } catch {}
 
+            resetCheckoutAttempt();
             setPaymentError("Payment was cancelled before completion.");
             setPaymentInitializing(false);
             setCartLock(false);
@@ -402,6 +432,7 @@ export default function CheckoutPage() {
           );
         } catch {}
 
+        resetCheckoutAttempt();
         setPaymentError(
           paymentFailure?.error?.description || "Payment failed. Please try again.",
         );
@@ -412,6 +443,11 @@ export default function CheckoutPage() {
 
       razorpay.open();
     } catch (err) {
+      // fetch rejects with a TypeError when the request may never have been
+      // answered; keep the key so a retry replays it instead of re-ordering.
+      if (!(err instanceof TypeError)) {
+        resetCheckoutAttempt();
+      }
       setPaymentError(err.message || "Unable to start payment.");
       error(err.message);
       setCartLock(false);
@@ -2,7 +2,12 @@
 
 import { createContext, useContext, useEffect, useRef, useState } from "react";
 import { useRouter } from "next/navigation";
-import { addToCart as addToCartAPI, addToWishlist as addToWishlistAPI, getCart } from "@/lib/api";
+import {
+  addToCart as addToCartAPI,
+  addToWishlist as addToWishlistAPI,
+  getCart,
+  mergeGuestCart,
+} from "@/lib/api";
 import {
   clearAuthSession,
   getSessionUser,
@@ -228,32 +233,42 @@ export function AuthProvider({ children }) {
           ? JSON.parse(localStorage.getItem("cart") || "[]")
           : [];
 
-      if (guestCart.length > 0) {
-        for (const item of guestCart) {
-          try {
-            const productId = item.product_id || item.id;
+      // Plain guest lines already live in the guest cart cookie, so one merge
+      // call folds them all in. Customized lines carry files and are replayed.
+      const customizedGuestItems = guestCart.filter(
+        (item) =>
+          item.customText ||
+          item.custom_text ||
+          (item.customImages || item.custom_images || []).length > 0,
+      );
 
-            if (!productId) continue;
+      for (const item of customizedGuestItems) {
+        try {
+          const productId = item.product_id || item.id;
 
-            const availableStock = item.variant?.stock ?? item.stock ?? 0;
+          if (!productId) continue;
 
-            if (item.qty > availableStock) continue;
+          const availableStock = item.variant?.stock ?? item.stock ?? 0;
 
-            await addToCartAPI(
-              productId,
-              item.qty,
-              item.variant?.id || null,
-              item.customText || null,
-              item.customImages || item.custom_images || null,
-            );
-          } catch (err) {
-            console.error("Guest cart merge failed:", err);
-          }
+          if (item.qty > availableStock) continue;
+
+          await addToCartAPI(
+            productId,
+            item.qty,
+            item.variant?.id || null,
+            item.customText || null,
+            item.customImages || item.custom_images || null,
+          );
+        } catch (err) {
+          console.error("Guest cart merge failed:", err);
         }
       }
 
       try {
-        const data = await getCart();
+        let data = await mergeGuestCart();
+        if (customizedGuestItems.length > 0) {
+          data = await getCart();
+        }
         if (typeof window !== "undefined") {
           const mergedItems = mergeCartMetadata(guestCart, data.items || []);
           window.dispatchEvent(
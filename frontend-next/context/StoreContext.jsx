@@ -3,10 +3,13 @@
 import { createContext, useContext, useState, useCallback, useEffect } from "react";
 import {
   addToCart as addToCartAPI,
+  addToGuestCart,
+  clearGuestCart,
   getCart,
   removeFromCart as removeFromCartAPI,
   syncCartStock,
   updateCartItem,
+  updateGuestCartItem,
 } from "@/lib/api";
 import { useAuth } from "@/context/AuthContext";
 import { useGlobalToast } from "@/context/ToastContext";
@@ -85,6 +88,28 @@ function getPendingKey(item) {
   return getCartRowId(item) || getCartIdentity(item);
 }
 
+function isPlainCartItem(item) {
+  return !(item?.customText ?? item?.custom_text) && !getCustomImageIdentity(item);
+}
+
+// Plain guest lines are mirrored into the backend guest cart cookie so login
+// can merge them in one request. Customized lines keep their files locally
+// and are replayed at login instead.
+function mirrorGuestCartLine(item, quantity = null) {
+  if (!isPlainCartItem(item)) {
+    return;
+  }
+
+  const productId = item.id ?? item.product_id;
+  const variantId = item.variant?.id || null;
+  const request =
+    quantity === null
+      ? addToGuestCart(productId, item.qty || 1, variantId)
+      : updateGuestCartItem(productId, variantId, quantity);
+
+  request.catch((err) => console.error("Failed to sync guest cart:", err));
+}
+
 function mergeCartItemMetadata(previousItem, nextItem) {
   if (!previousItem) {
     return nextItem;
@@ -249,6 +274,7 @@ export function StoreProvider({ children }) {
     }
 
     if (!isAuthenticated) {
+      mirrorGuestCartLine(product);
       return { ok: true };
     }
 
@@ -311,6 +337,7 @@ export function StoreProvider({ children }) {
     }
 
     if (!isAuthenticated) {
+      mirrorGuestCartLine(product, 0);
       clearPendingAction(pendingKey);
       return { ok: true };
     }
@@ -358,6 +385,7 @@ export function StoreProvider({ children }) {
     );
 
     if (!isAuthenticated) {
+      mirrorGuestCartLine(existing, Math.max(newQty, 0));
       clearPendingAction(pendingKey);
       return { ok: true };
     }
@@ -424,6 +452,7 @@ export function StoreProvider({ children }) {
     );
 
     if (!isAuthenticated) {
+      mirrorGuestCartLine(existing, newQty);
       clearPendingAction(pendingKey);
       return { ok: true };
     }
@@ -444,7 +473,11 @@ export function StoreProvider({ children }) {
   const clearCart = useCallback(() => {
     setCart([]);
     clearStoredGuestCart();
-  }, []);
+
+    if (!isAuthenticated) {
+      clearGuestCart().catch((err) => console.error("Failed to clear guest cart:", err));
+    }
+  }, [isAuthenticated]);
 
   const replaceCart = useCallback((newCartItems) => {
     setCart(newCartItems || []);
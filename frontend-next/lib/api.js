@@ -346,6 +346,59 @@ export async function subscribeToNewsletter(email, source = "footer") {
   return data;
 }
 
+const CUSTOMIZATION_UPLOAD_POLL_MS = 1000;
+const CUSTOMIZATION_UPLOAD_MAX_POLLS = 60;
+
+async function readErrorMessage(response, fallback) {
+  try {
+    const errorData = await response.json();
+    return errorData.error || fallback;
+  } catch {
+    return fallback;
+  }
+}
+
+// Customization images go through the upload API: the backend stores the raw
+// file privately and sanitizes it out of band, and the cart add then only
+// references the ready upload ids.
+async function uploadCustomizationImage(image) {
+  const formData = new FormData();
+  formData.append("image", image);
+
+  const response = await fetchWithAuth(`${API_BASE}/api/orders/cart/uploads/`, {
+    method: "POST",
+    body: formData,
+  });
+
+  if (!response.ok) {
+    throw new Error(await readErrorMessage(response, "Failed to upload image"));
+  }
+
+  let upload = await response.json();
+
+  for (let poll = 0; upload.status === "pending" && poll < CUSTOMIZATION_UPLOAD_MAX_POLLS; poll += 1) {
+    if (poll > 0) {
+      await new Promise((resolve) => setTimeout(resolve, CUSTOMIZATION_UPLOAD_POLL_MS));
+    }
+
+    const statusResponse = await fetchWithAuth(
+      `${API_BASE}/api/orders/cart/uploads/${upload.id}/`,
+    );
+
+    if (!statusResponse.ok) {
+      throw new Error(await readErrorMessage(statusResponse, "Failed to process image"));
+    }
+
+    upload = await statusResponse.json();
+  }
+
+  if (upload.status !== "ready") {
+    throw new Error(upload.error || "Image is still processing. Please try again.");
+  }
+
+  return upload.id;
+}
+
 // Use in existing functions
 export async function addToCart(
   productId,
@@ -372,8 +425,16 @@ export async function addToCart(
     formData.append("custom_text", customText);
   }
 
-  for (const image of normalizedImages) {
-    formData.append("custom_images", image);
+  if (normalizedImages.length > 0 && normalizedImages.every((image) => image instanceof Blob)) {
+    const uploadIds = await Promise.all(normalizedImages.map(uploadCustomizationImage));
+
+    for (const uploadId of uploadIds) {
+      formData.append("custom_upload_ids", uploadId);
+    }
+  } else {
+    for (const image of normalizedImages) {
+      formData.append("custom_images", image);
+    }
   }
 
   const response = await fetchWithAuth(`${API_BASE}/api/orders/cart/add/`, {
@@ -382,29 +443,39 @@ export async function addToCart(
   });
 
   if (!response.ok) {
-    let message = "Failed to add item to cart";
-
-    try {
-      const errorData = await response.json();
-      message = errorData.error || message;
-    } catch {}
-
-    throw new Error(message);
+    throw new Error(await readErrorMessage(response, "Failed to add item to cart"));
   }
 
   return response.json();
 }
 
+// Last cart payload and its ETag, so repeat loads can revalidate with
+// If-None-Match and reuse the payload on a 304.
+let lastCartResponse = null;
+
 export async function getCart() {
-  const response = await fetchWithAuth(`${API_BASE}/api/orders/cart/`);
+  const headers = lastCartResponse?.etag
+    ? { "If-None-Match": lastCartResponse.etag }
+    : {};
+  const response = await fetchWithAuth(`${API_BASE}/api/orders/cart/`, { headers });
+
+  if (response.status === 304 && lastCartResponse) {
+    return transformCart(lastCartResponse.data);
+  }
 
   if (!response.ok) {
     throw new Error("Failed to fetch cart");
   }
 
   const data = await response.json();
+  const etag = response.headers.get("ETag");
+  lastCartResponse = etag ? { etag, data } : null;
 
-  // 🧠 Transform server cart → UI cart
+  return transformCart(data);
+}
+
+// 🧠 Transform server cart → UI cart
+function transformCart(data) {
   const transformedItems = (data.items || []).map((item) => {
     const product = item.product || {};
     const variant = item.variant || null;
@@ -475,6 +546,60 @@ export async function getCart() {
   };
 }
 
+// Guest carts live in a signed cookie on the backend, so every call sends
+// credentials and the server answers with the refreshed cookie.
+async function guestCartRequest(path, options = {}) {
+  const response = await apiFetch(`${API_BASE}/api/orders/cart/guest/${path}`, options);
+
+  if (!response.ok) {
+    let message = "Failed to update cart";
+
+    try {
+      const errorData = await response.json();
+      message = errorData.error || message;
+    } catch {}
+
+    throw new Error(message);
+  }
+
+  return response.json();
+}
+
+export async function addToGuestCart(productId, quantity = 1, variantId = null) {
+  return guestCartRequest("add/", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({
+      product_id: productId,
+      quantity,
+      variant_id: variantId || null,
+    }),
+  });
+}
+
+export async function updateGuestCartItem(productId, variantId, quantity) {
+  return guestCartRequest("update/", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({
+      product_id: productId,
+      quantity,
+      variant_id: variantId || null,
+    }),
+  });
+}
+
+export async function clearGuestCart() {
+  return guestCartRequest("clear/", { method: "DELETE" });
+}
+
+// Called once after login: the backend folds the guest cookie cart into the
+// user's cart in one request and returns the merged cart.
+export async function mergeGuestCart() {
+  const data = await guestCartRequest("merge/", { method: "POST" });
+  return { ...transformCart(data), merged: data.merged || 0 };
+}
+
 export async function getAvailableCoupons() {
   const response = await fetchWithAuth(`${API_BASE}/api/orders/coupons/available/`);
 
@@ -868,13 +993,23 @@ export async function getDelhiveryExpectedTat(destinationPincode) {
   return data;
 }
 
-export async function createRazorpayOrder(addressId, couponCode = "") {
+function withIdempotencyKey(headers, idempotencyKey) {
+  return idempotencyKey ? { ...headers, "Idempotency-Key": idempotencyKey } : headers;
+}
+
+export async function createRazorpayOrder(
+  addressId,
+  couponCode = "",
+  { quote = "", idempotencyKey = "" } = {},
+) {
   const res = await fetchWithAuth(`${API_BASE}/api/payments/create-order/`, {
     method: "POST",
-    headers: { "Content-Type": "application/json" },
+    headers: withIdempotencyKey({ "Content-Type": "application/json" }, idempotencyKey),
     body: JSON.stringify({
       address_id: addressId,
       coupon_code: couponCode || "",
+      // Signed pricing from getAvailableCoupons; lets checkout skip re-pricing.
+      quote: quote || "",
     }),
   });
 
@@ -893,10 +1028,10 @@ export async function createRazorpayOrder(addressId, couponCode = "") {
   };
 }
 
-export async function verifyRazorpayPayment(payload) {
+export async function verifyRazorpayPayment(payload, idempotencyKey = "") {
   const res = await fetchWithAuth(`${API_BASE}/api/payments/verify/`, {
     method: "POST",
-    headers: { "Content-Type": "application/json" },
+    headers: withIdempotencyKey({ "Content-Type": "application/json" }, idempotencyKey),
     body: JSON.stringify(payload),
   });
 